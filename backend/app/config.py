@@ -3,7 +3,10 @@
 # Centralizes all configuration (API keys, DB URLs, limits, defaults).
 # Related: main.py, convex_client.py, routers/
 
+import os
+import stat
 from functools import lru_cache
+from pathlib import Path
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -20,16 +23,51 @@ class AppSettings(BaseSettings):
     max_file_size_mb: int = 50
     max_files: int = 20
     max_concurrent_analyses: int = 5
+    pipeline_max_concurrent: int = 0  # analyses in parse→aggregate at once; 0 = auto by RAM
     temp_dir: str = "/tmp/foxdoc"
     parser_force_backend_text: bool = False
     parser_doc_timeout: int = 120
     parser_max_concurrent: int = 2
+    parser_cache_enabled: bool = True  # reuse Docling output for identical files
+    parser_cache_max_mb: int = 512  # on-disk budget, oldest entries evicted first
     ocr_enabled: bool = True
     ocr_scanned_threshold: int = 100  # chars per page — below = scanned
     ocr_pdf_engine: str = "native"  # "native", "mistral-ocr", "pdf-text"
+    llm_cache_enabled: bool = True  # reuse LLM results for identical inputs
+    llm_cache_ttl_hours: int = 168
+    llm_cache_dir: str = ""  # "" = <temp_dir>/llm_cache; must be private to this user
+    evaluation_fast_path: bool = False  # skip the QA LLM call on skeletal reports
+    chat_batch_enabled: bool = False  # merge concurrent same-context chat questions
+    chat_batch_window_ms: int = 200
 
 
 @lru_cache
 def get_settings() -> AppSettings:
     """Cached singleton — call this from FastAPI Depends() or at module level."""
     return AppSettings()
+
+
+def private_dir(path: str | Path) -> Path:
+    """Create `path` if needed and make sure only this user can use it.
+
+    Cache directories default to a shared /tmp tree; another local user
+    who pre-creates or swaps them could plant entries the app then trusts.
+    Raises PermissionError if `path` is a symlink, is not ours, or sits in
+    a directory other users could rename it out of.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    uid = os.geteuid() if hasattr(os, "geteuid") else None
+
+    parent = path.parent.lstat()
+    shared = parent.st_mode & 0o022 and not parent.st_mode & stat.S_ISVTX
+    if uid is not None and (parent.st_uid not in (uid, 0) or shared):
+        raise PermissionError(f"{path.parent} is writable by other users")
+
+    path.mkdir(mode=0o700, exist_ok=True)
+    info = path.lstat()
+    if not stat.S_ISDIR(info.st_mode) or (uid is not None and info.st_uid != uid):
+        raise PermissionError(f"{path} is not a directory owned by this user")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
@@ -8,12 +8,46 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import threading
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Optional
 
 logger = logging.getLogger(__name__)
 
+# Pushed by _pump_subscription when the subscription iterator ends
+_SUBSCRIPTION_END = object()
+
+
+def _pump_subscription(
+    sub: Any,
+    loop: asyncio.AbstractEventLoop,
+    results: asyncio.Queue[Any],
+    stop: threading.Event,
+) -> None:
+    """Thread body: forward Convex subscription results to an asyncio queue.
+
+    Runs until the subscription ends (unsubscribe) or ``stop`` is set; an
+    error is forwarded as the exception object.
+    """
+
+    def push(item: Any) -> None:
+        if stop.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(results.put_nowait, item)
+        except RuntimeError:  # loop already closed
+            stop.set()
+
+    try:
+        for value in sub:
+            if stop.is_set():
+                return
+            push(value)
+    except Exception as e:
+        push(e)
+    push(_SUBSCRIPTION_END)
+
 
 class ConvexDB:
     """Database client. Uses Convex when configured, falls back to in-memory store.
@@ -49,6 +83,8 @@ class ConvexDB:
             "notes": {},
         }
         self._lock = asyncio.Lock()  # thread-safety for in-memory store
+        # analysis_id → queues fed by update_analysis (in-memory watch_status)
+        self._status_watchers: dict[str, set[asyncio.Queue[str]]] = {}
 
         if url:
             try:
@@ -129,6 +165,9 @@ class ConvexDB:
             if record is None:
                 raise KeyError(f"Analysis {analysis_id} not found")
             record.update(kwargs)
+            if "status" in kwargs:
+                for q in self._status_watchers.get(analysis_id, ()):
+                    q.put_nowait(kwargs["status"])
 
     async def get_analysis(self, analysis_id: str) -> Optional[dict]:
         """Return an analysis dict or ``None`` if it doesn't exist."""
@@ -146,6 +185,57 @@ class ConvexDB:
             record = self._table("analyses").get(analysis_id)
             return dict(record) if record is not None else None
 
+    async def watch_status(self, analysis_id: str) -> AsyncIterator[Optional[str]]:
+        """Yield the analysis status now and again each time it changes.
+
+        Backed by a Convex subscription on ``analyses:getStatus`` read in a
+        dedicated thread; the in-memory store is fed directly by
+        ``update_analysis``. Yields ``None`` if the record is gone.
+        """
+        if self.is_convex:
+            # Status-only query: event appends don't change its result, so
+            # they push nothing to this subscriber
+            sub = self._client.subscribe("analyses:getStatus", {"id": analysis_id})
+            loop = asyncio.get_running_loop()
+            results: asyncio.Queue[Any] = asyncio.Queue()
+            stop = threading.Event()
+            # Own daemon thread, not the default executor: next() blocks until
+            # the status changes, which may be never for a finished analysis
+            threading.Thread(
+                target=_pump_subscription,
+                args=(sub, loop, results, stop),
+                name=f"convex-watch-{analysis_id}",
+                daemon=True,
+            ).start()
+            try:
+                while True:
+                    item = await results.get()
+                    if item is _SUBSCRIPTION_END:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                stop.set()
+                # Ends the subscription iterator, so the pump thread exits
+                sub.unsubscribe()
+
+        q: asyncio.Queue[str] = asyncio.Queue()
+        self._status_watchers.setdefault(analysis_id, set()).add(q)
+        try:
+            async with self._lock:
+                record = self._table("analyses").get(analysis_id)
+                status = record.get("status") if record is not None else None
+            yield status
+            while True:
+                yield await q.get()
+        finally:
+            watchers = self._status_watchers.get(analysis_id)
+            if watchers is not None:
+                watchers.discard(q)
+                if not watchers:
+                    del self._status_watchers[analysis_id]
+
     async def list_analyses(self, limit: int = 20, offset: int = 0) -> list[dict]:
         """List analyses sorted by creation time descending."""
         if self.is_convex:
@@ -424,6 +514,29 @@ class ConvexDB:
                 record["events_json"] = []
             record["events_json"].append(event)
 
+    async def append_events(self, analysis_id: str, events: list[dict]) -> None:
+        """Append several pipeline events in one write (order preserved)."""
+        if not events:
+            return
+        if self.is_convex:
+            try:
+                self._client.mutation(
+                    "analyses:appendEvents",
+                    {"id": analysis_id, "events": events},
+                )
+                return
+            except Exception as e:
+                logger.error("Convex append_events failed: %s", e)
+                raise
+
+        async with self._lock:
+            record = self._table("analyses").get(analysis_id)
+            if record is None:
+                raise KeyError(f"Analysis {analysis_id} not found")
+            if record.get("events_json") is None:
+                record["events_json"] = []
+            record["events_json"].extend(events)
+
     async def get_events(
         self, analysis_id: str, since_index: int = 0
     ) -> list[dict]:
@@ -2,16 +2,30 @@
 # FastAPI application entry point
 # Configures CORS, lifespan, and routes
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.services.admission import shutdown_process_pool
+from app.services.chat_batcher import close_chat_batchers
+from app.services.parser import warmup_parsers
+from app.services.stream_store import run_stream_gc
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan: startup and shutdown hooks."""
+    # Load Docling models in the background — startup isn't blocked on it
+    warmup_task = asyncio.create_task(warmup_parsers())
+    # Evict thinking streams whose pipeline never cleaned up
+    stream_gc_task = asyncio.create_task(run_stream_gc())
     yield
+    warmup_task.cancel()
+    stream_gc_task.cancel()
+    shutdown_process_pool()
+    await close_chat_batchers()
     # Cleanup if needed (e.g. close LLM client connections)
 
 
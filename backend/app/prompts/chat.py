@@ -1,7 +1,7 @@
 # backend/app/prompts/chat.py
 # Q&A chat prompt template (Lithuanian).
 # Used by services/chat.py for post-analysis follow-up questions.
-# Related: services/chat.py
+# Related: services/chat.py, services/chat_batcher.py
 
 CHAT_SYSTEM = """\
 Tu esi viešųjų pirkimų konsultantas. Tau pateikta pirkimo analizės ataskaita \
@@ -20,3 +20,21 @@ Analizės ataskaita:
 
 Šaltinių dokumentai:
 {documents_markdown}"""
+
+# Static sections around the two placeholders, split once at import so
+# ChatService can "".join() the prompt instead of re-parsing it per call
+# (string.Template would still regex-scan the template on every substitute).
+CHAT_SYSTEM_HEAD, _rest = CHAT_SYSTEM.split("{report_json}")
+CHAT_SYSTEM_MID, CHAT_SYSTEM_TAIL = _rest.split("{documents_markdown}")
+del _rest
+
+# User message for several concurrent questions merged into one request by
+# services/chat_batcher.py; answers are split back on the <|ans N|> markers.
+CHAT_BATCH_USER = """\
+Atsakyk į kiekvieną klausimą atskirai, laikydamasis tų pačių taisyklių. \
+Kiekvieno atsakymo pradžioje parašyk žymę <|ans N|>, kur N — klausimo numeris. \
+Prieš pirmąją žymę nieko nerašyk.
+
+{questions}"""
+
+CHAT_BATCH_QUESTION = "Klausimas {n}: {question}"
@@ -625,10 +625,12 @@ async def chat_with_analysis(
 
     async def chat_event_generator():
         from app.services.chat import ChatService
+        from app.services.chat_batcher import get_chat_batcher
         from app.services.llm import LLMClient
 
         llm = LLMClient(api_key=api_key, default_model=model)
-        chat_service = ChatService(llm=llm)
+        batcher = get_chat_batcher(api_key) if settings.chat_batch_enabled else None
+        chat_service = ChatService(llm=llm, batcher=batcher)
         full_response = ""
 
         try:
@@ -0,0 +1,125 @@
+# backend/app/services/admission.py
+# Process-wide admission control for the compute-heavy pipeline phases
+# Caps how many analyses parse/extract/aggregate at once across all uploads
+# Also owns the shared process pool for CPU-bound work (large ZIP entries)
+# Related: pipeline.py, config.py, zip_extractor.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, TypeVar
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Waits longer than this are logged — they mean the host is saturated
+_SLOW_ACQUIRE_SECONDS = 0.1
+
+
+def _auto_limit() -> int:
+    """~1 concurrent analysis per 8 GB of RAM, clamped to 1..8."""
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 1
+    return min(8, max(1, total // (8 * 1024**3)))
+
+
+def pipeline_limit() -> int:
+    """Configured limit, or the RAM-based default when set to 0."""
+    configured = get_settings().pipeline_max_concurrent
+    return configured if configured > 0 else _auto_limit()
+
+
+PIPELINE_SEM = asyncio.Semaphore(pipeline_limit())
+
+
+@asynccontextmanager
+async def admit(analysis_id: str) -> AsyncIterator[None]:
+    """Hold a pipeline slot for the duration of the block."""
+    start = time.monotonic()
+    async with PIPELINE_SEM:
+        waited = time.monotonic() - start
+        if waited > _SLOW_ACQUIRE_SECONDS:
+            logger.info(
+                "Analysis %s waited %.2fs for a pipeline slot", analysis_id, waited,
+            )
+        yield
+
+
+# ── Shared process pool ────────────────────────────────────────────────────
+
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_closed = False
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Lazily create the process-wide pool for CPU-bound work.
+
+    Sized to min(8, cpu_count). Uses the spawn start method: workers are
+    started from threads of an asyncio server, where fork is unsafe.
+    Raises RuntimeError after shutdown_process_pool().
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool_closed:
+            raise RuntimeError("process pool is shut down")
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=min(8, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_process_pool() builds a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_to_process_pool(fn: Callable[..., T], *args) -> Future[T]:
+    """Run fn(*args) in the shared pool.
+
+    A pool whose worker died (BrokenProcessPool) is replaced — on submit,
+    where the call is retried once on a fresh pool, and when a future
+    fails with it. Raises RuntimeError once the pool is shut down.
+    """
+    pool = get_process_pool()
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard_process_pool(pool)
+        pool = get_process_pool()
+        future = pool.submit(fn, *args)
+
+    def _check_broken(done: Future) -> None:
+        if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+            logger.warning("Process pool worker died — replacing the pool")
+            _discard_process_pool(pool)
+
+    future.add_done_callback(_check_broken)
+    return future
+
+
+def shutdown_process_pool() -> None:
+    """Stop the shared pool (called from the app lifespan on shutdown)."""
+    global _process_pool, _process_pool_closed
+    with _process_pool_lock:
+        _process_pool_closed = True
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
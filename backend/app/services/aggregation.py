@@ -10,6 +10,7 @@ from typing import TYPE_CHECKING, Awaitable, Callable
 
 from app.models.schemas import AggregatedReport, SourceDocument
 from app.prompts.aggregation import AGGREGATION_SYSTEM, AGGREGATION_USER
+from app.services import llm_cache
 from app.services.extraction import calculate_max_chars
 
 if TYPE_CHECKING:
@@ -136,15 +137,24 @@ async def aggregate_results(
         len(all_source_docs),
     )
 
-    # Call LLM with streaming thinking
-    report, usage = await llm.complete_structured_streaming(
-        system=AGGREGATION_SYSTEM,
-        user=user_prompt,
-        response_schema=AggregatedReport,
-        model=model,
-        thinking="low",
-        on_thinking=on_thinking,
-    )
+    # The user prompt already embeds every extraction, so it fully keys the result
+    cache_key = llm_cache.make_key("aggregation", model, AGGREGATION_SYSTEM, user_prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Aggregation cache hit (%d documents)", len(extractions))
+        report = AggregatedReport.model_validate_json(cached)
+        usage = dict(llm_cache.CACHED_USAGE)
+    else:
+        # Call LLM with streaming thinking
+        report, usage = await llm.complete_structured_streaming(
+            system=AGGREGATION_SYSTEM,
+            user=user_prompt,
+            response_schema=AggregatedReport,
+            model=model,
+            thinking="low",
+            on_thinking=on_thinking,
+        )
+        llm_cache.set(cache_key, report.model_dump_json())
 
     # Ensure source_documents includes all analyzed docs
     if not report.source_documents:
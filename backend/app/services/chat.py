@@ -1,81 +1,306 @@
 # backend/app/services/chat.py
 # Post-analysis Q&A chat with full document context
 # Uses streaming LLM responses with source document citations
-# Related: llm.py, prompts/chat.py, models/schemas.py
+# Safe to run concurrently with evaluate_report — the documents-block cache is
+# only touched synchronously (no await between lookup and insert)
+# Related: llm.py, chat_batcher.py, prompts/chat.py, models/schemas.py
 
+import asyncio
+import hashlib
 import logging
-from typing import AsyncIterator
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import islice
+from operator import attrgetter
+from typing import AsyncIterator, Optional
+
+from pydantic import TypeAdapter
 
 from app.models.schemas import AggregatedReport, ChatMessage
-from app.prompts.chat import CHAT_SYSTEM
+from app.prompts.chat import CHAT_SYSTEM_HEAD, CHAT_SYSTEM_MID, CHAT_SYSTEM_TAIL
+from app.services import llm_cache
+from app.services.chat_batcher import ChatBatcher
 from app.services.llm import LLMClient
 from app.services.parser import ParsedDocument
 
 logger = logging.getLogger(__name__)
 
 MAX_HISTORY_MESSAGES = 20
+# History budget in estimated tokens (len // 4); MAX_HISTORY_MESSAGES still caps the count
+MAX_HISTORY_TOKENS = 8000
+
+# Documents don't change between chat turns — reuse their rendered block.
+# Keyed by _docs_signature(); values are (block, SHA-256 of the block);
+# least recently used first.
+_DOCS_BLOCK_CACHE_SIZE = 8
+_docs_block_cache: OrderedDict[tuple, tuple[str, str]] = OrderedDict()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Template changes must not reuse prompts or answers built from the old one
+_CHAT_TEMPLATE_DIGEST = _digest(
+    "\x1f".join((CHAT_SYSTEM_HEAD, CHAT_SYSTEM_MID, CHAT_SYSTEM_TAIL))
+)
+
+
+def _docs_signature(documents: list[ParsedDocument]) -> tuple:
+    """Content-based cache key (documents are re-read from the DB per request)."""
+    return tuple(
+        (d.filename, d.page_count, len(d.content), hash(d.content))
+        for d in documents
+    )
+
+
+def _format_documents(documents: list[ParsedDocument]) -> str:
+    """Render documents as markdown sections; "" for no documents.
+
+    One join over a generator — the result is allocated once.
+    """
+    return "\n\n".join(
+        f"### {doc.filename} ({doc.page_count} psl.)\n{doc.content}\n---"
+        for doc in documents
+    )
+
+
+def _build_documents_block(documents: list[ParsedDocument]) -> tuple[str, str]:
+    """Render all documents as markdown sections, cached across turns.
+
+    Returns (block, digest); the digest stands in for the block in cache
+    keys, so it is hashed once per distinct document set, not per turn.
+    Sorted by filename so the prompt prefix is identical turn to turn
+    whatever order the DB returns — providers can reuse the cached prefill.
+    """
+    documents = sorted(documents, key=attrgetter("filename"))
+    key = _docs_signature(documents)
+    cached = _docs_block_cache.get(key)
+    if cached is not None:
+        _docs_block_cache.move_to_end(key)
+        return cached
+
+    block = _format_documents(documents)
+    cached = (block, _digest(block))
+    _docs_block_cache[key] = cached
+    if len(_docs_block_cache) > _DOCS_BLOCK_CACHE_SIZE:
+        _docs_block_cache.popitem(last=False)
+    return cached
+
+
+# Assembled system prompts, keyed by the context digest (template + documents
+# digest + report). Keys stay 64 chars however large the documents are.
+_system_prompt_cache: OrderedDict[str, str] = OrderedDict()
+
+
+def _build_system_prompt(
+    report_json: str, documents_text: str, documents_digest: str
+) -> tuple[str, str]:
+    """Fill the CHAT_SYSTEM sections, cached across turns.
+
+    Returns (system prompt, context digest). The digest identifies the whole
+    prompt and is reused as the llm_cache context key.
+    """
+    digest = hashlib.sha256(_CHAT_TEMPLATE_DIGEST.encode())
+    digest.update(documents_digest.encode())
+    digest.update(report_json.encode("utf-8"))
+    key = digest.hexdigest()
+
+    system = _system_prompt_cache.get(key)
+    if system is not None:
+        _system_prompt_cache.move_to_end(key)
+        return system, key
+
+    system = "".join((
+        CHAT_SYSTEM_HEAD,
+        report_json,
+        CHAT_SYSTEM_MID,
+        documents_text,
+        CHAT_SYSTEM_TAIL,
+    ))
+    _system_prompt_cache[key] = system
+    if len(_system_prompt_cache) > _DOCS_BLOCK_CACHE_SIZE:
+        _system_prompt_cache.popitem(last=False)
+    return system, key
+
+
+# Built once — dump_json reuses the compiled core serializer directly
+_REPORT_ADAPTER = TypeAdapter(AggregatedReport)
+
+# Stream fragments are merged into chunks of up to this many chars, or
+# whatever arrived within COALESCE_MAX_DELAY seconds — fewer SSE frames.
+COALESCE_MAX_CHARS = 64
+COALESCE_MAX_DELAY = 0.03
+
+
+async def _coalesce(
+    stream: AsyncIterator[str], max_chars: int, max_delay: float
+) -> AsyncIterator[str]:
+    """Merge small stream fragments; max_chars <= 0 passes chunks through."""
+    if max_chars <= 0:
+        async for chunk in stream:
+            yield chunk
+        return
+
+    it = stream.__aiter__()
+    buf: list[str] = []
+    size = 0
+    deadline = 0.0
+    # One pending __anext__ is kept across timeouts — cancelling it would
+    # tear down the underlying LLM stream
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(it.__anext__())
+            timeout = max(0.0, deadline - time.monotonic()) if buf else None
+            done, _ = await asyncio.wait((pending,), timeout=timeout)
+            if not done:
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if not buf:
+                deadline = time.monotonic() + max_delay
+            buf.append(chunk)
+            size += len(chunk)
+            if size >= max_chars:
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+
+        if buf:
+            yield "".join(buf)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def _pending_questions(history: Sequence[ChatMessage]) -> int:
+    """Count the trailing user turns — questions not answered yet.
+
+    The router saves a question before reading the history back, so the
+    history ends with this question (and any asked concurrently). They are
+    left out: the current question is sent once, after the history, and
+    concurrent askers see the same history and can share a batch.
+    """
+    count = 0
+    for msg in reversed(history):
+        if msg.role != "user":
+            break
+        count += 1
+    return count
+
+
+def _normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question for cache keys."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
 
 
 class ChatService:
-    def __init__(self, llm: LLMClient):
+    def __init__(
+        self,
+        llm: LLMClient,
+        coalesce_chars: int = COALESCE_MAX_CHARS,
+        coalesce_delay: float = COALESCE_MAX_DELAY,
+        batcher: Optional[ChatBatcher] = None,
+    ):
         self.llm = llm
+        self.coalesce_chars = coalesce_chars
+        self.coalesce_delay = coalesce_delay
+        self.batcher = batcher
 
     async def answer(
         self,
         question: str,
         report: AggregatedReport,
         documents: list[ParsedDocument],
-        history: list[ChatMessage],
+        history: Sequence[ChatMessage],
         model: str,
     ) -> AsyncIterator[str]:
         """
         Streaming Q&A response about a completed analysis.
 
         System prompt construction:
-        1. Format CHAT_SYSTEM with:
+        1. Fill the CHAT_SYSTEM sections with:
            - report_json: report serialized as JSON
            - documents_markdown: all doc contents with headers
              "### {filename} ({page_count} psl.)\\n{content}\\n---"
         2. Build messages list:
-           - Last MAX_HISTORY_MESSAGES from history as user/assistant pairs
+           - Newest history messages as user/assistant pairs, within
+             MAX_HISTORY_TOKENS (len // 4 estimate) and MAX_HISTORY_MESSAGES,
+             without the trailing unanswered questions
            - Current question as final user message
-        3. Call llm.complete_streaming()
-        4. Yield text chunks
+        3. Call llm.complete_streaming() — skipped when llm_cache holds an
+           answer for the same context and normalized question; routed
+           through the batcher when one is set
+        4. Yield text chunks, coalesced up to coalesce_chars / coalesce_delay
 
         The full context (report + all docs) goes in system prompt.
         History + question go in messages.
         """
-        # Build system prompt with full context
-        report_json = report.model_dump_json(indent=2)
-
-        docs_markdown = []
-        for doc in documents:
-            docs_markdown.append(
-                f"### {doc.filename} ({doc.page_count} psl.)\n{doc.content}\n---"
-            )
-        documents_text = "\n\n".join(docs_markdown)
+        # Build system prompt with full context. Serialization runs in
+        # pydantic-core (Rust) — model_dump() + orjson would add a dict pass.
+        report_json = _REPORT_ADAPTER.dump_json(report, indent=2).decode()
+        documents_text, documents_digest = _build_documents_block(documents)
 
-        system = CHAT_SYSTEM.format(
-            report_json=report_json,
-            documents_markdown=documents_text,
+        system, context_key = _build_system_prompt(
+            report_json, documents_text, documents_digest
         )
 
-        # Build messages from history + current question
+        # Build messages from the newest history that fits MAX_HISTORY_TOKENS
+        # (at most MAX_HISTORY_MESSAGES) + current question
         messages: list[dict] = []
-        recent_history = (
-            history[-MAX_HISTORY_MESSAGES:]
-            if len(history) > MAX_HISTORY_MESSAGES
-            else history
-        )
-        for msg in recent_history:
+        tokens = 0
+        pending = _pending_questions(history)
+        for msg in islice(reversed(history), pending, pending + MAX_HISTORY_MESSAGES):
+            tokens += max(1, len(msg.content) >> 2)
+            if tokens > MAX_HISTORY_TOKENS:
+                break
             messages.append({"role": msg.role, "content": msg.content})
-        messages.append({"role": "user", "content": question})
-
-        # Stream response
-        async for chunk in self.llm.complete_streaming(
-            system=system,
-            messages=messages,
-            model=model,
-            thinking="medium",
-        ):
+        messages.reverse()
+
+        # Same report, documents and (normalized) question → same answer.
+        # History stays out of the key: the router saves each question before
+        # reading the history back, so it grows every turn and never repeats.
+        cache_key = llm_cache.make_key(
+            "chat", model, context_key, _normalize_question(question)
+        )
+        cached = llm_cache.get(cache_key)
+        if cached and cached.strip():
+            logger.info("Chat answer cache hit")
+            yield cached
+            return
+
+        if self.batcher is not None:
+            # Concurrent questions on the same context may share one request
+            stream = self.batcher.submit(system, messages, question, model)
+        else:
+            messages.append({"role": "user", "content": question})
+            stream = self.llm.complete_streaming(
+                system=system,
+                messages=messages,
+                model=model,
+                thinking="medium",
+            )
+
+        # Stream response, merging tiny fragments into fewer chunks
+        parts: list[str] = []
+        async for chunk in _coalesce(stream, self.coalesce_chars, self.coalesce_delay):
+            parts.append(chunk)
             yield chunk
+
+        # Only complete, non-empty answers are cached — an empty stream is a
+        # failure, and replaying it would pin it for the whole TTL
+        answer = "".join(parts)
+        if answer.strip():
+            llm_cache.set(cache_key, answer)
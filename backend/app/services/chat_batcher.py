@@ -0,0 +1,277 @@
+# backend/app/services/chat_batcher.py
+# Micro-batching for concurrent chat questions about the same analysis
+# answer() calls sharing system prompt, history and model within a short window
+# become one multi-question LLM request; the stream is split back per caller
+# Enabled by settings.chat_batch_enabled (off by default)
+# Related: chat.py, llm.py, prompts/chat.py, config.py
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.config import get_settings
+from app.prompts.chat import CHAT_BATCH_QUESTION, CHAT_BATCH_USER
+from app.services.llm import LLMClient
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 8
+
+_MARKER_RE = re.compile(r"<\|ans (\d+)\|>")
+# Tail of the buffer that may be the start of a marker split across chunks
+_PARTIAL_MARKER_RE = re.compile(r"<(?:\|(?:a(?:n(?:s(?: \d*\|?)?)?)?)?)?$")
+
+# End-of-answer sentinel on a caller's queue
+_DONE = object()
+
+
+@dataclass
+class _Batch:
+    """Questions waiting for one LLM call; queues[i] receives answer i."""
+
+    key: tuple
+    system: str
+    messages: list[dict]
+    model: str
+    questions: list[str] = field(default_factory=list)
+    queues: list[asyncio.Queue] = field(default_factory=list)
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class _AnswerSplitter:
+    """Routes a multi-answer stream to per-question queues by <|ans N|> markers.
+
+    Text outside any marker is dropped — it may belong to any question, so
+    it is never shown to a caller. `unanswered()` lists the callers that got
+    no text and need an individual request.
+    """
+
+    def __init__(self, queues: list[asyncio.Queue]):
+        self.queues = queues
+        self.buf = ""
+        self.current: int | None = None
+        self.started = [False] * len(queues)
+
+    def feed(self, text: str) -> None:
+        self.buf += text
+        while (m := _MARKER_RE.search(self.buf)) is not None:
+            self._emit(self.buf[: m.start()])
+            idx = int(m.group(1)) - 1
+            self.current = idx if 0 <= idx < len(self.queues) else None
+            self.buf = self.buf[m.end():]
+        partial = _PARTIAL_MARKER_RE.search(self.buf)
+        cut = partial.start() if partial else len(self.buf)
+        self._emit(self.buf[:cut])
+        self.buf = self.buf[cut:]
+
+    def close(self) -> None:
+        self._emit(self.buf)
+        self.buf = ""
+
+    def unanswered(self) -> list[int]:
+        return [i for i, started in enumerate(self.started) if not started]
+
+    def _emit(self, text: str) -> None:
+        if not text or self.current is None:
+            return
+        if not self.started[self.current]:
+            text = text.lstrip()
+            if not text:
+                return
+            self.started[self.current] = True
+        self.queues[self.current].put_nowait(text)
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator[str]:
+    """Yield one caller's chunks until its sentinel; re-raise batch failures."""
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+class ChatBatcher:
+    """Collects concurrent questions for `window` seconds, then asks them at once.
+
+    Only calls with the same (model, system prompt, history) are merged, so
+    the batch shares one prefill of the report + documents context. A lone
+    question is sent as a normal chat request.
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        window: float = 0.2,
+        max_batch: int = MAX_BATCH_SIZE,
+    ):
+        self.llm = llm
+        self.window = window
+        self.max_batch = max_batch
+        self._open: dict[tuple, _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        system: str,
+        messages: list[dict],
+        question: str,
+        model: str,
+    ) -> AsyncIterator[str]:
+        """Queue a question; returns the stream of its answer chunks.
+
+        `messages` is the history without the current question.
+        """
+        key = (model, system, tuple((m["role"], m["content"]) for m in messages))
+        batch = self._open.get(key)
+        if batch is None:
+            batch = _Batch(key=key, system=system, messages=messages, model=model)
+            self._open[key] = batch
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        batch.questions.append(question)
+        batch.queues.append(queue)
+        if len(batch.questions) >= self.max_batch:
+            self._close_batch(batch)
+            batch.full.set()
+        return _drain(queue)
+
+    def _close_batch(self, batch: _Batch) -> None:
+        """Stop new questions from joining `batch`."""
+        if self._open.get(batch.key) is batch:
+            del self._open[batch.key]
+
+    async def _run(self, batch: _Batch) -> None:
+        try:
+            await asyncio.wait_for(batch.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        self._close_batch(batch)
+
+        try:
+            if len(batch.questions) == 1:
+                await self._ask_one(batch)
+            else:
+                logger.info("Chat batch: %d questions in one request", len(batch.questions))
+                await self._ask_many(batch)
+        except asyncio.CancelledError as e:
+            self._fail(batch, e)
+            raise
+        except Exception as e:
+            logger.error("Chat batch failed: %s", e)
+            self._fail(batch, e)
+        else:
+            for q in batch.queues:
+                q.put_nowait(_DONE)
+
+    async def _ask_one(self, batch: _Batch, index: int = 0) -> None:
+        """Ask question `index` of the batch on its own."""
+        queue = batch.queues[index]
+        stream = self.llm.complete_streaming(
+            system=batch.system,
+            messages=batch.messages + [{"role": "user", "content": batch.questions[index]}],
+            model=batch.model,
+            thinking="medium",
+        )
+        async for chunk in stream:
+            queue.put_nowait(chunk)
+
+    async def _ask_many(self, batch: _Batch) -> None:
+        questions = "\n".join(
+            CHAT_BATCH_QUESTION.format(n=n, question=q)
+            for n, q in enumerate(batch.questions, start=1)
+        )
+        stream = self.llm.complete_streaming(
+            system=batch.system,
+            messages=batch.messages + [
+                {"role": "user", "content": CHAT_BATCH_USER.format(questions=questions)}
+            ],
+            model=batch.model,
+            thinking="medium",
+        )
+        splitter = _AnswerSplitter(batch.queues)
+        async for chunk in stream:
+            splitter.feed(chunk)
+        splitter.close()
+
+        # Questions the model skipped (or a reply with no markers at all)
+        # are asked again individually
+        unanswered = splitter.unanswered()
+        if not unanswered:
+            return
+        logger.warning(
+            "Chat batch: %d/%d answers missing, asking individually",
+            len(unanswered), len(batch.questions),
+        )
+        results = await asyncio.gather(
+            *(self._ask_one(batch, i) for i in unanswered), return_exceptions=True
+        )
+        for i, result in zip(unanswered, results):
+            if isinstance(result, Exception):
+                # Only this caller fails; _DONE queued after it is never read
+                batch.queues[i].put_nowait(result)
+            elif isinstance(result, BaseException):
+                raise result
+
+    @staticmethod
+    def _fail(batch: _Batch, error: BaseException) -> None:
+        for q in batch.queues:
+            q.put_nowait(error)
+
+    async def close(self, wait: bool = False) -> None:
+        """Close the LLM client; in-flight batches are cancelled unless `wait`."""
+        if not wait:
+            for task in list(self._tasks):
+                task.cancel()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._open.clear()
+        await self.llm.close()
+
+
+# api_key → batcher, least recently used first. Each owns a long-lived
+# LLMClient so one request's client being closed never cuts off another
+# caller's answer; at most MAX_BATCHERS are kept, the oldest is closed.
+MAX_BATCHERS = 16
+_batchers: OrderedDict[str, ChatBatcher] = OrderedDict()
+_closing: set[asyncio.Task] = set()
+
+
+def get_chat_batcher(api_key: str) -> ChatBatcher:
+    """Shared batcher for an API key, created on first use."""
+    batcher = _batchers.get(api_key)
+    if batcher is not None:
+        _batchers.move_to_end(api_key)
+        return batcher
+
+    settings = get_settings()
+    batcher = ChatBatcher(
+        LLMClient(api_key=api_key, default_model=settings.default_model),
+        window=settings.chat_batch_window_ms / 1000,
+    )
+    _batchers[api_key] = batcher
+    if len(_batchers) > MAX_BATCHERS:
+        # Callers submit without awaiting after get_chat_batcher, so the
+        # evicted batcher gets no new questions; its open batches finish first
+        _, evicted = _batchers.popitem(last=False)
+        task = asyncio.create_task(evicted.close(wait=True))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    return batcher
+
+
+async def close_chat_batchers() -> None:
+    """Shut down all batchers (app shutdown)."""
+    batchers = list(_batchers.values())
+    _batchers.clear()
+    for batcher in batchers:
+        await batcher.close()
+    await asyncio.gather(*_closing, return_exceptions=True)
@@ -1,23 +1,69 @@
 # backend/app/services/evaluator.py
 # QA completeness checker for aggregated reports
 # Scores report quality, identifies missing fields and conflicts
+# Concurrent calls (e.g. gathered with ChatService.answer) share only the
+# lru_cache'd doc list and llm_cache, both updated synchronously
 # Related: llm.py, models/schemas.py, prompts/evaluation.py
 
 from __future__ import annotations
 
 import json
 import logging
+from functools import lru_cache
 from typing import TYPE_CHECKING, Awaitable, Callable
 
-from app.models.schemas import QAEvaluation
+from pydantic import TypeAdapter
+
+from app.config import get_settings
+from app.models.schemas import AggregatedReport, QAEvaluation
 from app.prompts.evaluation import EVALUATION_SYSTEM, EVALUATION_USER
+from app.services import llm_cache
 
 if TYPE_CHECKING:
-    from app.models.schemas import AggregatedReport, SourceDocument
+    from app.models.schemas import SourceDocument
     from app.services.llm import LLMClient
 
 logger = logging.getLogger(__name__)
 
+# Built once — dump_json reuses the compiled core serializer directly
+_REPORT_ADAPTER = TypeAdapter(AggregatedReport)
+
+# Core report fields checked in Python before the QA call. In fast mode a
+# report missing at least FAST_PATH_MIN_MISSING of them is scored locally.
+_STRUCTURAL_FIELDS = (
+    "project_summary",
+    "procuring_organization",
+    "procurement_type",
+    "estimated_value",
+    "deadlines",
+    "key_requirements",
+    "qualification_requirements",
+    "evaluation_criteria",
+    "submission_requirements",
+    "source_documents",
+)
+FAST_PATH_MIN_MISSING = 5
+FAST_PATH_SCORE = 0.15
+
+
+def _structural_missing(report: AggregatedReport) -> list[str]:
+    """Names of core fields that are None or empty, in _STRUCTURAL_FIELDS order."""
+    return [name for name in _STRUCTURAL_FIELDS if not getattr(report, name)]
+
+
+@lru_cache(maxsize=64)
+def _format_doc_list(docs: tuple[tuple[str, str, int | None], ...]) -> str:
+    """Numbered "1. name (type, N psl.)" list from (filename, type, pages) tuples.
+
+    Cached so re-evaluating the same document set (retries) reuses the string.
+    """
+    if not docs:
+        return "(nėra dokumentų)"
+    return "\n".join(
+        f"{idx}. {filename} ({doc_type}{f', {pages} psl.' if pages else ''})"
+        for idx, (filename, doc_type, pages) in enumerate(docs, start=1)
+    )
+
 
 async def evaluate_report(
     report: AggregatedReport,
@@ -25,11 +71,15 @@ async def evaluate_report(
     llm: LLMClient,
     model: str,
     on_thinking: Callable[[str], Awaitable[None]] | None = None,
+    fast_mode: bool | None = None,
 ) -> tuple[QAEvaluation, dict]:
     """
     Evaluate report quality and completeness.
 
     Steps:
+    0. fast_mode (default: settings.evaluation_fast_path): if the report is
+       missing FAST_PATH_MIN_MISSING+ core fields, return a local evaluation
+       with zero usage and skip the LLM
     1. Serialize report to JSON
     2. Format document list
     3. Call llm.complete_structured() with EVALUATION_SYSTEM prompt
@@ -38,16 +88,37 @@ async def evaluate_report(
     """
     logger.info("Evaluating report with %d source documents", len(documents))
 
-    # Serialize report to JSON
-    report_json = report.model_dump_json(indent=2, exclude_none=True)
+    if fast_mode is None:
+        fast_mode = get_settings().evaluation_fast_path
+    if fast_mode:
+        missing = _structural_missing(report)
+        if len(missing) >= FAST_PATH_MIN_MISSING:
+            logger.info(
+                "Evaluation fast path: %d core fields missing, skipping LLM",
+                len(missing),
+            )
+            evaluation = QAEvaluation(
+                completeness_score=FAST_PATH_SCORE,
+                missing_fields=missing,
+                suggestions=[
+                    "Ataskaitoje trūksta esminių duomenų — patikrinkite, "
+                    "ar pateikti visi pirkimo dokumentai"
+                ],
+            )
+            return evaluation, {"input_tokens": 0, "output_tokens": 0}
+
+    # Serialize report to JSON. Kept on pydantic-core's Rust serializer: an
+    # orjson or msgspec swap needs a model_dump() dict first (or a parallel
+    # Struct mirror of every schema) and would change the bytes that key the
+    # evaluation cache.
+    report_json = _REPORT_ADAPTER.dump_json(
+        report, indent=2, exclude_none=True
+    ).decode()
 
     # Format document list
-    doc_lines: list[str] = []
-    for idx, doc in enumerate(documents, start=1):
-        pages_str = f", {doc.pages} psl." if doc.pages else ""
-        doc_lines.append(f"{idx}. {doc.filename} ({doc.type.value}{pages_str})")
-
-    document_list = "\n".join(doc_lines) if doc_lines else "(nėra dokumentų)"
+    document_list = _format_doc_list(
+        tuple((doc.filename, doc.type.value, doc.pages) for doc in documents)
+    )
 
     # Format user prompt
     user_prompt = EVALUATION_USER.format(
@@ -61,16 +132,25 @@ async def evaluate_report(
         len(documents),
     )
 
-    # Call LLM with thinking="medium" — QA is simpler, less accuracy needed
-    evaluation, usage = await llm.complete_structured_streaming(
-        system=EVALUATION_SYSTEM,
-        user=user_prompt,
-        response_schema=QAEvaluation,
-        model=model,
-        thinking="low",
-        max_tokens=4000,
-        on_thinking=on_thinking,
-    )
+    # Report JSON + document list are both in the user prompt — it keys the result
+    cache_key = llm_cache.make_key("evaluation", model, EVALUATION_SYSTEM, user_prompt)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Evaluation cache hit")
+        evaluation = QAEvaluation.model_validate_json(cached)
+        usage = dict(llm_cache.CACHED_USAGE)
+    else:
+        # Call LLM with thinking="medium" — QA is simpler, less accuracy needed
+        evaluation, usage = await llm.complete_structured_streaming(
+            system=EVALUATION_SYSTEM,
+            user=user_prompt,
+            response_schema=QAEvaluation,
+            model=model,
+            thinking="low",
+            max_tokens=4000,
+            on_thinking=on_thinking,
+        )
+        llm_cache.set(cache_key, evaluation.model_dump_json())
 
     logger.info(
         "Evaluation complete: score=%.2f, missing=%d, conflicts=%d, suggestions=%d",
@@ -149,10 +149,11 @@ async def export_pdf(
     report: AggregatedReport,
     qa: QAEvaluation,
     model_used: str = "",
+    output_dir: Path | None = None,
 ) -> Path:
     """
     Generate PDF report using reportlab.
-    Returns path to generated PDF file.
+    Returns path to generated PDF file (in output_dir, default: system temp).
     """
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -230,7 +231,7 @@ async def export_pdf(
 
     # Create temp file
     tmp = tempfile.NamedTemporaryFile(
-        suffix=".pdf", prefix="procurement_report_", delete=False
+        suffix=".pdf", prefix="procurement_report_", dir=output_dir, delete=False
     )
     tmp.close()
     pdf_path = Path(tmp.name)
@@ -689,17 +690,18 @@ async def export_docx(
     report: AggregatedReport,
     qa: QAEvaluation,
     model_used: str = "",
+    output_dir: Path | None = None,
 ) -> Path:
     """
     Generate DOCX report using python-docx.
-    Returns path to generated DOCX file.
+    Returns path to generated DOCX file (in output_dir, default: system temp).
     """
     from docx import Document
     from docx.shared import Inches, Pt, RGBColor
     from docx.enum.text import WD_ALIGN_PARAGRAPH
 
     tmp = tempfile.NamedTemporaryFile(
-        suffix=".docx", prefix="procurement_report_", delete=False
+        suffix=".docx", prefix="procurement_report_", dir=output_dir, delete=False
     )
     tmp.close()
     docx_path = Path(tmp.name)
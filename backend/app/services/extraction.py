@@ -4,6 +4,7 @@
 # Related: llm.py, parser.py, prompts/extraction.py, models/schemas.py
 
 import asyncio
+import hashlib
 import json
 import logging
 from typing import Awaitable, Callable, Optional
@@ -11,6 +12,7 @@ from typing import Awaitable, Callable, Optional
 from app.models.schemas import ExtractionResult
 from app.prompts.extraction import EXTRACTION_SYSTEM, EXTRACTION_USER
 from app.prompts.extraction_ocr import EXTRACTION_OCR_USER
+from app.services import llm_cache
 from app.services.llm import OPENROUTER_MAX_FILE_SIZE, LLMClient, build_multimodal_content
 from app.services.parser import ParsedDocument
 
@@ -384,6 +386,36 @@ async def extract_document(
         return empty, {"input_tokens": 0, "output_tokens": 0}
 
 
+def _extraction_cache_key(
+    doc: ParsedDocument, model: str, context_length: int
+) -> str | None:
+    """Cache key over model, prompts, chunking budget and document content.
+
+    Scanned documents are keyed by file bytes (their text content is empty).
+    Returns None when the document can't be keyed reliably.
+    """
+    if doc.is_scanned:
+        if not doc.file_path or not doc.file_path.exists():
+            return None
+        with open(doc.file_path, "rb") as f:
+            content_hash = "file:" + hashlib.file_digest(f, "sha256").hexdigest()
+    else:
+        content_hash = hashlib.sha256(doc.content.encode("utf-8")).hexdigest()
+
+    return llm_cache.make_key(
+        "extraction",
+        model,
+        EXTRACTION_SYSTEM,
+        EXTRACTION_USER,
+        EXTRACTION_OCR_USER,
+        str(context_length),
+        doc.filename,
+        doc.doc_type.value,
+        str(doc.page_count),
+        content_hash,
+    )
+
+
 async def extract_all(
     docs: list[ParsedDocument],
     llm: LLMClient,
@@ -436,6 +468,21 @@ async def extract_all(
             if on_started:
                 on_started(index, doc.filename)
             try:
+                # Hashing a scanned file reads it whole — keep that off the event loop
+                if doc.is_scanned:
+                    cache_key = await asyncio.to_thread(
+                        _extraction_cache_key, doc, model, context_length,
+                    )
+                else:
+                    cache_key = _extraction_cache_key(doc, model, context_length)
+                cached = llm_cache.get(cache_key) if cache_key else None
+                if cached is not None:
+                    logger.info("Extraction cache hit for %s", doc.filename)
+                    usage = dict(llm_cache.CACHED_USAGE)
+                    if on_completed:
+                        on_completed(index, doc.filename, usage)
+                    return (index, (doc, ExtractionResult.model_validate_json(cached), usage))
+
                 result, usage = await extract_document(doc, llm, model, context_length=context_length, on_thinking=on_thinking)
 
                 # Check if extract_document already handled the error internally
@@ -447,6 +494,8 @@ async def extract_all(
                     if on_error:
                         on_error(index, doc.filename, result.confidence_notes[0])
                 else:
+                    if cache_key:
+                        llm_cache.set(cache_key, result.model_dump_json())
                     if on_completed:
                         on_completed(index, doc.filename, usage)
 
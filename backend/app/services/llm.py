@@ -14,6 +14,7 @@ from typing import AsyncIterator, Awaitable, Callable, Optional
 
 import httpx
 from pydantic import BaseModel
+from pydantic_core import from_json
 
 logger = logging.getLogger(__name__)
 
@@ -550,7 +551,13 @@ def _compact_schema_hint(schema: dict) -> str:
 
 
 class LLMClient:
-    def __init__(self, api_key: str, default_model: str = "anthropic/claude-sonnet-4"):
+    def __init__(
+        self,
+        api_key: str,
+        default_model: str = "anthropic/claude-sonnet-4",
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """`transport` replaces the network layer (tests pass httpx.MockTransport)."""
         self.api_key = api_key
         self.default_model = default_model
         self._client = httpx.AsyncClient(
@@ -561,6 +568,7 @@ class LLMClient:
                 "X-Title": "FoxDoc",
             },
             timeout=httpx.Timeout(300.0, connect=10.0),
+            transport=transport,
         )
 
     # ── Internal helpers ───────────────────────────────────────────────────
@@ -968,9 +976,10 @@ class LLMClient:
             content_clean = _extract_json(full_content)
 
             # Check for truncated/incomplete JSON before expensive validation
+            # (jiter syntax pass — no json.loads dict round-trip)
             try:
-                json.loads(content_clean)
-            except json.JSONDecodeError as json_err:
+                from_json(content_clean)
+            except ValueError as json_err:
                 logger.warning(
                     "Streaming returned incomplete JSON for %s (%d chars: %.100s...), "
                     "falling back to non-streaming: %s",
@@ -1140,6 +1149,7 @@ class LLMClient:
 
     async def complete_streaming(
         self,
+        *,
         system: str,
         messages: list[dict],
         model: str | None = None,
@@ -1149,6 +1159,8 @@ class LLMClient:
         Streaming text response for chat Q&A.
         Yields text chunks as they arrive.
         Uses server-sent events from OpenRouter.
+        Keyword-only: system and messages are both prompt text and easy to
+        swap positionally.
         """
         full_messages = [{"role": "system", "content": system}] + messages
 
@@ -0,0 +1,74 @@
+# backend/app/services/llm_cache.py
+# Content-addressed on-disk cache for LLM results (extraction, aggregation, evaluation)
+# Keys are SHA-256 over (model, prompt templates, input content); values are JSON strings
+# Related: extraction.py, aggregation.py, evaluator.py, config.py
+
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+
+from app.config import get_settings, private_dir
+
+logger = logging.getLogger(__name__)
+
+# Usage dict returned for cache hits — no tokens were spent
+CACHED_USAGE: dict = {"input_tokens": 0, "output_tokens": 0, "cached": True}
+
+
+def make_key(*parts: str) -> str:
+    """Build a cache key from ordered string parts (model, prompts, content...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")  # unit separator — keeps ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def _cache_dir() -> Path:
+    """settings.llm_cache_dir (default <temp_dir>/llm_cache), private to this user.
+
+    Raises OSError if the directory can't be used safely — anyone able to
+    write it could poison cached extraction and aggregation results.
+    """
+    settings = get_settings()
+    path = settings.llm_cache_dir or Path(settings.temp_dir) / "llm_cache"
+    return private_dir(path)
+
+
+def get(key: str) -> str | None:
+    """Return the cached value for key, or None if missing, expired or disabled."""
+    if not get_settings().llm_cache_enabled:
+        return None
+    try:
+        path = _cache_dir() / f"{key}.json"
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.debug("Ignoring unreadable LLM cache entry %s: %s", key, e)
+        return None
+
+    if entry.get("expires_at", 0) < time.time():
+        path.unlink(missing_ok=True)
+        return None
+    return entry.get("value")
+
+
+def set(key: str, value: str) -> None:
+    """Store value under key with the configured TTL. Failures are logged, not raised."""
+    settings = get_settings()
+    if not settings.llm_cache_enabled:
+        return
+    entry = {
+        "expires_at": time.time() + settings.llm_cache_ttl_hours * 3600,
+        "value": value,
+    }
+    try:
+        cache_dir = _cache_dir()
+        tmp = cache_dir / f"{key}.json.tmp"
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(cache_dir / f"{key}.json")
+    except OSError as e:
+        logger.debug("Failed to write LLM cache entry %s: %s", key, e)
@@ -4,13 +4,20 @@
 # Related: models/schemas.py, services/zip_extractor.py
 
 import asyncio
+import hashlib
+import importlib.metadata
+import json
 import logging
+import os
 import re
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Callable, Optional
 
+from app.config import get_settings, private_dir
 from app.models.schemas import DocumentType
 
 logger = logging.getLogger(__name__)
@@ -50,6 +57,16 @@ class ParsedDocument:
     token_estimate: int  # len(content) // 4 rough estimate
     file_path: Optional[Path] = None  # original file path for multimodal OCR
     is_scanned: bool = False  # True = empty text, needs vision/OCR extraction
+    # Derived once for the file_parsed event
+    format: str = field(init=False)  # extension without the dot, e.g. "pdf"
+    size_kb: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        # Same rule as Path(filename).suffix, without building a Path
+        base = os.path.basename(self.filename)
+        dot = base.rfind(".")
+        self.format = base[dot + 1:] if 0 < dot < len(base) - 1 else ""
+        self.size_kb = self.file_size_bytes // 1024
 
 
 # ── Fast parsers (pypdf for PDF, python-docx for DOCX) ───────────────────────
@@ -134,65 +151,63 @@ def _parse_docx_fast(file_path: Path) -> tuple[str, int]:
 
 
 def _render_table(table, parts: list[str]) -> None:
-    """Render a python-docx table as markdown."""
-    rows = []
-    for row in table.rows:
-        cells = [cell.text.strip().replace("\n", " ") for cell in row.cells]
-        rows.append(cells)
+    """Render a python-docx table as markdown.
+
+    Rows are padded to the widest row; tables with no cell text are skipped.
+    """
+    rows = [
+        [cell.text.strip().replace("\n", " ") for cell in row.cells]
+        for row in table.rows
+    ]
 
-    if not rows:
+    width = max((len(r) for r in rows), default=0)
+    if width == 0 or not any(any(r) for r in rows):
         return
 
-    # Header row
-    parts.append("| " + " | ".join(rows[0]) + " |")
-    parts.append("| " + " | ".join("---" for _ in rows[0]) + " |")
+    for row in rows:
+        row.extend([""] * (width - len(row)))
 
-    # Data rows
-    for row in rows[1:]:
-        # Pad row to match header column count
-        while len(row) < len(rows[0]):
-            row.append("")
-        parts.append("| " + " | ".join(row[: len(rows[0])]) + " |")
+    # Header row + separator, then data rows
+    parts.append("| " + " | ".join(rows[0]) + " |")
+    parts.append("| " + " | ".join(["---"] * width) + " |")
+    parts.extend("| " + " | ".join(row) + " |" for row in rows[1:])
 
 
 # ── Docling fallback (for images, PPTX, and complex formats) ─────────────────
 
-_converter = None
-
+# One converter per mode (False = plain text, True = OCR), built on first
+# use. Each keeps its own pipelines; conversions are not serialized here —
+# parse_all already caps them at parser_max_concurrent.
+_converters: dict[bool, object] = {}
+_converters_lock = threading.Lock()  # guards construction only
+
+
+def _pdf_format_options(ocr: bool) -> dict:
+    """Build Docling PDF/image format options for plain or OCR (RapidOCR) mode."""
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import (
+        AcceleratorOptions,
+        PdfPipelineOptions,
+        RapidOcrOptions,
+        TableFormerMode,
+        TableStructureOptions,
+    )
+    from docling.document_converter import ImageFormatOption, PdfFormatOption
 
-def _get_converter():
-    """Lazily initialize and cache the Docling DocumentConverter.
+    settings = get_settings()
+    table_opts = TableStructureOptions(mode=TableFormerMode.FAST)
+    accel_opts = AcceleratorOptions(num_threads=os.cpu_count() or 4, device="cpu")
 
-    Only used as fallback for formats not handled by fast parsers
-    (images, PPTX, or when fast parsing fails).
-    """
-    if not DOCLING_AVAILABLE:
-        raise RuntimeError("Docling is not installed — cannot parse this format")
-    global _converter
-    if _converter is None:
-        import os
-
-        from docling.datamodel.base_models import InputFormat
-        from docling.datamodel.pipeline_options import (
-            AcceleratorOptions,
-            PdfPipelineOptions,
-            TableFormerMode,
-            TableStructureOptions,
-        )
-        from docling.document_converter import (
-            DocumentConverter,
-            ImageFormatOption,
-            PdfFormatOption,
+    if ocr:
+        pdf_opts = PdfPipelineOptions(
+            do_ocr=True,
+            ocr_options=RapidOcrOptions(),
+            do_table_structure=True,
+            table_structure_options=table_opts,
+            document_timeout=settings.parser_doc_timeout,
+            accelerator_options=accel_opts,
         )
-
-        from app.config import get_settings
-
-        settings = get_settings()
-        cpu_threads = os.cpu_count() or 4
-
-        table_opts = TableStructureOptions(mode=TableFormerMode.FAST)
-        accel_opts = AcceleratorOptions(num_threads=cpu_threads, device="cpu")
-
+    else:
         pdf_opts = PdfPipelineOptions(
             do_ocr=False,
             do_table_structure=True,
@@ -202,83 +217,77 @@ def _get_converter():
             accelerator_options=accel_opts,
         )
 
-        _converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_opts),
-                InputFormat.IMAGE: ImageFormatOption(pipeline_options=pdf_opts),
-            }
-        )
+    return {
+        InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_opts),
+        InputFormat.IMAGE: ImageFormatOption(pipeline_options=pdf_opts),
+    }
 
-        logger.info(
-            "Docling converter initialized (fallback): table_mode=fast, "
-            "timeout=%ds, threads=%d",
-            settings.parser_doc_timeout,
-            cpu_threads,
-        )
-    return _converter
 
+def _get_converter(ocr: bool = False):
+    """Lazily initialize and cache the Docling DocumentConverter for a mode.
 
-_ocr_converter = None
+    Only used as fallback for formats not handled by fast parsers
+    (images, PPTX, or when fast parsing fails), and with ocr=True for
+    scanned files too large for the multimodal API.
+    """
+    if not DOCLING_AVAILABLE:
+        raise RuntimeError("Docling is not installed — cannot parse this format")
+    converter = _converters.get(ocr)
+    if converter is None:
+        with _converters_lock:
+            converter = _converters.get(ocr)
+            if converter is None:
+                from docling.document_converter import DocumentConverter
 
+                converter = DocumentConverter(format_options=_pdf_format_options(ocr))
+                _converters[ocr] = converter
 
-def _get_ocr_converter():
-    """Lazily initialize Docling converter with OCR enabled (RapidOCR).
+                logger.info(
+                    "Docling %s converter initialized (fallback): table_mode=fast, "
+                    "timeout=%ds, threads=%d",
+                    "OCR" if ocr else "text",
+                    get_settings().parser_doc_timeout,
+                    os.cpu_count() or 4,
+                )
+    return converter
 
-    Used ONLY as fallback for scanned files > 5MB that can't be sent via
-    OpenRouter multimodal API.
-    """
-    if not DOCLING_AVAILABLE:
-        raise RuntimeError("Docling is not installed — OCR not available")
-    global _ocr_converter
-    if _ocr_converter is None:
-        import os
-
-        from docling.datamodel.base_models import InputFormat
-        from docling.datamodel.pipeline_options import (
-            AcceleratorOptions,
-            PdfPipelineOptions,
-            RapidOcrOptions,
-            TableFormerMode,
-            TableStructureOptions,
-        )
-        from docling.document_converter import (
-            DocumentConverter,
-            ImageFormatOption,
-            PdfFormatOption,
-        )
 
-        from app.config import get_settings
+def _convert(file_path: Path, ocr: bool = False):
+    """Run a Docling conversion on the plain or OCR converter."""
+    return _get_converter(ocr).convert(str(file_path))
 
-        settings = get_settings()
-        cpu_threads = os.cpu_count() or 4
 
-        table_opts = TableStructureOptions(mode=TableFormerMode.FAST)
-        accel_opts = AcceleratorOptions(num_threads=cpu_threads, device="cpu")
-        ocr_opts = RapidOcrOptions()
+def _warm_converter(ocr: bool = False) -> None:
+    """Build the plain or OCR converter and load its PDF pipeline models (blocking)."""
+    from docling.datamodel.base_models import InputFormat
 
-        pdf_opts = PdfPipelineOptions(
-            do_ocr=True,
-            ocr_options=ocr_opts,
-            do_table_structure=True,
-            table_structure_options=table_opts,
-            document_timeout=settings.parser_doc_timeout,
-            accelerator_options=accel_opts,
-        )
+    _get_converter(ocr).initialize_pipeline(InputFormat.PDF)
 
-        _ocr_converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_opts),
-                InputFormat.IMAGE: ImageFormatOption(pipeline_options=pdf_opts),
-            }
-        )
 
+async def warmup_parsers() -> None:
+    """Preload Docling models off the event loop so the first request doesn't pay for it.
+
+    Warms the plain converter, and the separate OCR converter too when
+    settings.ocr_enabled. Called from the app lifespan. No-op when Docling
+    is not installed.
+    """
+    if not DOCLING_AVAILABLE:
+        return
+    loop = asyncio.get_running_loop()
+    modes = (False, True) if get_settings().ocr_enabled else (False,)
+    for ocr in modes:
+        label = "OCR" if ocr else "text"
+        start = time.perf_counter()
+        try:
+            await loop.run_in_executor(None, _warm_converter, ocr)
+        except Exception as e:
+            logger.warning(
+                "Docling %s warmup failed (will retry lazily on first use): %s", label, e
+            )
+            continue
         logger.info(
-            "Docling OCR converter initialized: ocr=RapidOCR, "
-            "timeout=%ds, threads=%d",
-            settings.parser_doc_timeout,
-            cpu_threads,
+            "Docling %s warmup complete in %.2fs", label, time.perf_counter() - start
         )
-    return _ocr_converter
 
 
 def parse_with_ocr(file_path: Path) -> tuple[str, int]:
@@ -286,8 +295,9 @@ def parse_with_ocr(file_path: Path) -> tuple[str, int]:
 
     Used as fallback for files > 5MB. Returns (markdown_text, page_count).
     """
-    converter = _get_ocr_converter()
-    result = converter.convert(str(file_path))
+    if not DOCLING_AVAILABLE:
+        raise RuntimeError("Docling is not installed — OCR not available")
+    result = _convert(file_path, ocr=True)
 
     from docling.datamodel.base_models import ConversionStatus
 
@@ -312,10 +322,114 @@ def parse_with_ocr(file_path: Path) -> tuple[str, int]:
     return markdown_text, page_count
 
 
+# ── Docling result cache (content-addressed, on disk) ───────────────────────
+
+# Under settings.temp_dir, private to this user — a file planted in a shared
+# directory would become the parsed content of any upload with that hash
+_DOCLING_CACHE_SUBDIR = "docling_cache"
+# Bump when converter options change in a way that alters the markdown output
+_DOCLING_CACHE_VERSION = "1"
+
+
+@lru_cache(maxsize=1)
+def _docling_version() -> str:
+    """Installed Docling version — part of the cache key, so upgrades miss."""
+    try:
+        return importlib.metadata.version("docling")
+    except importlib.metadata.PackageNotFoundError:
+        return "none"
+
+
+def _docling_cache_key(file_path: Path) -> str:
+    """Hash file contents + Docling version + converter options (streamed, O(1) memory)."""
+    with open(file_path, "rb") as f:
+        digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16))
+    digest.update(
+        f"|{_DOCLING_CACHE_VERSION}|{_docling_version()}"
+        f"|{get_settings().parser_force_backend_text}".encode()
+    )
+    return digest.hexdigest()
+
+
+def _docling_cache_dir() -> Path:
+    """Private cache directory; raises OSError if it can't be used safely."""
+    return private_dir(Path(get_settings().temp_dir) / _DOCLING_CACHE_SUBDIR)
+
+
+def _docling_cache_get(key: str) -> Optional[tuple[str, int]]:
+    try:
+        path = _docling_cache_dir() / f"{key}.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        os.utime(path)  # mark as recently used for eviction
+        return data["md"], data["pages"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        logger.debug("Ignoring unreadable Docling cache entry %s: %s", key, e)
+        return None
+
+
+# Running estimate of the cache directory size; None until the first put
+# scans it. The directory is only listed again when the estimate is over budget.
+_docling_cache_bytes: Optional[int] = None
+_docling_cache_lock = threading.Lock()
+
+
+def _docling_cache_put(key: str, markdown_text: str, page_count: int) -> None:
+    global _docling_cache_bytes
+    data = json.dumps({"md": markdown_text, "pages": page_count}, ensure_ascii=False).encode()
+    max_bytes = get_settings().parser_cache_max_mb * 1024 * 1024
+    try:
+        cache_dir = _docling_cache_dir()
+        tmp = cache_dir / f"{key}.json.tmp"
+        tmp.write_bytes(data)
+        tmp.replace(cache_dir / f"{key}.json")
+        with _docling_cache_lock:
+            if _docling_cache_bytes is not None:
+                _docling_cache_bytes += len(data)
+            if _docling_cache_bytes is None or _docling_cache_bytes > max_bytes:
+                _docling_cache_bytes = _evict_docling_cache(cache_dir, max_bytes)
+    except OSError as e:
+        logger.debug("Failed to write Docling cache entry %s: %s", key, e)
+
+
+def _evict_docling_cache(cache_dir: Path, max_bytes: int) -> int:
+    """Delete least recently used cache entries until under the size budget.
+
+    Returns the size of what is left.
+    """
+    entries = []
+    for path in cache_dir.glob("*.json"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    return total
+
+
 def _parse_with_docling(file_path: Path, file_ext: str) -> tuple[str, int]:
-    """Parse using Docling — fallback for images, PPTX, and complex formats."""
-    converter = _get_converter()
-    result = converter.convert(str(file_path))
+    """Parse using Docling — fallback for images, PPTX, and complex formats.
+
+    Results are cached on disk by content hash when parser_cache_enabled is set,
+    so re-uploaded files skip conversion entirely.
+    """
+    cache_key = None
+    if get_settings().parser_cache_enabled:
+        cache_key = _docling_cache_key(file_path)
+        cached = _docling_cache_get(cache_key)
+        if cached is not None:
+            logger.info("Docling cache hit for %s", file_path.name)
+            return cached
+
+    result = _convert(file_path)
 
     from docling.datamodel.base_models import ConversionStatus
 
@@ -332,20 +446,31 @@ def _parse_with_docling(file_path: Path, file_ext: str) -> tuple[str, int]:
     except Exception:
         page_count = _estimate_pages(markdown_text, file_ext)
 
+    if cache_key is not None:
+        _docling_cache_put(cache_key, markdown_text, page_count)
+
     return markdown_text, page_count
 
 
 # ── Main parse function ──────────────────────────────────────────────────────
 
 
-# Extensions handled by fast parsers (no Docling needed)
+# Extensions handled by fast parsers (no Docling needed) → (parser, name)
+_FAST_HANDLERS: dict[str, tuple[Callable[[Path], tuple[str, int]], str]] = {
+    ".pdf": (_parse_pdf_fast, "pypdf"),
+    ".docx": (_parse_docx_fast, "python-docx"),
+}
 _FAST_PDF_EXTS = {".pdf"}
-_FAST_DOCX_EXTS = {".docx"}
 # Extensions that need Docling (images, PPTX, XLSX)
 _DOCLING_EXTS = {".pptx", ".png", ".tiff", ".jpg", ".jpeg", ".xlsx"}
 # Image extensions — always treated as scanned (need vision/OCR)
 _IMAGE_EXTS = {".png", ".tiff", ".jpg", ".jpeg"}
 
+# Full tracebacks are expensive under bulk failures (corrupt archives) —
+# log one per N parse errors unless DEBUG logging is on
+_TRACEBACK_EVERY_N_ERRORS = 50
+_parse_error_count = 0
+
 
 async def parse_document(file_path: Path, filename: str) -> ParsedDocument:
     """Parse a single document — uses fast parser when possible, Docling as fallback.
@@ -378,46 +503,28 @@ async def parse_document(file_path: Path, filename: str) -> ParsedDocument:
     try:
         loop = asyncio.get_running_loop()
 
-        if file_ext in _FAST_PDF_EXTS:
-            # Fast path: pypdf
-            try:
-                markdown_text, page_count = await loop.run_in_executor(
-                    None, _parse_pdf_fast, file_path
-                )
-                parser_used = "pypdf"
-            except Exception as e:
-                logger.warning(
-                    "pypdf failed for %s (%s), falling back to Docling", filename, e
-                )
-                markdown_text, page_count = await loop.run_in_executor(
-                    None, _parse_with_docling, file_path, file_ext
-                )
-                parser_used = "docling-fallback"
+        handler, parser_used = _FAST_HANDLERS.get(file_ext, (None, "docling"))
+        markdown_text: str | None = None
 
-        elif file_ext in _FAST_DOCX_EXTS:
-            # Fast path: python-docx
+        if handler is not None:
             try:
                 markdown_text, page_count = await loop.run_in_executor(
-                    None, _parse_docx_fast, file_path
+                    None, handler, file_path
                 )
-                parser_used = "python-docx"
             except Exception as e:
                 logger.warning(
-                    "python-docx failed for %s (%s), falling back to Docling",
+                    "%s failed for %s (%s), falling back to Docling",
+                    parser_used,
                     filename,
                     e,
                 )
-                markdown_text, page_count = await loop.run_in_executor(
-                    None, _parse_with_docling, file_path, file_ext
-                )
                 parser_used = "docling-fallback"
 
-        else:
-            # Docling for everything else (images, PPTX, XLSX)
+        if markdown_text is None:
+            # Docling for everything else (images, PPTX, XLSX) or fast-parser failure
             markdown_text, page_count = await loop.run_in_executor(
                 None, _parse_with_docling, file_path, file_ext
             )
-            parser_used = "docling"
 
         elapsed = time.perf_counter() - start
 
@@ -429,19 +536,21 @@ async def parse_document(file_path: Path, filename: str) -> ParsedDocument:
         token_estimate = len(markdown_text) // 4
 
         # Detect scanned documents (empty/near-empty text)
-        from app.config import get_settings
         settings = get_settings()
         is_scanned = False
         if file_ext in _IMAGE_EXTS:
             is_scanned = True
         elif file_ext in _FAST_PDF_EXTS and settings.ocr_enabled:
             char_threshold = page_count * settings.ocr_scanned_threshold
-            if len(markdown_text.strip()) < char_threshold:
-                is_scanned = True
-                logger.info(
-                    "Detected scanned PDF: %s (%d pages, %d chars, threshold=%d)",
-                    filename, page_count, len(markdown_text.strip()), char_threshold,
-                )
+            # Raw length is an upper bound — only strip (and copy) short texts
+            if len(markdown_text) < char_threshold:
+                text_chars = len(markdown_text.strip())
+                if text_chars < char_threshold:
+                    is_scanned = True
+                    logger.info(
+                        "Detected scanned PDF: %s (%d pages, %d chars, threshold=%d)",
+                        filename, page_count, text_chars, char_threshold,
+                    )
 
         logger.info(
             "Parsed %s: %d pages, %d chars, %d est. tokens, type=%s, "
@@ -468,8 +577,20 @@ async def parse_document(file_path: Path, filename: str) -> ParsedDocument:
         )
 
     except Exception as exc:
+        global _parse_error_count
+        _parse_error_count += 1
+        with_traceback = (
+            logger.isEnabledFor(logging.DEBUG)
+            or _parse_error_count % _TRACEBACK_EVERY_N_ERRORS == 1
+        )
         error_content = f"[ERROR] Failed to parse {filename}: {exc}"
-        logger.error("Error parsing %s: %s", filename, exc, exc_info=True)
+        logger.error(
+            "Error parsing %s: %s: %s",
+            filename,
+            type(exc).__name__,
+            exc,
+            exc_info=with_traceback,
+        )
         doc_type = classify_document(filename, "")
         return ParsedDocument(
             filename=filename,
@@ -7,17 +7,20 @@
 import asyncio
 import logging
 import time
-from dataclasses import dataclass
+from contextlib import aclosing
+from dataclasses import dataclass, fields
+from operator import attrgetter
 from pathlib import Path
 
 from app.convex_client import ConvexDB
 from app.models.schemas import AnalysisStatus, SourceDocument
+from app.services.admission import admit
 from app.services.aggregation import aggregate_results
 from app.services.evaluator import evaluate_report
 from app.services.extraction import extract_all
 from app.services.llm import LLMClient
 from app.services.parser import ParsedDocument, parse_all
-from app.services.stream_store import create_stream, remove_stream
+from app.services.stream_store import create_stream, remove_stream, touch_stream
 from app.services.zip_extractor import extract_files
 
 logger = logging.getLogger(__name__)
@@ -47,8 +50,17 @@ KNOWN_CONTEXT_LENGTHS: dict[str, int] = {
 }
 DEFAULT_CONTEXT_LENGTH = 128_000
 
+# Max concurrent Convex writes when saving parsed documents
+DB_WRITE_CONCURRENCY = 10
 
-@dataclass
+# Events queued within this window are written to the DB in one batch
+EVENT_FLUSH_DELAY = 0.1
+
+# Minimum seconds between "thinking_dropped" markers on the live stream
+THINKING_DROP_REPORT_INTERVAL = 1.0
+
+
+@dataclass(slots=True)
 class PipelineMetrics:
     """Tracks token usage, timing, and cost across all pipeline steps."""
 
@@ -64,9 +76,15 @@ class PipelineMetrics:
     tokens_evaluation_output: int = 0
     estimated_cost_usd: float = 0.0
     model_used: str = ""
+    cache_hits: int = 0  # LLM calls served from llm_cache
 
     def to_dict(self) -> dict:
-        return {k: v for k, v in self.__dict__.items()}
+        return dict(zip(_METRIC_FIELDS, _get_metric_values(self)))
+
+
+# Field order and a C-level getter, computed once for to_dict()
+_METRIC_FIELDS: tuple[str, ...] = tuple(f.name for f in fields(PipelineMetrics))
+_get_metric_values = attrgetter(*_METRIC_FIELDS)
 
 
 class AnalysisPipeline:
@@ -99,7 +117,16 @@ class AnalysisPipeline:
         self._api_key = api_key
         self.metrics = PipelineMetrics(model_used=model)
         self._event_index = 0
+        self._event_q: asyncio.Queue[dict] = asyncio.Queue()
+        self._emitter_task: asyncio.Task | None = None
+        self._background_tasks: set[asyncio.Task] = set()
         self._stream_queue = create_stream(analysis_id)
+        self._dropped_thinking = 0
+        self._last_drop_report = 0.0
+        # Kept current by _watch_cancellation; None → read the DB instead
+        # (watch has not delivered its first status yet, or it failed)
+        self._canceled: bool | None = None
+        self._cancel_watch: asyncio.Task | None = None
 
     async def _resolve_context_length(self) -> int:
         """Resolve the context window size for the selected model.
@@ -131,6 +158,7 @@ class AnalysisPipeline:
     async def run(self, upload_paths: list[Path]) -> None:
         """Execute the full analysis pipeline."""
         self.metrics.start_time = time.time()
+        self._cancel_watch = asyncio.create_task(self._watch_cancellation())
 
         # Phase-specific thinking callbacks
         async def extraction_thinking(text: str) -> None:
@@ -158,67 +186,57 @@ class AnalysisPipeline:
                     f"Supported formats: PDF, DOCX, XLSX, PPTX, PNG, TIFF, JPG, ZIP, 7z."
                 )
 
-            # Step 1: Parse all documents
-            await self._check_cancellation()
-            await self._update_status(AnalysisStatus.PARSING)
-            parsed_docs = await parse_all(
-                file_list,
-                on_parsed=self._on_file_parsed_sync,
-            )
-            self.metrics.total_pages = sum(d.page_count for d in parsed_docs)
-
-            # Save parsed docs to DB (parallel)
-            await asyncio.gather(*(
-                self.db.add_document(
-                    analysis_id=self.analysis_id,
-                    filename=doc.filename,
-                    doc_type=doc.doc_type.value,
-                    page_count=doc.page_count,
-                    content_text=doc.content,
+            # Steps 1–3 are compute-heavy — gate them across concurrent analyses
+            async with admit(self.analysis_id):
+                # Step 1: Parse all documents
+                await self._check_cancellation()
+                await self._update_status(AnalysisStatus.PARSING)
+                parsed_docs = await parse_all(
+                    file_list,
+                    on_parsed=self._on_file_parsed_sync,
                 )
-                for doc in parsed_docs
-            ))
-
-            # Resolve model context window for dynamic chunking
-            context_length = await self._resolve_context_length()
-
-            # Step 2: Extract per-document (parallel with concurrency limit)
-            await self._check_cancellation()
-            await self._update_status(AnalysisStatus.EXTRACTING)
-            extractions = await extract_all(
-                docs=parsed_docs,
-                llm=self.llm,
-                model=self.model,
-                context_length=context_length,
-                max_concurrent=min(len(parsed_docs), 10),
-                on_started=self._on_extraction_started_sync,
-                on_completed=self._on_extraction_completed_sync,
-                on_thinking=extraction_thinking,
-            )
-            await self._push_thinking_done()
-
-            # Accumulate extraction token metrics from results
-            for _doc, _result, usage in extractions:
-                self.metrics.tokens_extraction_input += usage.get("input_tokens", 0)
-                self.metrics.tokens_extraction_output += usage.get("output_tokens", 0)
-
-            # Step 3: Aggregate all extractions into one report
-            await self._check_cancellation()
-            await self._update_status(AnalysisStatus.AGGREGATING)
-            await self._emit_event("aggregation_started", {})
-            report, agg_usage = await aggregate_results(
-                extractions, self.llm, self.model,
-                context_length=context_length,
-                on_thinking=aggregation_thinking,
-            )
-            await self._push_thinking_done()
-            self.metrics.tokens_aggregation_input = agg_usage.get("input_tokens", 0)
-            self.metrics.tokens_aggregation_output = agg_usage.get("output_tokens", 0)
-            await self._emit_event("aggregation_completed", agg_usage)
+                self.metrics.total_pages = sum(d.page_count for d in parsed_docs)
+
+                # Save parsed docs to DB (parallel, bounded)
+                await self._save_documents(parsed_docs)
+
+                # Resolve model context window for dynamic chunking
+                context_length = await self._resolve_context_length()
+
+                # Step 2: Extract per-document (parallel with concurrency limit)
+                await self._check_cancellation()
+                await self._update_status(AnalysisStatus.EXTRACTING)
+                extractions = await extract_all(
+                    docs=parsed_docs,
+                    llm=self.llm,
+                    model=self.model,
+                    context_length=context_length,
+                    max_concurrent=min(len(parsed_docs), 10),
+                    on_started=self._on_extraction_started_sync,
+                    on_completed=self._on_extraction_completed_sync,
+                    on_thinking=extraction_thinking,
+                )
+                await self._push_thinking_done()
+
+                # Step 3: Aggregate all extractions into one report
+                await self._check_cancellation()
+                await self._update_status(AnalysisStatus.AGGREGATING)
+                await self._emit_event("aggregation_started", {})
+                report, agg_usage = await aggregate_results(
+                    extractions, self.llm, self.model,
+                    context_length=context_length,
+                    on_thinking=aggregation_thinking,
+                )
+                await self._push_thinking_done()
+                self.metrics.tokens_aggregation_input = agg_usage.get("input_tokens", 0)
+                self.metrics.tokens_aggregation_output = agg_usage.get("output_tokens", 0)
+                self.metrics.cache_hits += agg_usage.get("cached", False)
+                await self._emit_event("aggregation_completed", agg_usage)
 
             # Step 4: Mark as COMPLETED immediately with report (evaluation runs in background)
             self.metrics.elapsed_seconds = time.time() - self.metrics.start_time
             self._calculate_total_cost()
+            await self._flush_events()
 
             await self.db.update_analysis(
                 self.analysis_id,
@@ -236,11 +254,14 @@ class AnalysisPipeline:
                 )
                 for d in parsed_docs
             ]
-            asyncio.create_task(
+            # Keep a reference so the task isn't garbage-collected mid-run
+            task = asyncio.create_task(
                 self._run_evaluation_background(
                     report, source_docs, evaluation_thinking,
                 )
             )
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
 
         except asyncio.CancelledError:
             logger.info("Pipeline cancelled for %s", self.analysis_id)
@@ -253,6 +274,7 @@ class AnalysisPipeline:
             )
 
             self.metrics.elapsed_seconds = time.time() - self.metrics.start_time
+            await self._flush_events()
             await self.db.update_analysis(
                 self.analysis_id,
                 status=AnalysisStatus.FAILED.value,
@@ -262,6 +284,8 @@ class AnalysisPipeline:
             await self._emit_event("error", {"message": str(e)})
 
         finally:
+            self._cancel_watch.cancel()
+            await self._stop_emitter()
             remove_stream(self.analysis_id)
 
     # ── Background evaluation ─────────────────────────────────────────────
@@ -285,6 +309,7 @@ class AnalysisPipeline:
             )
             self.metrics.tokens_evaluation_input = eval_usage.get("input_tokens", 0)
             self.metrics.tokens_evaluation_output = eval_usage.get("output_tokens", 0)
+            self.metrics.cache_hits += eval_usage.get("cached", False)
             self._calculate_total_cost()
 
             await self.db.update_analysis(
@@ -306,103 +331,200 @@ class AnalysisPipeline:
 
     # ── Status and event helpers ───────────────────────────────────────────
 
+    async def _save_documents(self, docs: list[ParsedDocument]) -> None:
+        """Write parsed documents to Convex concurrently, at most DB_WRITE_CONCURRENCY at once."""
+        semaphore = asyncio.Semaphore(DB_WRITE_CONCURRENCY)
+
+        async def _save(doc: ParsedDocument) -> None:
+            async with semaphore:
+                await self.db.add_document(
+                    analysis_id=self.analysis_id,
+                    filename=doc.filename,
+                    doc_type=doc.doc_type.value,
+                    page_count=doc.page_count,
+                    content_text=doc.content,
+                )
+
+        await asyncio.gather(*(_save(doc) for doc in docs))
+
     async def _update_status(self, status: AnalysisStatus) -> None:
         """Update analysis status in DB."""
         await self.db.update_analysis(self.analysis_id, status=status.value)
 
     async def _emit_event(self, event_type: str, data: dict) -> None:
-        """Append a timestamped event to the DB events list."""
-        event = {
+        """Queue a timestamped event for the DB events list."""
+        self._queue_event(event_type, data)
+
+    def _queue_event(self, event_type: str, data: dict) -> None:
+        """Append an event to the emitter queue (sync — safe from callbacks).
+
+        Indexes are assigned here, in call order, so they stay monotonic.
+        """
+        self._event_q.put_nowait({
             "timestamp": time.time(),
             "event_type": event_type,
             "data": data,
             "index": self._event_index,
-        }
+        })
         self._event_index += 1
-        await self.db.append_event(self.analysis_id, event)
+        if self._emitter_task is None:
+            self._emitter_task = asyncio.create_task(self._emitter_loop())
+
+    async def _emitter_loop(self) -> None:
+        """Single consumer: batch queued events and write them in order."""
+        while True:
+            batch = [await self._event_q.get()]
+            try:
+                await asyncio.sleep(EVENT_FLUSH_DELAY)
+                while not self._event_q.empty():
+                    batch.append(self._event_q.get_nowait())
+                await self.db.append_events(self.analysis_id, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "Failed to write %d events for %s: %s",
+                    len(batch), self.analysis_id, e,
+                )
+            finally:
+                for _ in batch:
+                    self._event_q.task_done()
+
+    async def _flush_events(self) -> None:
+        """Wait until every queued event has been written."""
+        if self._emitter_task is not None:
+            await self._event_q.join()
+
+    async def _stop_emitter(self) -> None:
+        """Flush remaining events and stop the emitter task."""
+        await self._flush_events()
+        if self._emitter_task is not None:
+            self._emitter_task.cancel()
+            try:
+                await self._emitter_task
+            except asyncio.CancelledError:
+                pass
+            self._emitter_task = None
 
     async def _push_thinking(self, phase: str, text: str) -> None:
-        """Push a thinking chunk to the in-memory stream queue."""
+        """Push a thinking chunk to the in-memory stream queue.
+
+        When the queue is full the new chunk is dropped (non-critical
+        ephemeral data) and counted; the count is reported periodically.
+        """
+        if not self._put_stream({"type": "thinking", "phase": phase, "text": text}):
+            self._dropped_thinking += 1
+            return
+        self._report_dropped_thinking()
+
+    def _put_stream(self, item: dict) -> bool:
+        """Queue an item on the thinking stream; False if the queue is full.
+
+        Every write refreshes the stream in the store, full queue or not —
+        the producer is alive even when no one is reading.
+        """
+        touch_stream(self.analysis_id)
         try:
-            self._stream_queue.put_nowait({
-                "type": "thinking",
-                "phase": phase,
-                "text": text,
-            })
+            self._stream_queue.put_nowait(item)
         except asyncio.QueueFull:
-            # Drop oldest chunk if full (non-critical ephemeral data)
-            try:
-                self._stream_queue.get_nowait()
-                self._stream_queue.put_nowait({
-                    "type": "thinking",
-                    "phase": phase,
-                    "text": text,
-                })
-            except asyncio.QueueEmpty:
-                pass
+            return False
+        return True
+
+    def _report_dropped_thinking(self, force: bool = False) -> None:
+        """Emit a thinking_dropped marker if chunks were dropped since the last one."""
+        if not self._dropped_thinking:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_drop_report < THINKING_DROP_REPORT_INTERVAL:
+            return
+        if not self._put_stream({"type": "thinking_dropped", "n": self._dropped_thinking}):
+            return
+        self._dropped_thinking = 0
+        self._last_drop_report = now
 
     async def _push_thinking_done(self) -> None:
         """Signal that the current thinking phase has ended."""
+        self._report_dropped_thinking(force=True)
+        self._put_stream({"type": "thinking_done"})
+
+    async def _watch_cancellation(self) -> None:
+        """Follow the analysis status via a DB subscription, flagging cancellation."""
         try:
-            self._stream_queue.put_nowait({"type": "thinking_done"})
-        except asyncio.QueueFull:
-            pass
+            async with aclosing(self.db.watch_status(self.analysis_id)) as statuses:
+                async for status in statuses:
+                    self._canceled = status == AnalysisStatus.CANCELED
+                    if self._canceled:
+                        return
+        except Exception as e:
+            logger.warning(
+                "Status watch failed for %s, checking the DB per phase: %s",
+                self.analysis_id, e,
+            )
+            self._canceled = None
 
     async def _check_cancellation(self):
-        """Check if analysis has been canceled in the DB."""
-        # We need to fetch the latest status from DB
-        record = await self.db.get_analysis(self.analysis_id)
-        if record and record.get("status") == AnalysisStatus.CANCELED:
+        """Check if analysis has been canceled (local flag set by the status watch)."""
+        if self._canceled is None:
+            # Watch not live yet or unavailable — fetch the latest status from DB
+            record = await self.db.get_analysis(self.analysis_id)
+            if record and record.get("status") == AnalysisStatus.CANCELED:
+                raise asyncio.CancelledError("Analysis canceled by user")
+        elif self._canceled:
             raise asyncio.CancelledError("Analysis canceled by user")
 
     # ── Sync callbacks (bridge to async event emission) ────────────────────
     #
     # parse_all and extract_all call callbacks synchronously from within
-    # async code. We use asyncio.create_task to schedule DB writes without
-    # blocking the caller.
+    # async code. They only enqueue events; a single emitter task writes
+    # them to the DB in order, so callbacks never wait on the DB.
 
     def _on_file_parsed_sync(self, doc: ParsedDocument) -> None:
-        """Sync callback for parse_all — schedules file_parsed event."""
-        asyncio.create_task(self._on_file_parsed(doc))
-
-    async def _on_file_parsed(self, doc: ParsedDocument) -> None:
-        await self._emit_event(
+        """Sync callback for parse_all — queues file_parsed event."""
+        self._queue_event(
             "file_parsed",
             {
                 "filename": doc.filename,
                 "pages": doc.page_count,
-                "format": Path(doc.filename).suffix.lstrip("."),
-                "size_kb": doc.file_size_bytes // 1024,
+                "format": doc.format,
+                "size_kb": doc.size_kb,
                 "token_estimate": doc.token_estimate,
             },
         )
 
     def _on_extraction_started_sync(self, index: int, filename: str) -> None:
-        """Sync callback for extract_all — schedules extraction_started event."""
-        asyncio.create_task(
-            self._emit_event(
-                "extraction_started",
-                {
-                    "filename": filename,
-                    "doc_index": index,
-                },
-            )
+        """Sync callback for extract_all — queues extraction_started event."""
+        self._queue_event(
+            "extraction_started",
+            {
+                "filename": filename,
+                "doc_index": index,
+            },
         )
 
     def _on_extraction_completed_sync(
         self, index: int, filename: str, usage: dict
     ) -> None:
-        """Sync callback for extract_all — schedules extraction_completed event."""
-        asyncio.create_task(
-            self._emit_event(
-                "extraction_completed",
-                {
-                    "filename": filename,
-                    "tokens_in": usage.get("input_tokens", 0),
-                    "tokens_out": usage.get("output_tokens", 0),
-                },
-            )
+        """Sync callback for extract_all — queues extraction_completed event.
+
+        Also accumulates extraction tokens and emits a metrics_update, so the
+        running cost is visible while extraction is still in progress.
+        """
+        tokens_in = usage.get("input_tokens", 0)
+        tokens_out = usage.get("output_tokens", 0)
+        self.metrics.tokens_extraction_input += tokens_in
+        self.metrics.tokens_extraction_output += tokens_out
+        self.metrics.cache_hits += usage.get("cached", False)
+        self._calculate_total_cost()
+
+        self._queue_event(
+            "extraction_completed",
+            {
+                "filename": filename,
+                "tokens_in": tokens_in,
+                "tokens_out": tokens_out,
+            },
         )
+        self._queue_event("metrics_update", self.metrics.to_dict())
 
     # ── Cost estimation ────────────────────────────────────────────────────
 
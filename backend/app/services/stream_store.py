@@ -1,25 +1,80 @@
 # backend/app/services/stream_store.py
 # In-memory asyncio.Queue store per analysis for ephemeral thinking token streaming
 # Bridges pipeline (producer) and SSE endpoint (consumer) without DB persistence
-# Related: pipeline.py (producer), routers/analyze.py (consumer)
+# Entries expire after STREAM_TTL_SECONDS without reads or writes; the map is capped
+# at MAX_STREAMS
+# Related: pipeline.py (producer), routers/analyze.py (consumer), main.py (GC task)
 
 import asyncio
+import logging
+import time
+from collections import OrderedDict
 
-_streams: dict[str, asyncio.Queue] = {}
+logger = logging.getLogger(__name__)
+
+STREAM_TTL_SECONDS = 3600
+MAX_STREAMS = 1000
+GC_INTERVAL_SECONDS = 60
+
+# analysis_id → (queue, last_used); least recently used first
+_streams: OrderedDict[str, tuple[asyncio.Queue, float]] = OrderedDict()
 
 
 def create_stream(analysis_id: str) -> asyncio.Queue:
     """Create and register a new queue for an analysis."""
+    gc_streams()
     q: asyncio.Queue = asyncio.Queue(maxsize=500)
-    _streams[analysis_id] = q
+    _streams[analysis_id] = (q, time.monotonic())
+    _streams.move_to_end(analysis_id)
+    while len(_streams) > MAX_STREAMS:
+        evicted, _ = _streams.popitem(last=False)
+        logger.warning("Stream store full — evicted stream for %s", evicted)
     return q
 
 
 def get_stream(analysis_id: str) -> asyncio.Queue | None:
     """Get the queue for an analysis, or None if not registered."""
-    return _streams.get(analysis_id)
+    entry = _streams.get(analysis_id)
+    if entry is None:
+        return None
+    touch_stream(analysis_id)
+    return entry[0]
+
+
+def touch_stream(analysis_id: str) -> None:
+    """Mark a stream as recently used.
+
+    Reads refresh it via get_stream; the producer calls this on every write,
+    so a stream nobody reads yet is not collected while it is being filled.
+    """
+    entry = _streams.get(analysis_id)
+    if entry is not None:
+        _streams[analysis_id] = (entry[0], time.monotonic())
+        _streams.move_to_end(analysis_id)
 
 
 def remove_stream(analysis_id: str) -> None:
     """Remove and discard the queue for an analysis."""
     _streams.pop(analysis_id, None)
+
+
+def gc_streams() -> int:
+    """Drop streams idle for longer than STREAM_TTL_SECONDS. Returns count removed."""
+    cutoff = time.monotonic() - STREAM_TTL_SECONDS
+    removed = 0
+    while _streams:
+        analysis_id, (_, last_used) = next(iter(_streams.items()))
+        if last_used >= cutoff:
+            break
+        del _streams[analysis_id]
+        removed += 1
+    if removed:
+        logger.info("Removed %d stale thinking streams", removed)
+    return removed
+
+
+async def run_stream_gc() -> None:
+    """Periodically evict stale streams (started from the app lifespan)."""
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        gc_streams()
@@ -4,12 +4,22 @@
 # Handles: nested ZIPs/7z, unicode filenames, corrupt archives, path traversal attacks
 # Related: pipeline.py (called during UNPACKING phase)
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import re
+import shutil
 import tempfile
 import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
+from app.config import get_settings, private_dir
+from app.services.admission import submit_to_process_pool
+
 try:
     import py7zr
     HAS_7Z = True
@@ -18,10 +28,30 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-SUPPORTED_EXTENSIONS: set[str] = {
+SUPPORTED_EXTENSIONS: frozenset[str] = frozenset({
     ".pdf", ".docx", ".xlsx", ".pptx",
     ".png", ".tiff", ".jpg", ".jpeg",
-}
+})
+_ARCHIVE_EXTENSIONS: frozenset[str] = frozenset({".zip", ".7z"})
+
+# Copy chunk size for streaming entries to disk (keeps memory O(1) per entry).
+# A pooled bytearray + readinto() loop was measured and brings no gain here:
+# ZipExtFile has no native readinto — BufferedIOBase.readinto calls read() and
+# copies, so each decompressed chunk is allocated either way.
+_COPY_BUFFER_SIZE = 1 << 20
+
+# Entries compressed larger than this are decompressed in the shared process
+# pool — the GIL would otherwise serialize them across concurrent archives.
+# Smaller entries stay in the worker thread; IPC would cost more than it saves.
+_PROCESS_POOL_MIN_BYTES = 4 << 20
+
+# Bounds how many archives are unpacked concurrently (process-wide)
+_ARCHIVE_SEMAPHORE = asyncio.Semaphore(max(8, (os.cpu_count() or 4) * 2))
+
+
+# One path component that must be dropped, with its leading slash: empty
+# (leading or doubled slashes), ".", "..", or a drive letter such as "C:"
+_DROP_COMPONENT_RE = re.compile(r"(?:^|/)(?:\.{1,2}|[^/]:)?(?=/|$)")
 
 
 def _sanitize_filename(filename: str) -> str | None:
@@ -30,61 +60,76 @@ def _sanitize_filename(filename: str) -> str | None:
     Strips leading slashes, parent directory references, and drive letters.
     Returns None if the filename is empty or resolves to nothing after sanitization.
     """
-    # Normalize path separators
-    cleaned = filename.replace("\\", "/")
-
-    # Strip any leading slashes or drive letters (e.g., C:/)
-    # Path traversal: remove all ../ components
-    parts: list[str] = []
-    for part in cleaned.split("/"):
-        if part in ("", ".", ".."):
-            continue
-        # Strip drive letter prefix (e.g., "C:")
-        if len(part) == 2 and part[1] == ":":
-            continue
-        parts.append(part)
-
-    if not parts:
+    # Normalize path separators, then drop unsafe components in one pass
+    cleaned = _DROP_COMPONENT_RE.sub("", filename.replace("\\", "/")).lstrip("/")
+    if not cleaned:
         return None
 
-    return os.path.join(*parts)
+    return cleaned.replace("/", os.sep)
 
 
-async def _extract_zip(
-    zip_path: Path,
-    dest_dir: Path,
-    *,
-    _depth: int = 0,
-    _max_depth: int = 10,
-) -> list[tuple[Path, str]]:
-    """Extract a ZIP file recursively, handling nested ZIPs.
+def _is_contained(safe_name: str) -> bool:
+    """Check that a sanitized relative name cannot escape its extraction dir."""
+    if os.path.isabs(safe_name) or os.path.splitdrive(safe_name)[0]:
+        return False
+    return ".." not in safe_name.split(os.sep)
 
-    Args:
-        zip_path: Path to the ZIP file to extract.
-        dest_dir: Directory to extract files into.
-        _depth: Current recursion depth (internal).
-        _max_depth: Maximum recursion depth to prevent ZIP bombs.
 
-    Returns:
-        Flat list of (extracted_file_path, original_filename) tuples
-        containing only files with supported extensions.
+def _split_entry_name(safe_name: str) -> tuple[str, str]:
+    """Return (basename, lowercased suffix) of a sanitized entry name.
 
-    Handles:
-        - Nested ZIPs (ZIP inside ZIP) — recursively extracts
-        - Unicode filenames
-        - Corrupt ZIPs (logs warning, skips)
-        - Path traversal attacks (sanitizes filenames)
-        - ZIP bomb protection via depth limit
+    String-only equivalent of Path(name).name / .suffix.lower() — avoids
+    constructing a Path per entry in large archives.
     """
-    if _depth > _max_depth:
-        logger.warning(
-            "Maximum ZIP nesting depth (%d) exceeded for %s — skipping",
-            _max_depth,
-            zip_path.name,
-        )
-        return []
+    base = safe_name.rpartition(os.sep)[2]
+    dot = base.rfind(".")
+    ext = base[dot:].lower() if 0 < dot < len(base) - 1 else ""
+    return base, ext
+
 
+def _extract_one_entry(zip_path: str, entry_name: str, target_path: str) -> None:
+    """Re-open a ZIP and stream one entry to disk — runs in the process pool."""
+    with (
+        zipfile.ZipFile(zip_path, "r") as zf,
+        zf.open(entry_name) as src,
+        open(target_path, "wb", buffering=_COPY_BUFFER_SIZE) as dst,
+    ):
+        shutil.copyfileobj(src, dst, _COPY_BUFFER_SIZE)
+
+
+def _extract_zip_sync(
+    zip_path: Path,
+    dest_dir: Path,
+    depth: int,
+) -> tuple[list[tuple[Path, str]], list[tuple[Path, str]]]:
+    """Blocking part of _extract_zip — runs in a worker thread.
+
+    Returns (supported_files, nested_archives); nested archives are
+    (path, ext) tuples left for the async caller to recurse into.
+    """
     results: list[tuple[Path, str]] = []
+    nested_archives: list[tuple[Path, str]] = []
+    created_dirs: set[Path] = set()
+    # (future, entry name, target, original name, ext) for large entries
+    offloaded: list[tuple[Future, str, Path, str, str]] = []
+
+    def _record(target_path: Path, original_name: str, ext: str) -> None:
+        # Nested archives are unpacked concurrently by the caller
+        if ext in _ARCHIVE_EXTENSIONS:
+            nested_archives.append((target_path, ext))
+            logger.debug(
+                "Found nested archive %r (depth %d) in %s",
+                original_name,
+                depth + 1,
+                zip_path.name,
+            )
+        else:
+            results.append((target_path, original_name))
+            logger.debug(
+                "Extracted supported file: %s from %s",
+                original_name,
+                zip_path.name,
+            )
 
     try:
         with zipfile.ZipFile(zip_path, "r") as zf:
@@ -103,13 +148,21 @@ async def _extract_zip(
                     )
                     continue
 
-                # Build a safe extraction path
-                target_path = dest_dir / safe_name
+                # Decide from the name alone — unsupported entries are never written
+                original_name, ext = _split_entry_name(safe_name)
+                is_archive = ext in _ARCHIVE_EXTENSIONS
+                if not is_archive and ext not in SUPPORTED_EXTENSIONS:
+                    logger.debug(
+                        "Skipping unsupported file %r (%s) in %s",
+                        safe_name,
+                        ext,
+                        zip_path.name,
+                    )
+                    continue
 
-                # Ensure the target is within dest_dir (belt-and-suspenders check)
-                try:
-                    target_path.resolve().relative_to(dest_dir.resolve())
-                except ValueError:
+                # Ensure the target stays within dest_dir (belt-and-suspenders
+                # check, string-only — no realpath syscalls per entry)
+                if not _is_contained(safe_name):
                     logger.warning(
                         "Path traversal detected for %r in %s — skipping",
                         info.filename,
@@ -117,13 +170,43 @@ async def _extract_zip(
                     )
                     continue
 
-                # Create parent directories
-                target_path.parent.mkdir(parents=True, exist_ok=True)
+                target_path = dest_dir / safe_name
+
+                # Create parent directories (once per distinct directory)
+                parent = target_path.parent
+                if parent not in created_dirs:
+                    parent.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(parent)
+
+                # Large entries: decompress in another process, collect below
+                if info.compress_size > _PROCESS_POOL_MIN_BYTES:
+                    try:
+                        future = submit_to_process_pool(
+                            _extract_one_entry,
+                            str(zip_path),
+                            info.filename,
+                            str(target_path),
+                        )
+                    except Exception:
+                        # Pool shut down or unusable — extract in-thread below
+                        logger.debug(
+                            "Process pool unavailable for %r — extracting in-thread",
+                            info.filename,
+                            exc_info=True,
+                        )
+                    else:
+                        offloaded.append(
+                            (future, info.filename, target_path, original_name, ext)
+                        )
+                        continue
 
                 # Extract the file
                 try:
-                    with zf.open(info) as src, open(target_path, "wb") as dst:
-                        dst.write(src.read())
+                    with (
+                        zf.open(info) as src,
+                        open(target_path, "wb", buffering=_COPY_BUFFER_SIZE) as dst,
+                    ):
+                        shutil.copyfileobj(src, dst, _COPY_BUFFER_SIZE)
                 except Exception:
                     logger.warning(
                         "Failed to extract %r from %s — skipping",
@@ -133,61 +216,24 @@ async def _extract_zip(
                     )
                     continue
 
-                ext = target_path.suffix.lower()
-
-                # Nested ZIP: recurse into it
-                if ext == ".zip":
-                    nested_dest = Path(tempfile.mkdtemp(
-                        prefix=f"nested_zip_{_depth + 1}_",
-                    ))
-                    logger.debug(
-                        "Found nested ZIP %r (depth %d) — extracting to %s",
-                        safe_name,
-                        _depth + 1,
-                        nested_dest,
-                    )
-                    nested_results = await _extract_zip(
-                        target_path,
-                        nested_dest,
-                        _depth=_depth + 1,
-                        _max_depth=_max_depth,
-                    )
-                    results.extend(nested_results)
-
-                # Nested 7z inside ZIP: extract it
-                elif ext == ".7z":
-                    nested_dest = Path(tempfile.mkdtemp(
-                        prefix=f"nested_7z_{_depth + 1}_",
-                    ))
-                    logger.debug(
-                        "Found nested 7z %r (depth %d) — extracting to %s",
-                        safe_name,
-                        _depth + 1,
-                        nested_dest,
-                    )
-                    nested_results = await _extract_7z(
-                        target_path,
-                        nested_dest,
-                    )
-                    results.extend(nested_results)
+                _record(target_path, original_name, ext)
 
-                # Supported extension: include in results
-                elif ext in SUPPORTED_EXTENSIONS:
-                    # Use just the base filename as the original name
-                    original_name = Path(safe_name).name
-                    results.append((target_path, original_name))
-                    logger.debug(
-                        "Extracted supported file: %s from %s",
-                        original_name,
-                        zip_path.name,
-                    )
-                else:
-                    logger.debug(
-                        "Skipping unsupported file %r (%s) in %s",
-                        safe_name,
-                        ext,
-                        zip_path.name,
-                    )
+        for future, entry_name, target_path, original_name, ext in offloaded:
+            try:
+                try:
+                    future.result()
+                except BrokenProcessPool:
+                    # A worker died (e.g. OOM) — finish this entry in-thread
+                    _extract_one_entry(str(zip_path), entry_name, str(target_path))
+            except Exception:
+                logger.warning(
+                    "Failed to extract %r from %s — skipping",
+                    entry_name,
+                    zip_path.name,
+                    exc_info=True,
+                )
+                continue
+            _record(target_path, original_name, ext)
 
     except zipfile.BadZipFile:
         logger.warning(
@@ -201,31 +247,97 @@ async def _extract_zip(
             exc_info=True,
         )
 
-    return results
+    return results, nested_archives
 
 
-async def _extract_7z(
-    archive_path: Path,
+async def _extract_zip(
+    zip_path: Path,
     dest_dir: Path,
+    *,
+    _depth: int = 0,
+    _max_depth: int = 10,
 ) -> list[tuple[Path, str]]:
-    """Extract a 7z archive and return supported files.
+    """Extract a ZIP file recursively, handling nested ZIPs.
 
     Args:
-        archive_path: Path to the .7z file.
+        zip_path: Path to the ZIP file to extract.
         dest_dir: Directory to extract files into.
+        _depth: Current recursion depth (internal).
+        _max_depth: Maximum recursion depth to prevent ZIP bombs.
 
     Returns:
-        Flat list of (extracted_file_path, original_filename) tuples.
+        Flat list of (extracted_file_path, original_filename) tuples
+        containing only files with supported extensions.
+
+    Handles:
+        - Nested ZIPs (ZIP inside ZIP) — recursively extracts
+        - Unicode filenames
+        - Corrupt ZIPs (logs warning, skips)
+        - Path traversal attacks (sanitizes filenames)
+        - ZIP bomb protection via depth limit
     """
-    if not HAS_7Z:
+    if _depth > _max_depth:
         logger.warning(
-            "py7zr not installed — cannot extract %s. "
-            "Install with: pip install py7zr",
-            archive_path.name,
+            "Maximum ZIP nesting depth (%d) exceeded for %s — skipping",
+            _max_depth,
+            zip_path.name,
+        )
+        return []
+
+    # Hold the semaphore only while unpacking this archive, not its children
+    async with _ARCHIVE_SEMAPHORE:
+        results, nested_archives = await asyncio.to_thread(
+            _extract_zip_sync, zip_path, dest_dir, _depth,
         )
+
+    results.extend(await _extract_nested_all(nested_archives, _depth + 1, _max_depth))
+    return results
+
+
+async def _extract_nested_all(
+    archives: list[tuple[Path, str]],
+    depth: int,
+    max_depth: int,
+) -> list[tuple[Path, str]]:
+    """Extract nested ZIP/7z archives concurrently, each into its own temp dir.
+
+    The temp dir sits next to the archive, so a whole upload unpacks under
+    one root (which the extraction cache relies on).
+    """
+    if not archives:
         return []
 
+    async def _extract_one(archive_path: Path, ext: str) -> list[tuple[Path, str]]:
+        if ext == ".zip":
+            nested_dest = Path(
+                tempfile.mkdtemp(prefix=f"nested_zip_{depth}_", dir=archive_path.parent)
+            )
+            return await _extract_zip(
+                archive_path, nested_dest, _depth=depth, _max_depth=max_depth,
+            )
+        nested_dest = Path(
+            tempfile.mkdtemp(prefix=f"nested_7z_{depth}_", dir=archive_path.parent)
+        )
+        return await _extract_7z(
+            archive_path, nested_dest, _depth=depth, _max_depth=max_depth,
+        )
+
+    nested_results = await asyncio.gather(
+        *(_extract_one(path, ext) for path, ext in archives)
+    )
+    return [item for extracted in nested_results for item in extracted]
+
+
+def _extract_7z_sync(
+    archive_path: Path,
+    dest_dir: Path,
+) -> tuple[list[tuple[Path, str]], list[tuple[Path, str]]]:
+    """Blocking part of _extract_7z — runs in a worker thread.
+
+    Returns (supported_files, nested_archives) like _extract_zip_sync.
+    """
     results: list[tuple[Path, str]] = []
+    nested_archives: list[tuple[Path, str]] = []
 
     try:
         with py7zr.SevenZipFile(archive_path, mode="r") as szf:
@@ -237,16 +349,9 @@ async def _extract_7z(
                 file_path = Path(root) / filename
                 ext = file_path.suffix.lower()
 
-                if ext == ".zip":
-                    # Nested ZIP inside 7z: extract it
-                    nested_dest = Path(tempfile.mkdtemp(prefix="nested_zip_from_7z_"))
-                    nested_results = await _extract_zip(file_path, nested_dest)
-                    results.extend(nested_results)
-                elif ext == ".7z":
-                    # Nested 7z
-                    nested_dest = Path(tempfile.mkdtemp(prefix="nested_7z_"))
-                    nested_results = await _extract_7z(file_path, nested_dest)
-                    results.extend(nested_results)
+                if ext in _ARCHIVE_EXTENSIONS:
+                    # Nested archive inside 7z: extracted concurrently by the caller
+                    nested_archives.append((file_path, ext))
                 elif ext in SUPPORTED_EXTENSIONS:
                     results.append((file_path, filename))
                     logger.debug(
@@ -269,9 +374,189 @@ async def _extract_7z(
             exc_info=True,
         )
 
+    return results, nested_archives
+
+
+async def _extract_7z(
+    archive_path: Path,
+    dest_dir: Path,
+    *,
+    _depth: int = 0,
+    _max_depth: int = 10,
+) -> list[tuple[Path, str]]:
+    """Extract a 7z archive and return supported files.
+
+    Args:
+        archive_path: Path to the .7z file.
+        dest_dir: Directory to extract files into.
+        _depth: Current recursion depth (internal).
+        _max_depth: Maximum recursion depth to prevent archive bombs.
+
+    Returns:
+        Flat list of (extracted_file_path, original_filename) tuples.
+    """
+    if not HAS_7Z:
+        logger.warning(
+            "py7zr not installed — cannot extract %s. "
+            "Install with: pip install py7zr",
+            archive_path.name,
+        )
+        return []
+
+    if _depth > _max_depth:
+        logger.warning(
+            "Maximum archive nesting depth (%d) exceeded for %s — skipping",
+            _max_depth,
+            archive_path.name,
+        )
+        return []
+
+    # Hold the semaphore only while unpacking this archive, not its children
+    async with _ARCHIVE_SEMAPHORE:
+        results, nested_archives = await asyncio.to_thread(
+            _extract_7z_sync, archive_path, dest_dir,
+        )
+
+    results.extend(await _extract_nested_all(nested_archives, _depth + 1, _max_depth))
     return results
 
 
+# ── Extraction cache (content-addressed manifests) ─────────────────────────
+
+# Under settings.temp_dir, private to this user (see private_dir). Each
+# cached archive is unpacked into its own subdirectory here; the manifest
+# lists files relative to it, so nothing outside the cache is ever handed out.
+_ARCHIVE_CACHE_SUBDIR = "archive_cache"
+# Bump when sanitization/filtering changes what an archive extracts to
+_ARCHIVE_CACHE_VERSION = "2"
+_ARCHIVE_CACHE_MAX_ENTRIES = 256
+
+
+def _archive_cache_dir() -> Path | None:
+    """The private cache directory, or None if it can't be used safely."""
+    try:
+        return private_dir(Path(get_settings().temp_dir) / _ARCHIVE_CACHE_SUBDIR)
+    except OSError as e:
+        logger.warning("Archive extraction cache disabled: %s", e)
+        return None
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file, streamed in blocks (no full read into memory)."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _manifest_path(cache_dir: Path, digest: str) -> Path:
+    return cache_dir / f"{digest}-v{_ARCHIVE_CACHE_VERSION}.json"
+
+
+def _archive_cache_get(cache_dir: Path, digest: str) -> list[tuple[Path, str]] | None:
+    """Return a cached extraction if every file it lists is still on disk.
+
+    A manifest with missing files, or entries resolving outside its
+    extraction root, is deleted along with that root.
+    """
+    manifest = _manifest_path(cache_dir, digest)
+    try:
+        entry = json.loads(manifest.read_text(encoding="utf-8"))
+        root = cache_dir / entry["root"]
+        files = [(root / rel_path, name) for rel_path, name in entry["files"]]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logger.debug("Ignoring unreadable extraction manifest %s: %s", manifest.name, e)
+        return None
+
+    real_root = root.resolve()
+    if real_root.parent != cache_dir.resolve() or not all(
+        (real := file_path.resolve()).is_relative_to(real_root) and real.is_file()
+        for file_path, _ in files
+    ):
+        _archive_cache_drop(cache_dir, manifest)
+        return None
+    try:
+        os.utime(manifest)  # mark as recently used for eviction
+    except OSError:
+        pass
+    return files
+
+
+def _archive_cache_put(
+    cache_dir: Path, digest: str, root: Path, results: list[tuple[Path, str]]
+) -> None:
+    try:
+        manifest = _manifest_path(cache_dir, digest)
+        tmp = manifest.with_suffix(".tmp")
+        entry = {
+            "root": root.name,
+            "files": [
+                (str(file_path.relative_to(root)), name) for file_path, name in results
+            ],
+        }
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        tmp.replace(manifest)
+
+        # Keep only the most recently used manifests and their extractions
+        manifests = sorted(
+            cache_dir.glob("*.json"),
+            key=lambda m: m.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in manifests[_ARCHIVE_CACHE_MAX_ENTRIES:]:
+            _archive_cache_drop(cache_dir, stale)
+    except (OSError, ValueError) as e:
+        logger.debug("Failed to write extraction manifest for %s: %s", digest, e)
+
+
+def _archive_cache_drop(cache_dir: Path, manifest: Path) -> None:
+    """Delete a manifest and the extraction root it points to."""
+    try:
+        root_name = json.loads(manifest.read_text(encoding="utf-8"))["root"]
+    except (OSError, ValueError, TypeError, KeyError):
+        root_name = None
+    manifest.unlink(missing_ok=True)
+    if root_name and Path(root_name).name == root_name:
+        shutil.rmtree(cache_dir / root_name, ignore_errors=True)
+
+
+async def _extract_upload_archive(
+    path: Path, ext: str, digest: str
+) -> list[tuple[Path, str]]:
+    """Extract an uploaded ZIP/7z, reusing a previous extraction of identical bytes."""
+    cache_dir = _archive_cache_dir()
+    if cache_dir is not None:
+        cached = _archive_cache_get(cache_dir, digest)
+        if cached is not None:
+            logger.info(
+                "Reusing cached extraction of %s (%d files, sha256=%s)",
+                path.name,
+                len(cached),
+                digest[:12],
+            )
+            return cached
+
+    prefix = "zip_extract_" if ext == ".zip" else "7z_extract_"
+    dest_dir = Path(tempfile.mkdtemp(prefix=prefix, dir=cache_dir))
+    if ext == ".zip":
+        logger.info("Extracting ZIP file %s to %s", path.name, dest_dir)
+        extracted = await _extract_zip(path, dest_dir)
+    else:
+        logger.info("Extracting 7z archive %s to %s", path.name, dest_dir)
+        extracted = await _extract_7z(path, dest_dir)
+
+    # Don't cache empty results — they may come from a transient failure
+    if cache_dir is not None and extracted:
+        # A concurrent upload of the same archive may have cached it first
+        # (no await between this check and the put)
+        cached = _archive_cache_get(cache_dir, digest)
+        if cached is not None:
+            shutil.rmtree(dest_dir, ignore_errors=True)
+            return cached
+        _archive_cache_put(cache_dir, digest, dest_dir, extracted)
+    return extracted
+
+
 async def extract_files(
     upload_paths: list[Path],
 ) -> list[tuple[Path, str]]:
@@ -281,6 +566,8 @@ async def extract_files(
     - Regular files with supported extensions → pass through as-is
     - ZIP files → extract recursively (handles nested ZIPs)
     - 7z files → extract recursively (handles nested archives)
+    - Archives already extracted (same SHA-256) → cached file list reused
+    - Archives identical to one earlier in this call → skipped
     - Unsupported file types → filtered out with a warning
 
     Args:
@@ -291,6 +578,7 @@ async def extract_files(
         supported files (both direct uploads and extracted from archives).
     """
     results: list[tuple[Path, str]] = []
+    seen_digests: set[str] = set()
 
     for path in upload_paths:
         if not path.exists():
@@ -299,31 +587,16 @@ async def extract_files(
 
         ext = path.suffix.lower()
 
-        if ext == ".zip":
-            # Extract ZIP to a temp directory
-            dest_dir = Path(tempfile.mkdtemp(prefix="zip_extract_"))
-            logger.info(
-                "Extracting ZIP file %s to %s",
-                path.name,
-                dest_dir,
-            )
-            extracted = await _extract_zip(path, dest_dir)
-            results.extend(extracted)
-            logger.info(
-                "Extracted %d supported files from %s",
-                len(extracted),
-                path.name,
-            )
+        if ext in _ARCHIVE_EXTENSIONS:
+            digest = await asyncio.to_thread(_file_digest, path)
+            if digest in seen_digests:
+                logger.info(
+                    "Skipping duplicate archive %s (sha256=%s)", path.name, digest[:12],
+                )
+                continue
+            seen_digests.add(digest)
 
-        elif ext == ".7z":
-            # Extract 7z to a temp directory
-            dest_dir = Path(tempfile.mkdtemp(prefix="7z_extract_"))
-            logger.info(
-                "Extracting 7z archive %s to %s",
-                path.name,
-                dest_dir,
-            )
-            extracted = await _extract_7z(path, dest_dir)
+            extracted = await _extract_upload_archive(path, ext, digest)
             results.extend(extracted)
             logger.info(
                 "Extracted %d supported files from %s",
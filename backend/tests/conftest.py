@@ -1,4 +1,48 @@
 # backend/tests/conftest.py
 # Pytest configuration and shared fixtures
-# Provides test client, mock DB, mock LLM, and sample data
+# Provides test client, mock DB, fake LLM, and sample data
 # Related: all test_*.py files
+
+import pytest
+
+from app.config import get_settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_llm_cache(tmp_path, monkeypatch):
+    """Give every test an empty LLM result cache."""
+    monkeypatch.setattr(get_settings(), "llm_cache_dir", str(tmp_path / "llm_cache"))
+
+
+class FakeLLM:
+    """Lightweight LLMClient stand-in — cheaper than MagicMock per test.
+
+    Returns the canned ``stream`` / ``structured`` values and records each
+    call as ``(method_name, kwargs)`` in ``calls``.
+    """
+
+    def __init__(self, stream=None, structured=None):
+        self.stream = stream
+        self.structured = structured
+        self.calls: list[tuple[str, dict]] = []
+
+    @property
+    def last_kwargs(self) -> dict:
+        return self.calls[-1][1]
+
+    def complete_streaming(self, **kwargs):
+        self.calls.append(("complete_streaming", kwargs))
+        return self.stream
+
+    async def complete_structured(self, **kwargs):
+        self.calls.append(("complete_structured", kwargs))
+        return self.structured
+
+    async def complete_structured_streaming(self, **kwargs):
+        self.calls.append(("complete_structured_streaming", kwargs))
+        return self.structured
+
+
+@pytest.fixture
+def fake_llm() -> FakeLLM:
+    return FakeLLM()
@@ -0,0 +1,105 @@
+# backend/tests/test_admission.py
+# Tests for process-wide pipeline admission control (services/admission.py)
+# Related: backend/app/services/admission.py
+
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.config import get_settings
+from app.services import admission
+
+
+class TestPipelineLimit:
+    def test_auto_limit_is_clamped(self):
+        assert 1 <= admission._auto_limit() <= 8
+
+    def test_configured_limit_wins(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "pipeline_max_concurrent", 3)
+        assert admission.pipeline_limit() == 3
+
+    def test_zero_means_auto(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "pipeline_max_concurrent", 0)
+        assert admission.pipeline_limit() == admission._auto_limit()
+
+
+@pytest.mark.asyncio
+async def test_admit_caps_concurrent_holders(monkeypatch):
+    monkeypatch.setattr(admission, "PIPELINE_SEM", asyncio.Semaphore(2))
+    in_flight = 0
+    peak = 0
+
+    async def run(i: int) -> None:
+        nonlocal in_flight, peak
+        async with admission.admit(f"analysis-{i}"):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(run(i) for i in range(6)))
+    assert peak == 2
+
+
+class _FakePool:
+    """ProcessPoolExecutor stand-in; `broken` makes submit raise."""
+
+    def __init__(self, **kwargs):
+        self.broken = False
+        self.shut_down = False
+        self.futures: list[Future] = []
+
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("worker died")
+        future: Future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class TestProcessPool:
+    @pytest.fixture(autouse=True)
+    def fake_pool(self, monkeypatch):
+        monkeypatch.setattr(admission, "ProcessPoolExecutor", _FakePool)
+        monkeypatch.setattr(admission, "_process_pool", None)
+        monkeypatch.setattr(admission, "_process_pool_closed", False)
+
+    def test_broken_pool_on_submit_is_replaced(self):
+        broken = admission.get_process_pool()
+        broken.broken = True
+
+        admission.submit_to_process_pool(print, "x")
+
+        fresh = admission.get_process_pool()
+        assert fresh is not broken
+        assert broken.shut_down
+        assert len(fresh.futures) == 1
+
+    def test_broken_pool_on_result_is_replaced(self):
+        future = admission.submit_to_process_pool(print, "x")
+        pool = admission.get_process_pool()
+
+        future.set_exception(BrokenProcessPool("worker died"))
+
+        assert admission.get_process_pool() is not pool
+        assert pool.shut_down
+
+    def test_other_errors_keep_the_pool(self):
+        future = admission.submit_to_process_pool(print, "x")
+        pool = admission.get_process_pool()
+
+        future.set_exception(ValueError("bad entry"))
+
+        assert admission.get_process_pool() is pool
+
+    def test_submit_after_shutdown_raises(self):
+        admission.get_process_pool()
+        admission.shutdown_process_pool()
+
+        with pytest.raises(RuntimeError):
+            admission.submit_to_process_pool(print, "x")
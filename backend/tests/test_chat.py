@@ -3,11 +3,14 @@
 # Covers system prompt construction, history truncation, and streaming
 # Related: services/chat.py, prompts/chat.py
 
+from collections import deque
+from typing import AsyncIterator
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.models.schemas import AggregatedReport, ChatMessage, DocumentType
 from app.prompts.chat import CHAT_SYSTEM
+from app.services import chat as chat_module
 from app.services.chat import ChatService, MAX_HISTORY_MESSAGES
 from app.services.parser import ParsedDocument
 
@@ -46,30 +49,45 @@ def sample_documents() -> list[ParsedDocument]:
     ]
 
 
+# Built once with model_construct (no validation); fixtures hand out copies
+_SAMPLE_HISTORY = (
+    ChatMessage.model_construct(role="user", content="Koks pirkimo būdas?"),
+    ChatMessage.model_construct(role="assistant", content="Atviras pirkimas."),
+)
+
+# 30 alternating messages — more than MAX_HISTORY_MESSAGES
+_LONG_HISTORY = tuple(
+    ChatMessage.model_construct(
+        role="user" if i % 2 == 0 else "assistant", content=f"Message {i}"
+    )
+    for i in range(30)
+)
+
+
 @pytest.fixture
 def sample_history() -> list[ChatMessage]:
-    return [
-        ChatMessage(role="user", content="Koks pirkimo būdas?"),
-        ChatMessage(role="assistant", content="Atviras pirkimas."),
-    ]
+    return list(_SAMPLE_HISTORY)
 
 
 @pytest.fixture
-def mock_llm():
-    llm = MagicMock()
-    llm.complete_streaming = MagicMock()
-    return llm
+def mock_llm(fake_llm):
+    return fake_llm
 
 
 @pytest.fixture
 def chat_service(mock_llm) -> ChatService:
-    return ChatService(llm=mock_llm)
+    # Pass-through streaming so tests see the exact chunks the LLM yields
+    return ChatService(llm=mock_llm, coalesce_chars=0)
 
 
 # ── Helpers ────────────────────────────────────────────────────────────────────
 
 
-async def async_chunk_generator(chunks: list[str]):
+# Single-chunk stream shared by tests that don't inspect the output
+_OK = ("ok",)
+
+
+async def async_chunk_generator(chunks: tuple[str, ...]) -> AsyncIterator[str]:
     """Helper that yields chunks as an async iterator."""
     for chunk in chunks:
         yield chunk
@@ -86,8 +104,8 @@ class TestChatServiceAnswer:
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """Should yield text chunks from the LLM streaming response."""
-        expected_chunks = ["Pagal ", "dokumentus, ", "atsakymas yra..."]
-        mock_llm.complete_streaming.return_value = async_chunk_generator(expected_chunks)
+        expected_chunks = ("Pagal ", "dokumentus, ", "atsakymas yra...")
+        mock_llm.stream = async_chunk_generator(expected_chunks)
 
         result_chunks = []
         async for chunk in chat_service.answer(
@@ -99,14 +117,35 @@ class TestChatServiceAnswer:
         ):
             result_chunks.append(chunk)
 
-        assert result_chunks == expected_chunks
+        assert result_chunks == list(expected_chunks)
+
+    @pytest.mark.asyncio
+    async def test_streaming_coalesces_small_fragments(
+        self, mock_llm, sample_report, sample_documents, sample_history
+    ):
+        """Fragments arriving together are merged up to coalesce_chars."""
+        mock_llm.stream = async_chunk_generator(("Pa", "gal ", "doku", "mentus"))
+        service = ChatService(llm=mock_llm, coalesce_chars=8)
+
+        result_chunks = [
+            chunk
+            async for chunk in service.answer(
+                question="Koks terminas?",
+                report=sample_report,
+                documents=sample_documents,
+                history=sample_history,
+                model="test-model",
+            )
+        ]
+
+        assert result_chunks == ["Pagal doku", "mentus"]
 
     @pytest.mark.asyncio
     async def test_system_prompt_includes_report(
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """System prompt should contain the serialized report JSON."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Test?",
@@ -117,8 +156,7 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        system_prompt = call_kwargs.kwargs.get("system") or call_kwargs[1].get("system")
+        system_prompt = mock_llm.last_kwargs["system"]
 
         # Report JSON should be in system prompt
         assert "Test procurement project" in system_prompt
@@ -129,7 +167,7 @@ class TestChatServiceAnswer:
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """System prompt should contain all document contents with headers."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Test?",
@@ -140,8 +178,7 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        system_prompt = call_kwargs.kwargs.get("system") or call_kwargs[1].get("system")
+        system_prompt = mock_llm.last_kwargs["system"]
 
         # Document headers
         assert "### techninė_specifikacija.pdf (5 psl.)" in system_prompt
@@ -151,13 +188,42 @@ class TestChatServiceAnswer:
         assert "Sutarties sąlygos ir nuostatos." in system_prompt
         # Separators
         assert "---" in system_prompt
+        # Filename order, independent of the order documents were passed in
+        assert system_prompt.index("### sutartis.docx") < system_prompt.index(
+            "### techninė_specifikacija.pdf"
+        )
+
+    @pytest.mark.asyncio
+    async def test_system_prompt_stable_across_document_order(
+        self, chat_service, mock_llm, sample_report, sample_documents
+    ):
+        """Reordered documents yield the same system prompt (stable prefix)."""
+        prompts = []
+        # Distinct questions so the second turn is not served from llm_cache
+        for question, docs in (
+            ("Pirmas?", sample_documents),
+            ("Antras?", sample_documents[::-1]),
+        ):
+            mock_llm.stream = async_chunk_generator(_OK)
+            async for _ in chat_service.answer(
+                question=question,
+                report=sample_report,
+                documents=docs,
+                history=[],
+                model="test-model",
+            ):
+                pass
+            prompts.append(mock_llm.last_kwargs["system"])
+
+        assert len(mock_llm.calls) == 2
+        assert prompts[0] == prompts[1]
 
     @pytest.mark.asyncio
     async def test_messages_include_history_and_question(
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """Messages should include history followed by the current question."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Naujas klausimas?",
@@ -168,8 +234,7 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        messages = call_kwargs.kwargs.get("messages") or call_kwargs[1].get("messages")
+        messages = mock_llm.last_kwargs["messages"]
 
         # History messages + current question
         assert len(messages) == 3
@@ -182,25 +247,18 @@ class TestChatServiceAnswer:
         self, chat_service, mock_llm, sample_report, sample_documents
     ):
         """History exceeding MAX_HISTORY_MESSAGES should be truncated to the last N."""
-        # Create 30 history messages (exceeds MAX_HISTORY_MESSAGES=20)
-        long_history = []
-        for i in range(30):
-            role = "user" if i % 2 == 0 else "assistant"
-            long_history.append(ChatMessage(role=role, content=f"Message {i}"))
-
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Final question?",
             report=sample_report,
             documents=sample_documents,
-            history=long_history,
+            history=_LONG_HISTORY,
             model="test-model",
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        messages = call_kwargs.kwargs.get("messages") or call_kwargs[1].get("messages")
+        messages = mock_llm.last_kwargs["messages"]
 
         # MAX_HISTORY_MESSAGES (20) from history + 1 current question = 21
         assert len(messages) == MAX_HISTORY_MESSAGES + 1
@@ -209,12 +267,59 @@ class TestChatServiceAnswer:
         # Last message should be the current question
         assert messages[-1] == {"role": "user", "content": "Final question?"}
 
+    @pytest.mark.asyncio
+    async def test_history_accepts_deque(
+        self, chat_service, mock_llm, sample_report, sample_documents
+    ):
+        """A bounded deque of messages is truncated like a list."""
+        history = deque(_LONG_HISTORY[:26], maxlen=MAX_HISTORY_MESSAGES + 2)
+        mock_llm.stream = async_chunk_generator(_OK)
+
+        async for _ in chat_service.answer(
+            question="Q?",
+            report=sample_report,
+            documents=sample_documents,
+            history=history,
+            model="test-model",
+        ):
+            pass
+
+        messages = mock_llm.last_kwargs["messages"]
+        assert len(messages) == MAX_HISTORY_MESSAGES + 1
+        assert messages[0]["content"] == "Message 6"
+
+    @pytest.mark.asyncio
+    async def test_unanswered_questions_left_out_of_history(
+        self, chat_service, mock_llm, sample_report, sample_documents, sample_history
+    ):
+        """The router saves the question first — it is sent once, not twice."""
+        history = sample_history + [
+            ChatMessage.model_construct(role="user", content="Kito naudotojo klausimas?"),
+            ChatMessage.model_construct(role="user", content="Naujas klausimas?"),
+        ]
+        mock_llm.stream = async_chunk_generator(_OK)
+
+        async for _ in chat_service.answer(
+            question="Naujas klausimas?",
+            report=sample_report,
+            documents=sample_documents,
+            history=history,
+            model="test-model",
+        ):
+            pass
+
+        assert mock_llm.last_kwargs["messages"] == [
+            {"role": "user", "content": "Koks pirkimo būdas?"},
+            {"role": "assistant", "content": "Atviras pirkimas."},
+            {"role": "user", "content": "Naujas klausimas?"},
+        ]
+
     @pytest.mark.asyncio
     async def test_empty_history(
         self, chat_service, mock_llm, sample_report, sample_documents
     ):
         """Should work with empty history — only the current question."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="First question?",
@@ -225,8 +330,7 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        messages = call_kwargs.kwargs.get("messages") or call_kwargs[1].get("messages")
+        messages = mock_llm.last_kwargs["messages"]
 
         assert len(messages) == 1
         assert messages[0] == {"role": "user", "content": "First question?"}
@@ -236,7 +340,7 @@ class TestChatServiceAnswer:
         self, chat_service, mock_llm, sample_report, sample_history
     ):
         """Should work with no documents — system prompt has empty documents section."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Test?",
@@ -247,8 +351,7 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        system_prompt = call_kwargs.kwargs.get("system") or call_kwargs[1].get("system")
+        system_prompt = mock_llm.last_kwargs["system"]
 
         # Documents section should be empty but prompt should still be valid
         assert "Šaltinių dokumentai:" in system_prompt
@@ -258,7 +361,7 @@ class TestChatServiceAnswer:
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """Should call LLM with the correct model and thinking level."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Test?",
@@ -269,16 +372,16 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        assert call_kwargs.kwargs.get("model") or call_kwargs[1].get("model") == "google/gemini-2.5-pro"
-        assert call_kwargs.kwargs.get("thinking") or call_kwargs[1].get("thinking") == "medium"
+        call_kwargs = mock_llm.last_kwargs
+        assert call_kwargs["model"] == "google/gemini-2.5-pro"
+        assert call_kwargs["thinking"] == "medium"
 
     @pytest.mark.asyncio
     async def test_system_prompt_uses_chat_template(
         self, chat_service, mock_llm, sample_report, sample_documents, sample_history
     ):
         """System prompt should be based on the CHAT_SYSTEM template."""
-        mock_llm.complete_streaming.return_value = async_chunk_generator(["ok"])
+        mock_llm.stream = async_chunk_generator(_OK)
 
         async for _ in chat_service.answer(
             question="Test?",
@@ -289,13 +392,167 @@ class TestChatServiceAnswer:
         ):
             pass
 
-        call_kwargs = mock_llm.complete_streaming.call_args
-        system_prompt = call_kwargs.kwargs.get("system") or call_kwargs[1].get("system")
+        system_prompt = mock_llm.last_kwargs["system"]
 
         # Should contain the template's static text
         assert "viešųjų pirkimų konsultantas" in system_prompt
         assert "Analizės ataskaita:" in system_prompt
         assert "Šaltinių dokumentai:" in system_prompt
+        # The pre-split sections join to exactly what .format() would produce
+        assert system_prompt == CHAT_SYSTEM.format(
+            report_json=sample_report.model_dump_json(indent=2),
+            documents_markdown=chat_module._build_documents_block(sample_documents)[0],
+        )
+
+
+class TestChatAnswerCache:
+    """Repeated questions over the same context are answered from llm_cache."""
+
+    async def _ask(self, service, question, report, documents, history):
+        return [
+            chunk
+            async for chunk in service.answer(
+                question=question,
+                report=report,
+                documents=documents,
+                history=history,
+                model="test-model",
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_chat_cache_hit(
+        self, chat_service, mock_llm, sample_report, sample_documents, sample_history
+    ):
+        mock_llm.stream = async_chunk_generator(("Atviras ", "konkursas."))
+        first = await self._ask(
+            chat_service, "Koks pirkimo būdas?", sample_report, sample_documents, sample_history
+        )
+        second = await self._ask(
+            chat_service, "  koks pirkimo BŪDAS ", sample_report, sample_documents, sample_history
+        )
+
+        assert first == ["Atviras ", "konkursas."]
+        assert second == ["Atviras konkursas."]
+        assert len(mock_llm.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_repeat_question_hits_cache_through_saved_history(
+        self, chat_service, mock_llm, sample_report, sample_documents
+    ):
+        """Mirrors the chat endpoint: save the question, read history, answer, save."""
+        saved: list[ChatMessage] = []
+
+        async def turn(question):
+            saved.append(ChatMessage.model_construct(role="user", content=question))
+            history = list(saved)  # get_chat_history: ends with this question
+            chunks = await self._ask(
+                chat_service, question, sample_report, sample_documents, history
+            )
+            answer = "".join(chunks)
+            saved.append(ChatMessage.model_construct(role="assistant", content=answer))
+            return answer
+
+        mock_llm.stream = async_chunk_generator(("Atviras konkursas.",))
+        first = await turn("Koks pirkimo būdas?")
+        second = await turn("Koks pirkimo būdas?")
+
+        assert first == second == "Atviras konkursas."
+        assert len(mock_llm.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_different_question_misses_cache(
+        self, chat_service, mock_llm, sample_report, sample_documents
+    ):
+        mock_llm.stream = async_chunk_generator(_OK)
+        await self._ask(chat_service, "Kiek?", sample_report, sample_documents, [])
+        mock_llm.stream = async_chunk_generator(_OK)
+        await self._ask(chat_service, "Kada?", sample_report, sample_documents, [])
+
+        assert len(mock_llm.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_empty_answer_not_cached(
+        self, chat_service, mock_llm, sample_report, sample_documents
+    ):
+        mock_llm.stream = async_chunk_generator(())
+        await self._ask(chat_service, "Kiek?", sample_report, sample_documents, [])
+        mock_llm.stream = async_chunk_generator(_OK)
+        second = await self._ask(chat_service, "Kiek?", sample_report, sample_documents, [])
+
+        assert "".join(second) == "".join(_OK)
+        assert len(mock_llm.calls) == 2
+
+
+class TestFormatDocuments:
+    def test_empty_documents(self):
+        assert chat_module._format_documents([]) == ""
+
+    def test_sections_and_separators(self, sample_documents):
+        assert chat_module._format_documents(sample_documents) == (
+            "### techninė_specifikacija.pdf (5 psl.)\n"
+            "Techninė specifikacija turinys čia.\n---\n\n"
+            "### sutartis.docx (3 psl.)\n"
+            "Sutarties sąlygos ir nuostatos.\n---"
+        )
+
+
+class TestDocumentsBlockCache:
+    """The rendered documents block is reused across chat turns."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, monkeypatch):
+        monkeypatch.setattr(chat_module, "_docs_block_cache", chat_module.OrderedDict())
+        monkeypatch.setattr(
+            chat_module, "_system_prompt_cache", chat_module.OrderedDict()
+        )
+
+    def test_equal_documents_reuse_block(self, sample_documents):
+        first, digest = chat_module._build_documents_block(sample_documents)
+        rebuilt = [
+            ParsedDocument(
+                filename=d.filename,
+                content="".join(d.content),
+                page_count=d.page_count,
+                file_size_bytes=0,
+                doc_type=d.doc_type,
+                token_estimate=d.token_estimate,
+            )
+            for d in sample_documents
+        ]
+        block, again = chat_module._build_documents_block(rebuilt)
+        assert block is first
+        assert again == digest
+
+    def test_changed_content_rebuilds_block(self, sample_documents):
+        _, digest = chat_module._build_documents_block(sample_documents)
+        sample_documents[1].content = "Pakeistos sąlygos."
+        block, changed = chat_module._build_documents_block(sample_documents)
+        assert "Pakeistos sąlygos." in block
+        assert changed != digest
+        assert len(chat_module._docs_block_cache) == 2
+
+    def test_repeat_turn_reuses_system_prompt(self, sample_report, sample_documents):
+        report_json = sample_report.model_dump_json(indent=2)
+        first, key = chat_module._build_system_prompt(
+            report_json, *chat_module._build_documents_block(sample_documents)
+        )
+        again, same_key = chat_module._build_system_prompt(
+            sample_report.model_dump_json(indent=2),
+            *chat_module._build_documents_block(sample_documents),
+        )
+        assert again is first
+        assert same_key == key
+        assert first.startswith(chat_module.CHAT_SYSTEM_HEAD)
+        # Keyed by a digest, not by the prompt's own multi-megabyte strings
+        assert list(chat_module._system_prompt_cache) == [key]
+        assert len(key) == 64
+
+    def test_changed_report_changes_context_key(self, sample_report, sample_documents):
+        block = chat_module._build_documents_block(sample_documents)
+        _, key = chat_module._build_system_prompt("{}", *block)
+        _, other = chat_module._build_system_prompt('{"a": 1}', *block)
+        assert key != other
 
 
 class TestMaxHistoryConstant:
@@ -0,0 +1,257 @@
+# backend/tests/test_chat_batcher.py
+# Tests for chat question micro-batching (services/chat_batcher.py)
+# Covers: merged requests, answer splitting, lone questions, context grouping,
+# batcher eviction
+# Related: backend/app/services/chat_batcher.py, backend/app/services/chat.py
+
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.models.schemas import AggregatedReport, ChatMessage
+from app.services import chat_batcher as batcher_module
+from app.services.chat import ChatService
+from app.services.chat_batcher import ChatBatcher
+from conftest import FakeLLM
+
+
+async def _stream(chunks: tuple[str, ...]):
+    for chunk in chunks:
+        await asyncio.sleep(0)
+        yield chunk
+
+
+async def _collect(stream) -> str:
+    return "".join([chunk async for chunk in stream])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_questions_share_one_request():
+    """Two questions in the window become one call, split by markers."""
+    llm = FakeLLM(stream=_stream(
+        ("<|ans 2|> Antras", " atsakymas<|a", "ns 1|>\nPirmas atsakymas")
+    ))
+    batcher = ChatBatcher(llm, window=0.05)
+
+    first, second = await asyncio.gather(
+        _collect(batcher.submit("SYS", [], "Pirmas?", "m")),
+        _collect(batcher.submit("SYS", [], "Antras?", "m")),
+    )
+
+    assert first == "Pirmas atsakymas"
+    assert second == "Antras atsakymas"
+    assert len(llm.calls) == 1
+    user = llm.last_kwargs["messages"][-1]["content"]
+    assert "Klausimas 1: Pirmas?" in user
+    assert "Klausimas 2: Antras?" in user
+
+
+@pytest.mark.asyncio
+async def test_lone_question_is_sent_as_plain_chat():
+    """A single question keeps its history and is asked directly."""
+    llm = FakeLLM(stream=_stream(("Atsakymas",)))
+    batcher = ChatBatcher(llm, window=0.01)
+    history = [{"role": "user", "content": "Ankstesnis?"}]
+
+    answer = await _collect(batcher.submit("SYS", history, "Klausimas?", "m"))
+
+    assert answer == "Atsakymas"
+    assert llm.last_kwargs["messages"] == [
+        {"role": "user", "content": "Ankstesnis?"},
+        {"role": "user", "content": "Klausimas?"},
+    ]
+
+
+class _FallbackLLM(FakeLLM):
+    """Replies `batch_reply` to the first call, then answers each question alone."""
+
+    def __init__(self, batch_reply: tuple[str, ...]):
+        super().__init__()
+        self.batch_reply = batch_reply
+
+    def complete_streaming(self, **kwargs):
+        self.calls.append(("complete_streaming", kwargs))
+        if len(self.calls) == 1:
+            return _stream(self.batch_reply)
+        return _stream((f"Atsakymas: {kwargs['messages'][-1]['content']}",))
+
+
+@pytest.mark.asyncio
+async def test_unmarked_batch_answer_falls_back_to_single_requests():
+    """If the model ignores the markers nobody sees the combined reply."""
+    llm = _FallbackLLM(("Bendras atsakymas",))
+    batcher = ChatBatcher(llm, window=0.05)
+
+    answers = await asyncio.gather(
+        _collect(batcher.submit("SYS", [], "A?", "m")),
+        _collect(batcher.submit("SYS", [], "B?", "m")),
+    )
+
+    assert answers == ["Atsakymas: A?", "Atsakymas: B?"]
+    assert len(llm.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_skipped_marker_falls_back_for_that_caller_only():
+    llm = _FallbackLLM(("<|ans 1|>Pirmas",))
+    batcher = ChatBatcher(llm, window=0.05)
+
+    answers = await asyncio.gather(
+        _collect(batcher.submit("SYS", [], "A?", "m")),
+        _collect(batcher.submit("SYS", [], "B?", "m")),
+    )
+
+    assert answers == ["Pirmas", "Atsakymas: B?"]
+    assert llm.last_kwargs["messages"] == [{"role": "user", "content": "B?"}]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_before_window():
+    llm = FakeLLM(stream=_stream(("<|ans 1|>a<|ans 2|>b",)))
+    batcher = ChatBatcher(llm, window=30, max_batch=2)
+
+    answers = await asyncio.wait_for(
+        asyncio.gather(
+            _collect(batcher.submit("SYS", [], "A?", "m")),
+            _collect(batcher.submit("SYS", [], "B?", "m")),
+        ),
+        timeout=5,
+    )
+
+    assert answers == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_different_context_is_not_merged():
+    """Questions about different system prompts go out separately."""
+
+    class PerCallLLM(FakeLLM):
+        def complete_streaming(self, **kwargs):
+            self.calls.append(("complete_streaming", kwargs))
+            return _stream((kwargs["system"],))
+
+    llm = PerCallLLM()
+    batcher = ChatBatcher(llm, window=0.05)
+
+    answers = await asyncio.gather(
+        _collect(batcher.submit("A", [], "Q?", "m")),
+        _collect(batcher.submit("B", [], "Q?", "m")),
+    )
+
+    assert answers == ["A", "B"]
+    assert len(llm.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_failure_reaches_callers():
+    async def failing():
+        raise RuntimeError("upstream down")
+        yield  # pragma: no cover
+
+    llm = FakeLLM(stream=failing())
+    batcher = ChatBatcher(llm, window=0.01)
+
+    with pytest.raises(RuntimeError, match="upstream down"):
+        await _collect(batcher.submit("SYS", [], "Q?", "m"))
+
+
+@pytest.mark.asyncio
+async def test_chat_service_routes_through_batcher():
+    """With a batcher set, ChatService.answer never calls its own LLM."""
+    own_llm = FakeLLM()
+    batch_llm = FakeLLM(stream=_stream(("Atsakymas",)))
+    service = ChatService(
+        llm=own_llm,
+        coalesce_chars=0,
+        batcher=ChatBatcher(batch_llm, window=0.01),
+    )
+
+    chunks = [
+        chunk
+        async for chunk in service.answer(
+            question="Kiek?",
+            report=AggregatedReport(),
+            documents=[],
+            history=[],
+            model="m",
+        )
+    ]
+
+    assert chunks == ["Atsakymas"]
+    assert own_llm.calls == []
+    assert batch_llm.last_kwargs["messages"][-1] == {"role": "user", "content": "Kiek?"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_answers_with_saved_questions_share_one_request():
+    """Router-style histories end with both saved questions; the calls still
+    merge, and each question is sent once."""
+    batch_llm = FakeLLM(stream=_stream(("<|ans 1|>Pirmas<|ans 2|>Antras",)))
+    service = ChatService(
+        llm=FakeLLM(), coalesce_chars=0, batcher=ChatBatcher(batch_llm, window=0.05)
+    )
+    history = [
+        ChatMessage.model_construct(role="user", content="Pirmas?"),
+        ChatMessage.model_construct(role="user", content="Antras?"),
+    ]
+
+    async def ask(question):
+        return "".join([
+            chunk
+            async for chunk in service.answer(
+                question=question,
+                report=AggregatedReport(),
+                documents=[],
+                history=history,
+                model="m",
+            )
+        ])
+
+    assert await asyncio.gather(ask("Pirmas?"), ask("Antras?")) == ["Pirmas", "Antras"]
+    assert len(batch_llm.calls) == 1
+    messages = batch_llm.last_kwargs["messages"]
+    assert len(messages) == 1
+    assert messages[0]["content"].count("Pirmas?") == 1
+
+
+class _ClosingLLM(FakeLLM):
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_batcher_is_closed(monkeypatch):
+    monkeypatch.setattr(batcher_module, "LLMClient", _ClosingLLM)
+    monkeypatch.setattr(batcher_module, "_batchers", OrderedDict())
+    monkeypatch.setattr(batcher_module, "MAX_BATCHERS", 2)
+
+    first = batcher_module.get_chat_batcher("key-1")
+    second = batcher_module.get_chat_batcher("key-2")
+    assert batcher_module.get_chat_batcher("key-1") is first  # now most recent
+    third = batcher_module.get_chat_batcher("key-3")
+    await asyncio.gather(*batcher_module._closing)
+
+    assert list(batcher_module._batchers) == ["key-1", "key-3"]
+    assert second.llm.closed
+    assert not first.llm.closed
+
+    await batcher_module.close_chat_batchers()
+    assert first.llm.closed and third.llm.closed
+
+
+@pytest.mark.asyncio
+async def test_evicted_batcher_finishes_open_batch_before_closing():
+    llm = _ClosingLLM()
+    llm.stream = _stream(("Atsakymas",))
+    batcher = ChatBatcher(llm, window=0.01)
+
+    answer = asyncio.ensure_future(_collect(batcher.submit("SYS", [], "Q?", "m")))
+    await batcher.close(wait=True)
+
+    assert await answer == "Atsakymas"
+    assert llm.closed
@@ -2,7 +2,7 @@
 # Tests for the QA evaluator service with mocked LLM.
 # Covers: complete report evaluation, incomplete report, prompt formatting.
 
-from unittest.mock import AsyncMock, MagicMock
+import asyncio
 
 import pytest
 
@@ -17,7 +17,13 @@ from app.models.schemas import (
     QualificationRequirements,
     SourceDocument,
 )
-from app.services.evaluator import evaluate_report
+from app.services.evaluator import (
+    FAST_PATH_SCORE,
+    _REPORT_ADAPTER,
+    _format_doc_list,
+    evaluate_report,
+)
+from conftest import FakeLLM
 
 
 # ── Fixtures ────────────────────────────────────────────────────────────────────
@@ -110,13 +116,11 @@ def _make_source_documents() -> list[SourceDocument]:
     ]
 
 
-def _make_mock_llm(evaluation: QAEvaluation, usage: dict | None = None) -> MagicMock:
-    """Create a mock LLM client that returns the given evaluation."""
-    mock_llm = MagicMock()
-    mock_llm.complete_structured = AsyncMock(
-        return_value=(evaluation, usage or {"input_tokens": 2000, "output_tokens": 300})
+def _make_mock_llm(evaluation: QAEvaluation, usage: dict | None = None) -> FakeLLM:
+    """Create a fake LLM client that returns the given evaluation."""
+    return FakeLLM(
+        structured=(evaluation, usage or {"input_tokens": 2000, "output_tokens": 300})
     )
-    return mock_llm
 
 
 # ── Tests ───────────────────────────────────────────────────────────────────────
@@ -194,7 +198,7 @@ async def test_evaluate_uses_medium_thinking():
 
     await evaluate_report(report, documents, mock_llm, "model-x")
 
-    call_kwargs = mock_llm.complete_structured.call_args.kwargs
+    call_kwargs = mock_llm.last_kwargs
     assert call_kwargs["thinking"] == "medium"
     assert call_kwargs["response_schema"] is QAEvaluation
     assert call_kwargs["model"] == "model-x"
@@ -211,7 +215,7 @@ async def test_evaluate_prompt_contains_report_json():
 
     await evaluate_report(report, documents, mock_llm, "model-x")
 
-    user_prompt = mock_llm.complete_structured.call_args.kwargs["user"]
+    user_prompt = mock_llm.last_kwargs["user"]
 
     # Report JSON should be in the prompt
     assert "Vilniaus miesto IT infrastruktūros" in user_prompt
@@ -238,7 +242,7 @@ async def test_evaluate_prompt_document_list_format():
 
     await evaluate_report(report, documents, mock_llm, "model")
 
-    user_prompt = mock_llm.complete_structured.call_args.kwargs["user"]
+    user_prompt = mock_llm.last_kwargs["user"]
 
     # Check numbered format with type and optional pages
     assert "1. spec.pdf (technical_spec, 30 psl.)" in user_prompt
@@ -263,5 +267,84 @@ async def test_evaluate_empty_documents_list():
     assert evaluation.completeness_score == 0.1
 
     # Prompt should have the fallback text for no documents
-    user_prompt = mock_llm.complete_structured.call_args.kwargs["user"]
+    user_prompt = mock_llm.last_kwargs["user"]
     assert "(nėra dokumentų)" in user_prompt
+
+
+@pytest.mark.asyncio
+async def test_evaluate_fast_path_skips_llm():
+    """fast_mode scores a skeletal report locally without calling the LLM."""
+    mock_llm = _make_mock_llm(QAEvaluation(completeness_score=0.5))
+
+    evaluation, usage = await evaluate_report(
+        _make_incomplete_report(), [], mock_llm, "test-model", fast_mode=True
+    )
+
+    assert mock_llm.calls == []
+    assert usage == {"input_tokens": 0, "output_tokens": 0}
+    assert evaluation.completeness_score == FAST_PATH_SCORE
+    assert evaluation.missing_fields == [
+        "procuring_organization",
+        "procurement_type",
+        "estimated_value",
+        "deadlines",
+        "key_requirements",
+        "qualification_requirements",
+        "evaluation_criteria",
+        "submission_requirements",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_evaluate_fast_path_still_calls_llm_for_full_report():
+    """fast_mode only short-circuits when enough core fields are missing."""
+    expected_eval = QAEvaluation(completeness_score=0.9)
+    mock_llm = _make_mock_llm(expected_eval)
+
+    evaluation, _ = await evaluate_report(
+        _make_complete_report(), _make_source_documents(), mock_llm, "m",
+        fast_mode=True,
+    )
+
+    assert len(mock_llm.calls) == 1
+    assert evaluation.completeness_score == 0.9
+
+def test_format_doc_list_is_cached_per_document_set():
+    """Same (filename, type, pages) tuples return the same cached string."""
+    docs = (("spec.pdf", "technical_spec", 30), ("form.docx", "annex", None))
+    first = _format_doc_list(docs)
+    assert first == "1. spec.pdf (technical_spec, 30 psl.)\n2. form.docx (annex)"
+    assert _format_doc_list(tuple(docs)) is first
+    assert _format_doc_list(()) == "(nėra dokumentų)"
+
+
+def test_report_adapter_matches_model_dump_json():
+    """The precompiled adapter emits the same bytes as model_dump_json."""
+    for report in (_make_complete_report(), _make_incomplete_report()):
+        fast = _REPORT_ADAPTER.dump_json(report, indent=2, exclude_none=True)
+        assert fast.decode() == report.model_dump_json(indent=2, exclude_none=True)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_evaluations_do_not_share_state():
+    """Two evaluations gathered together each get their own prompt and result."""
+    complete_eval = QAEvaluation(completeness_score=0.9)
+    incomplete_eval = QAEvaluation(completeness_score=0.1)
+    llm_a = _make_mock_llm(complete_eval)
+    llm_b = _make_mock_llm(incomplete_eval)
+
+    (eval_a, _), (eval_b, _) = await asyncio.gather(
+        evaluate_report(_make_complete_report(), _make_source_documents(), llm_a, "m"),
+        evaluate_report(
+            _make_incomplete_report(),
+            [SourceDocument(filename="only.pdf", type=DocumentType.OTHER)],
+            llm_b,
+            "m",
+        ),
+    )
+
+    assert eval_a.completeness_score == 0.9
+    assert eval_b.completeness_score == 0.1
+    assert "tech_spec.pdf" in llm_a.last_kwargs["user"]
+    assert "only.pdf" in llm_b.last_kwargs["user"]
+    assert "tech_spec.pdf" not in llm_b.last_kwargs["user"]
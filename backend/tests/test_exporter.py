@@ -6,6 +6,8 @@ import asyncio
 from pathlib import Path
 
 import pytest
+import pytest_asyncio
+from docx import Document
 
 from app.models.schemas import (
     AggregatedReport,
@@ -29,162 +31,173 @@ from app.services.exporter import (
 )
 
 
-# ── Fixtures ───────────────────────────────────────────────────────────────────
-
-
-@pytest.fixture
-def full_report() -> AggregatedReport:
-    """Report with all fields populated."""
-    return AggregatedReport(
-        project_summary="Vilniaus miesto savivaldybės administracijos pastato renovacija, apimanti stogo remontą, fasado šiltinimą ir vidaus patalpų atnaujinimą.",
-        procuring_organization=ProcuringOrganization(
-            name="Vilniaus miesto savivaldybės administracija",
-            code="188710061",
-            email="info@vilnius.lt",
-            phone="+370 5 211 2000",
-        ),
-        procurement_type="Atviras konkursas",
-        estimated_value=EstimatedValue(
-            amount=1_250_000.00,
-            currency="EUR",
-            vat_included=True,
-            vat_amount=217_355.37,
-        ),
-        deadlines=Deadlines(
-            submission_deadline="2026-03-15",
-            questions_deadline="2026-03-01",
-            contract_duration="24 mėnesiai",
-            execution_deadline="2028-03-15",
-        ),
-        key_requirements=[
-            "Pastato stogo renovacija pagal STR 2.05.01:2013",
-            "Fasado šiltinimas ne mažiau kaip 150mm mineralinės vatos",
-            "Vidaus patalpų atnaujinimas (1-3 aukštai)",
-            "Priešgaisrinės saugos sistemų atnaujinimas",
-        ],
-        qualification_requirements=QualificationRequirements(
-            financial=[
-                "Metinė apyvarta ne mažesnė kaip 2,000,000 EUR",
-                "Finansinių įsipareigojimų vykdymo garantija",
-            ],
-            technical=[
-                "Turimų kvalifikuotų darbuotojų skaičius ne mažesnis kaip 20",
-                "ISO 9001 kokybės vadybos sertifikatas",
-            ],
-            experience=[
-                "Ne mažiau kaip 3 panašūs objektai per paskutinius 5 metus",
-                "Bent vienas objektas, kurio vertė ne mažesnė kaip 500,000 EUR",
-            ],
-            other=[
-                "Teisė verstis atitinkama veikla",
-            ],
-        ),
-        evaluation_criteria=[
-            EvaluationCriterion(
-                criterion="Kaina",
-                weight_percent=60.0,
-                description="Mažiausia pasiūlyta kaina",
-            ),
-            EvaluationCriterion(
-                criterion="Techniniai privalumai",
-                weight_percent=25.0,
-                description="Papildomi techniniai sprendimai",
-            ),
-            EvaluationCriterion(
-                criterion="Terminai",
-                weight_percent=15.0,
-                description="Trumpesnis darbų atlikimo laikotarpis",
-            ),
-        ],
-        restrictions_and_prohibitions=[
-            "Draudžiama naudoti azbestą turinčias medžiagas",
-            "Subrangovų dalis negali viršyti 40%",
+# ── Test data ──────────────────────────────────────────────────────────────────
+# Plain module constants — built (and validated) once, never mutated by the
+# exporters, and no fixture lookup per test.
+
+
+# Report with all fields populated
+FULL_REPORT = AggregatedReport(
+    project_summary="Vilniaus miesto savivaldybės administracijos pastato renovacija, apimanti stogo remontą, fasado šiltinimą ir vidaus patalpų atnaujinimą.",
+    procuring_organization=ProcuringOrganization(
+        name="Vilniaus miesto savivaldybės administracija",
+        code="188710061",
+        email="info@vilnius.lt",
+        phone="+370 5 211 2000",
+    ),
+    procurement_type="Atviras konkursas",
+    estimated_value=EstimatedValue(
+        amount=1_250_000.00,
+        currency="EUR",
+        vat_included=True,
+        vat_amount=217_355.37,
+    ),
+    deadlines=Deadlines(
+        submission_deadline="2026-03-15",
+        questions_deadline="2026-03-01",
+        contract_duration="24 mėnesiai",
+        execution_deadline="2028-03-15",
+    ),
+    key_requirements=[
+        "Pastato stogo renovacija pagal STR 2.05.01:2013",
+        "Fasado šiltinimas ne mažiau kaip 150mm mineralinės vatos",
+        "Vidaus patalpų atnaujinimas (1-3 aukštai)",
+        "Priešgaisrinės saugos sistemų atnaujinimas",
+    ],
+    qualification_requirements=QualificationRequirements(
+        financial=[
+            "Metinė apyvarta ne mažesnė kaip 2,000,000 EUR",
+            "Finansinių įsipareigojimų vykdymo garantija",
         ],
-        lot_structure=[
-            LotInfo(
-                lot_number=1,
-                description="Stogo renovacija",
-                estimated_value=450_000.00,
-            ),
-            LotInfo(
-                lot_number=2,
-                description="Fasado šiltinimas",
-                estimated_value=550_000.00,
-            ),
-            LotInfo(
-                lot_number=3,
-                description="Vidaus patalpų atnaujinimas",
-                estimated_value=250_000.00,
-            ),
+        technical=[
+            "Turimų kvalifikuotų darbuotojų skaičius ne mažesnis kaip 20",
+            "ISO 9001 kokybės vadybos sertifikatas",
         ],
-        special_conditions=[
-            "Darbai vykdomi nepažeidžiant pastato veiklos",
-            "Triukšmingi darbai tik darbo dienomis 8:00-18:00",
-            "Privaloma draudimo polisas ne mažesniam kaip 500,000 EUR sumai",
+        experience=[
+            "Ne mažiau kaip 3 panašūs objektai per paskutinius 5 metus",
+            "Bent vienas objektas, kurio vertė ne mažesnė kaip 500,000 EUR",
         ],
-        source_documents=[
-            SourceDocument(filename="techninė_specifikacija.pdf", type="technical_spec", pages=45),
-            SourceDocument(filename="sutarties_projektas.pdf", type="contract", pages=20),
+        other=[
+            "Teisė verstis atitinkama veikla",
         ],
-        confidence_notes=[
-            "PVM suma apskaičiuota pagal standartinį 21% tarifą",
-            "Sutarties trukmė nurodyta preliminariai",
-        ],
-    )
+    ),
+    evaluation_criteria=[
+        EvaluationCriterion(
+            criterion="Kaina",
+            weight_percent=60.0,
+            description="Mažiausia pasiūlyta kaina",
+        ),
+        EvaluationCriterion(
+            criterion="Techniniai privalumai",
+            weight_percent=25.0,
+            description="Papildomi techniniai sprendimai",
+        ),
+        EvaluationCriterion(
+            criterion="Terminai",
+            weight_percent=15.0,
+            description="Trumpesnis darbų atlikimo laikotarpis",
+        ),
+    ],
+    restrictions_and_prohibitions=[
+        "Draudžiama naudoti azbestą turinčias medžiagas",
+        "Subrangovų dalis negali viršyti 40%",
+    ],
+    lot_structure=[
+        LotInfo(
+            lot_number=1,
+            description="Stogo renovacija",
+            estimated_value=450_000.00,
+        ),
+        LotInfo(
+            lot_number=2,
+            description="Fasado šiltinimas",
+            estimated_value=550_000.00,
+        ),
+        LotInfo(
+            lot_number=3,
+            description="Vidaus patalpų atnaujinimas",
+            estimated_value=250_000.00,
+        ),
+    ],
+    special_conditions=[
+        "Darbai vykdomi nepažeidžiant pastato veiklos",
+        "Triukšmingi darbai tik darbo dienomis 8:00-18:00",
+        "Privaloma draudimo polisas ne mažesniam kaip 500,000 EUR sumai",
+    ],
+    source_documents=[
+        SourceDocument(filename="techninė_specifikacija.pdf", type="technical_spec", pages=45),
+        SourceDocument(filename="sutarties_projektas.pdf", type="contract", pages=20),
+    ],
+    confidence_notes=[
+        "PVM suma apskaičiuota pagal standartinį 21% tarifą",
+        "Sutarties trukmė nurodyta preliminariai",
+    ],
+)
 
 
-@pytest.fixture
-def full_qa() -> QAEvaluation:
-    """QA evaluation with full data."""
-    return QAEvaluation(
-        completeness_score=0.85,
-        missing_fields=["subrangovų reikalavimai"],
-        conflicts=["Sutarties trukmė skiriasi tarp dokumentų (24 vs 18 mėnesių)"],
-        suggestions=[
-            "Patikrinti ar nurodytos kainos atitinka rinkos kainas",
-            "Papildyti techninę specifikaciją energetinio naudingumo reikalavimais",
-        ],
-    )
+# QA evaluation with full data
+FULL_QA = QAEvaluation(
+    completeness_score=0.85,
+    missing_fields=["subrangovų reikalavimai"],
+    conflicts=["Sutarties trukmė skiriasi tarp dokumentų (24 vs 18 mėnesių)"],
+    suggestions=[
+        "Patikrinti ar nurodytos kainos atitinka rinkos kainas",
+        "Papildyti techninę specifikaciją energetinio naudingumo reikalavimais",
+    ],
+)
 
 
-@pytest.fixture
-def minimal_report() -> AggregatedReport:
-    """Report with minimal data (many None fields)."""
-    return AggregatedReport(
-        project_summary="Minimalus pirkimo aprašymas.",
-    )
+# Report with minimal data (many None fields)
+MINIMAL_REPORT = AggregatedReport(
+    project_summary="Minimalus pirkimo aprašymas.",
+)
 
 
-@pytest.fixture
-def minimal_qa() -> QAEvaluation:
-    """QA with minimal data."""
-    return QAEvaluation(
-        completeness_score=0.3,
-        missing_fields=[
-            "procuring_organization",
-            "estimated_value",
-            "deadlines",
-            "evaluation_criteria",
-        ],
-    )
+# QA with minimal data
+MINIMAL_QA = QAEvaluation(
+    completeness_score=0.3,
+    missing_fields=[
+        "procuring_organization",
+        "estimated_value",
+        "deadlines",
+        "evaluation_criteria",
+    ],
+)
+
 
+# QA with low score (red)
+LOW_SCORE_QA = QAEvaluation(
+    completeness_score=0.2,
+    missing_fields=["almost_everything"],
+    conflicts=["Major conflict found"],
+    suggestions=["Reanalyze documents"],
+)
 
-@pytest.fixture
-def low_score_qa() -> QAEvaluation:
-    """QA with low score (red)."""
-    return QAEvaluation(
-        completeness_score=0.2,
-        missing_fields=["almost_everything"],
-        conflicts=["Major conflict found"],
-        suggestions=["Reanalyze documents"],
+
+# QA with high score (green)
+HIGH_SCORE_QA = QAEvaluation(
+    completeness_score=0.95,
+)
+
+
+# ── Fixtures ───────────────────────────────────────────────────────────────────
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def full_pdf_path(tmp_path_factory) -> Path:
+    """Full-data PDF rendered once per session into a pytest temp dir."""
+    return await export_pdf(
+        FULL_REPORT, FULL_QA, model_used="claude-sonnet-4",
+        output_dir=tmp_path_factory.mktemp("pdf"),
     )
 
 
-@pytest.fixture
-def high_score_qa() -> QAEvaluation:
-    """QA with high score (green)."""
-    return QAEvaluation(
-        completeness_score=0.95,
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def full_docx_path(tmp_path_factory) -> Path:
+    """Full-data DOCX rendered once per session into a pytest temp dir."""
+    return await export_docx(
+        FULL_REPORT, FULL_QA, model_used="claude-sonnet-4",
+        output_dir=tmp_path_factory.mktemp("docx"),
     )
 
 
@@ -280,158 +293,85 @@ class TestSeverityColor:
         assert (r, g, b) == (0, 0, 0)  # Black fallback
 
 
-# ── PDF Export tests ───────────────────────────────────────────────────────────
+# ── Export smoke tests ─────────────────────────────────────────────────────────
 
+PDF_MAGIC = b"%PDF-"
+DOCX_MAGIC = b"PK\x03\x04"  # DOCX files are ZIP archives
 
-class TestExportPDF:
-    @pytest.mark.asyncio
-    async def test_pdf_full_data(self, full_report, full_qa):
-        """PDF generation with full data produces a valid file."""
-        path = await export_pdf(full_report, full_qa, model_used="claude-sonnet-4")
-        try:
-            assert path.exists()
-            assert path.suffix == ".pdf"
-            size = path.stat().st_size
-            assert size > 0
-            # Check PDF magic bytes
-            with open(path, "rb") as f:
-                header = f.read(5)
-            assert header == b"%PDF-"
-        finally:
-            path.unlink(missing_ok=True)
+# (report, qa, model_used — None means not passed)
+EXPORT_VARIANTS = [
+    pytest.param(MINIMAL_REPORT, MINIMAL_QA, None, id="minimal-data"),
+    pytest.param(FULL_REPORT, FULL_QA, "", id="no-model"),
+    pytest.param(FULL_REPORT, LOW_SCORE_QA, "test", id="low-qa-score"),
+    pytest.param(MINIMAL_REPORT, HIGH_SCORE_QA, None, id="high-qa-score"),
+]
 
-    @pytest.mark.asyncio
-    async def test_pdf_minimal_data(self, minimal_report, minimal_qa):
-        """PDF generation with minimal data (many None fields)."""
-        path = await export_pdf(minimal_report, minimal_qa)
-        try:
-            assert path.exists()
-            assert path.suffix == ".pdf"
-            size = path.stat().st_size
-            assert size > 0
-            with open(path, "rb") as f:
-                header = f.read(5)
-            assert header == b"%PDF-"
-        finally:
-            path.unlink(missing_ok=True)
 
-    @pytest.mark.asyncio
-    async def test_pdf_no_model(self, full_report, full_qa):
-        """PDF without model_used still generates."""
-        path = await export_pdf(full_report, full_qa, model_used="")
-        try:
-            assert path.exists()
-            assert path.stat().st_size > 0
-        finally:
-            path.unlink(missing_ok=True)
+def _assert_valid_export(path: Path, suffix: str, magic: bytes) -> None:
+    """Right suffix, non-empty, starts with the format's magic bytes."""
+    assert path.suffix == suffix
+    # One read covers existence, size and header
+    assert path.read_bytes().startswith(magic)
 
-    @pytest.mark.asyncio
-    async def test_pdf_low_qa_score(self, full_report, low_score_qa):
-        """PDF with low QA score still generates."""
-        path = await export_pdf(full_report, low_score_qa, model_used="test")
-        try:
-            assert path.exists()
-            assert path.stat().st_size > 0
-        finally:
-            path.unlink(missing_ok=True)
 
-    @pytest.mark.asyncio
-    async def test_pdf_high_qa_score(self, minimal_report, high_score_qa):
-        """PDF with high QA score."""
-        path = await export_pdf(minimal_report, high_score_qa)
-        try:
-            assert path.exists()
-            assert path.stat().st_size > 0
-        finally:
-            path.unlink(missing_ok=True)
+async def _render(export, report, qa, model, output_dir) -> Path:
+    if model is None:
+        return await export(report, qa, output_dir=output_dir)
+    return await export(report, qa, model_used=model, output_dir=output_dir)
 
 
-# ── DOCX Export tests ──────────────────────────────────────────────────────────
-
+class TestExportPDF:
+    def test_pdf_full_data(self, full_pdf_path):
+        """PDF generation with full data produces a valid file."""
+        _assert_valid_export(full_pdf_path, ".pdf", PDF_MAGIC)
 
-class TestExportDOCX:
     @pytest.mark.asyncio
-    async def test_docx_full_data(self, full_report, full_qa):
-        """DOCX generation with full data produces a valid file."""
-        path = await export_docx(full_report, full_qa, model_used="claude-sonnet-4")
-        try:
-            assert path.exists()
-            assert path.suffix == ".docx"
-            size = path.stat().st_size
-            assert size > 0
-            # DOCX files are ZIP archives — check magic bytes
-            with open(path, "rb") as f:
-                header = f.read(4)
-            assert header == b"PK\x03\x04"
-        finally:
-            path.unlink(missing_ok=True)
+    @pytest.mark.parametrize("report,qa,model", EXPORT_VARIANTS)
+    async def test_pdf_variants(self, tmp_path, report, qa, model):
+        """PDF still generates with sparse data, no model or extreme QA scores."""
+        path = await _render(export_pdf, report, qa, model, tmp_path)
+        assert path.parent == tmp_path
+        _assert_valid_export(path, ".pdf", PDF_MAGIC)
 
-    @pytest.mark.asyncio
-    async def test_docx_minimal_data(self, minimal_report, minimal_qa):
-        """DOCX generation with minimal data (many None fields)."""
-        path = await export_docx(minimal_report, minimal_qa)
-        try:
-            assert path.exists()
-            assert path.suffix == ".docx"
-            size = path.stat().st_size
-            assert size > 0
-            with open(path, "rb") as f:
-                header = f.read(4)
-            assert header == b"PK\x03\x04"
-        finally:
-            path.unlink(missing_ok=True)
 
-    @pytest.mark.asyncio
-    async def test_docx_no_model(self, full_report, full_qa):
-        """DOCX without model_used still generates."""
-        path = await export_docx(full_report, full_qa, model_used="")
-        try:
-            assert path.exists()
-            assert path.stat().st_size > 0
-        finally:
-            path.unlink(missing_ok=True)
-
-    @pytest.mark.asyncio
-    async def test_docx_low_qa_score(self, full_report, low_score_qa):
-        """DOCX with low QA score still generates."""
-        path = await export_docx(full_report, low_score_qa, model_used="test")
-        try:
-            assert path.exists()
-            assert path.stat().st_size > 0
-        finally:
-            path.unlink(missing_ok=True)
+class TestExportDOCX:
+    def test_docx_full_data(self, full_docx_path):
+        """DOCX generation with full data produces a valid file."""
+        _assert_valid_export(full_docx_path, ".docx", DOCX_MAGIC)
 
     @pytest.mark.asyncio
-    async def test_docx_contains_content(self, full_report, full_qa):
+    @pytest.mark.parametrize("report,qa,model", EXPORT_VARIANTS)
+    async def test_docx_variants(self, tmp_path, report, qa, model):
+        """DOCX still generates with sparse data, no model or extreme QA scores."""
+        path = await _render(export_docx, report, qa, model, tmp_path)
+        assert path.parent == tmp_path
+        _assert_valid_export(path, ".docx", DOCX_MAGIC)
+
+    def test_docx_contains_content(self, full_docx_path):
         """DOCX contains expected content."""
-        from docx import Document
-
-        path = await export_docx(full_report, full_qa, model_used="test-model")
-        try:
-            doc = Document(str(path))
-            full_text = "\n".join(p.text for p in doc.paragraphs)
-            # Check key sections exist
-            assert "Projekto santrauka" in full_text
-            assert "Vilniaus miesto" in full_text
-            assert "Vertinimo kriterijai" in full_text
-            assert "Kokybės vertinimas" in full_text
-            assert "85%" in full_text  # QA score
-        finally:
-            path.unlink(missing_ok=True)
-
-    @pytest.mark.asyncio
-    async def test_docx_tables_present(self, full_report, full_qa):
+        doc = Document(str(full_docx_path))
+        # Key sections and the QA score; stop reading once all are seen
+        needles = {
+            "Projekto santrauka",
+            "Vilniaus miesto",
+            "Vertinimo kriterijai",
+            "Kokybės vertinimas",
+            "85%",
+        }
+        missing = set(needles)
+        for paragraph in doc.paragraphs:
+            text = paragraph.text
+            missing -= {n for n in missing if n in text}
+            if not missing:
+                break
+        assert not missing
+
+    def test_docx_tables_present(self, full_docx_path):
         """DOCX contains tables for criteria and lots."""
-        from docx import Document
-
-        path = await export_docx(full_report, full_qa)
-        try:
-            doc = Document(str(path))
-            # Should have at least 2 tables (criteria + lots)
-            assert len(doc.tables) >= 2
-            # Check evaluation criteria table
-            criteria_table = doc.tables[0]
-            assert criteria_table.rows[0].cells[0].text == "Kriterijus"
-            assert len(criteria_table.rows) == 4  # header + 3 criteria
-        finally:
-            path.unlink(missing_ok=True)
+        doc = Document(str(full_docx_path))
+        # Should have at least 2 tables (criteria + lots)
+        assert len(doc.tables) >= 2
+        # Check evaluation criteria table
+        criteria_table = doc.tables[0]
+        assert criteria_table.rows[0].cells[0].text == "Kriterijus"
+        assert len(criteria_table.rows) == 4  # header + 3 criteria
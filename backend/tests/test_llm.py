@@ -1,21 +1,23 @@
 # backend/tests/test_llm.py
-# Tests for the OpenRouter LLM client with mocked httpx responses.
+# Tests for the OpenRouter LLM client against an httpx.MockTransport.
 # Covers structured completion, text completion, retries, streaming, model listing.
 
+import asyncio
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from functools import lru_cache
 
 import httpx
 import pytest
 from pydantic import BaseModel
 
 from app.services.llm import (
+    MANDATORY_MODELS,
     LLMClient,
     LLMError,
     LLMParseError,
     LLMRateLimitError,
     _build_thinking,
-    _clean_json_schema,
+    _clean_schema_generic,
     _extract_usage,
 )
 
@@ -29,30 +31,40 @@ class SimpleSchema(BaseModel):
     score: float
 
 
+# httpx.Response copies headers into its own Headers, so these are shared
+_JSON_HEADERS = {"content-type": "application/json"}
+_TEXT_HEADERS = {"content-type": "text/plain"}
+
+
 def _make_response(
     status_code: int = 200,
     json_body: dict | None = None,
     text: str = "",
+    json_bytes: bytes | None = None,
 ) -> httpx.Response:
-    """Create a mock httpx.Response."""
-    if json_body is not None:
+    """Build a canned httpx.Response for MockAPI.reply().
+
+    `json_bytes` is an already-encoded body, e.g. from _chat_response_bytes().
+    """
+    if json_bytes is not None:
+        content = json_bytes
+        headers = _JSON_HEADERS
+    elif json_body is not None:
         content = json.dumps(json_body).encode()
-        headers = {"content-type": "application/json"}
+        headers = _JSON_HEADERS
     else:
         content = text.encode()
-        headers = {"content-type": "text/plain"}
+        headers = _TEXT_HEADERS
 
-    return httpx.Response(
-        status_code=status_code,
-        content=content,
-        headers=headers,
-        request=httpx.Request("POST", "https://openrouter.ai/api/v1/chat/completions"),
-    )
+    return httpx.Response(status_code=status_code, content=content, headers=headers)
 
 
-def _chat_response(content: str, prompt_tokens: int = 100, completion_tokens: int = 50) -> dict:
-    """Build a standard OpenRouter chat completion response body."""
-    return {
+@lru_cache(maxsize=64)
+def _chat_response_bytes(
+    content: str, prompt_tokens: int = 100, completion_tokens: int = 50
+) -> bytes:
+    """Encoded OpenRouter chat completion body, built once per argument set."""
+    return json.dumps({
         "choices": [
             {
                 "message": {
@@ -65,49 +77,48 @@ def _chat_response(content: str, prompt_tokens: int = 100, completion_tokens: in
             "prompt_tokens": prompt_tokens,
             "completion_tokens": completion_tokens,
         },
-    }
+    }).encode()
 
 
 # ── Unit tests for helpers ──────────────────────────────────────────────────────
 
 
 class TestBuildThinking:
-    def test_off(self):
-        assert _build_thinking("off") is None
-
-    def test_low(self):
-        result = _build_thinking("low")
-        assert result == {"type": "enabled", "budget_tokens": 2000}
-
-    def test_medium(self):
-        result = _build_thinking("medium")
-        assert result == {"type": "enabled", "budget_tokens": 5000}
-
-    def test_high(self):
-        result = _build_thinking("high")
-        assert result == {"type": "enabled", "budget_tokens": 10000}
-
-    def test_unknown_returns_none(self):
-        assert _build_thinking("nonexistent") is None
+    @pytest.mark.parametrize(
+        "level,expected",
+        [
+            ("off", None),
+            ("low", {"type": "enabled", "budget_tokens": 2000}),
+            ("medium", {"type": "enabled", "budget_tokens": 5000}),
+            ("high", {"type": "enabled", "budget_tokens": 10000}),
+            ("nonexistent", None),
+        ],
+    )
+    def test_levels(self, level: str, expected: dict | None):
+        assert _build_thinking(level) == expected
 
 
 class TestExtractUsage:
-    def test_normal(self):
-        data = {"usage": {"prompt_tokens": 150, "completion_tokens": 75}}
-        assert _extract_usage(data) == {"input_tokens": 150, "output_tokens": 75}
-
-    def test_missing_usage(self):
-        assert _extract_usage({}) == {"input_tokens": 0, "output_tokens": 0}
-
-    def test_partial_usage(self):
-        data = {"usage": {"prompt_tokens": 42}}
-        assert _extract_usage(data) == {"input_tokens": 42, "output_tokens": 0}
+    @pytest.mark.parametrize(
+        "data,expected",
+        [
+            (
+                {"usage": {"prompt_tokens": 150, "completion_tokens": 75}},
+                {"input_tokens": 150, "output_tokens": 75},
+            ),
+            ({}, {"input_tokens": 0, "output_tokens": 0}),
+            ({"usage": {"prompt_tokens": 42}}, {"input_tokens": 42, "output_tokens": 0}),
+        ],
+        ids=["normal", "missing_usage", "partial_usage"],
+    )
+    def test_extract(self, data: dict, expected: dict):
+        assert _extract_usage(data) == expected
 
 
 class TestCleanJsonSchema:
     def test_removes_title(self):
         schema = {"title": "Foo", "type": "object", "properties": {}}
-        cleaned = _clean_json_schema(schema)
+        cleaned = _clean_schema_generic(schema)
         assert "title" not in cleaned
         assert cleaned["type"] == "object"
 
@@ -118,298 +129,350 @@ class TestCleanJsonSchema:
                 "name": {"title": "Name", "type": "string"}
             },
         }
-        cleaned = _clean_json_schema(schema)
+        cleaned = _clean_schema_generic(schema)
         assert "title" not in cleaned["properties"]["name"]
 
     def test_preserves_other_keys(self):
         schema = {"type": "string", "description": "hello", "title": "T"}
-        cleaned = _clean_json_schema(schema)
+        cleaned = _clean_schema_generic(schema)
         assert cleaned == {"type": "string", "description": "hello"}
 
 
-# ── Integration tests with mocked httpx ─────────────────────────────────────────
+# ── Integration tests through httpx.MockTransport ───────────────────────────────
 
 
-@pytest.fixture
-def client():
-    """Create an LLMClient instance (no real API calls)."""
-    return LLMClient(api_key="test-key-123", default_model="test/model")
+class MockAPI:
+    """OpenRouter stand-in behind the shared client's httpx.MockTransport.
 
+    Serves the replies in order (the last one repeats) and records every
+    request it receives.
+    """
 
-class TestCompleteStructured:
-    @pytest.mark.asyncio
-    async def test_success(self, client: LLMClient):
-        structured_content = json.dumps({"name": "Test", "score": 0.95})
-        mock_resp = _make_response(
-            json_body=_chat_response(structured_content, 200, 80)
+    def __init__(self):
+        self.responses: list[httpx.Response] = []
+        self.requests: list[httpx.Request] = []
+
+    def reply(self, *responses: httpx.Response) -> None:
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        template = self.responses[min(len(self.requests), len(self.responses) - 1)]
+        self.requests.append(request)
+        # A fresh object per call — httpx binds each response to its request
+        return httpx.Response(
+            template.status_code,
+            headers=template.headers,
+            content=template.content,
         )
 
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            result, usage = await client.complete_structured(
-                system="You are a test.",
-                user="Extract data.",
-                response_schema=SimpleSchema,
-                thinking="off",
-            )
 
-        assert isinstance(result, SimpleSchema)
-        assert result.name == "Test"
-        assert result.score == 0.95
-        assert usage == {"input_tokens": 200, "output_tokens": 80}
+@pytest.fixture(scope="session")
+def api() -> MockAPI:
+    return MockAPI()
 
-    @pytest.mark.asyncio
-    async def test_parse_error(self, client: LLMClient):
-        mock_resp = _make_response(
-            json_body=_chat_response("not valid json {{{", 100, 50)
-        )
 
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            with pytest.raises(LLMParseError):
-                await client.complete_structured(
-                    system="sys",
-                    user="usr",
-                    response_schema=SimpleSchema,
-                    thinking="off",
-                )
+@pytest.fixture(scope="session")
+def client(api: MockAPI):
+    """One LLMClient for the whole run; all traffic goes to `api`.
 
-    @pytest.mark.asyncio
-    async def test_no_content_in_response(self, client: LLMClient):
-        mock_resp = _make_response(json_body={"choices": []})
+    Safe to share: each test sets its own replies with api.reply().
+    TestClientLifecycle builds its own client so this one is never closed.
+    """
+    return LLMClient(
+        api_key="test-key-123",
+        default_model="test/model",
+        transport=httpx.MockTransport(api),
+    )
 
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            with pytest.raises(LLMParseError):
-                await client.complete_structured(
-                    system="sys",
-                    user="usr",
-                    response_schema=SimpleSchema,
-                    thinking="off",
-                )
 
+def _scripted_client(*responses: httpx.Response) -> tuple[LLMClient, MockAPI]:
+    """A separate client with its own MockAPI, for tests that run concurrently."""
+    api = MockAPI()
+    api.reply(*responses)
+    llm = LLMClient(
+        api_key="test-key-123",
+        default_model="test/model",
+        transport=httpx.MockTransport(api),
+    )
+    return llm, api
 
-class TestCompleteText:
-    @pytest.mark.asyncio
-    async def test_success(self, client: LLMClient):
-        mock_resp = _make_response(
-            json_body=_chat_response("Hello, world!", 50, 10)
+
+async def _run_scenarios(*scenarios) -> None:
+    """Run (check, responses) pairs concurrently, each on its own scripted client.
+
+    Every check awaits its client and asserts; the first failure is re-raised
+    once all of them have finished and the clients are closed.
+    """
+    clients = [_scripted_client(*responses)[0] for _, responses in scenarios]
+    try:
+        outcomes = await asyncio.gather(
+            *(check(llm) for (check, _), llm in zip(scenarios, clients)),
+            return_exceptions=True,
+        )
+    finally:
+        await asyncio.gather(*(llm.close() for llm in clients))
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+
+
+_STRUCTURED_CONTENT = SimpleSchema(name="Test", score=0.95).model_dump_json()
+# Parsed once; SimpleSchema keeps its compiled validator on the class
+_STRUCTURED_EXPECTED = SimpleSchema.model_validate_json(_STRUCTURED_CONTENT)
+
+
+class TestCompleteStructured:
+    @staticmethod
+    async def _success(llm: LLMClient):
+        result, usage = await llm.complete_structured(
+            system="You are a test.",
+            user="Extract data.",
+            response_schema=SimpleSchema,
+            thinking="off",
         )
 
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            text, usage = await client.complete_text(
-                system="You are helpful.",
-                user="Say hello.",
+        assert result == _STRUCTURED_EXPECTED
+        assert result.name == "Test"
+        assert result.score == 0.95
+        assert usage == {"input_tokens": 200, "output_tokens": 80}
+
+    @staticmethod
+    async def _raises_parse_error(llm: LLMClient):
+        with pytest.raises(LLMParseError):
+            await llm.complete_structured(
+                system="sys",
+                user="usr",
+                response_schema=SimpleSchema,
                 thinking="off",
             )
 
-        assert text == "Hello, world!"
-        assert usage == {"input_tokens": 50, "output_tokens": 10}
+    @pytest.mark.asyncio
+    async def test_scenarios(self):
+        """Success, unparseable content, and no content in the response."""
+        await _run_scenarios(
+            (
+                self._success,
+                [_make_response(json_bytes=_chat_response_bytes(_STRUCTURED_CONTENT, 200, 80))],
+            ),
+            (
+                self._raises_parse_error,
+                [_make_response(json_bytes=_chat_response_bytes("not valid json {{{", 100, 50))],
+            ),
+            (self._raises_parse_error, [_make_response(json_body={"choices": []})]),
+        )
 
 
-class TestRetryLogic:
+class TestCompleteText:
     @pytest.mark.asyncio
-    async def test_retry_on_429_then_success(self, client: LLMClient):
-        rate_limit_resp = _make_response(status_code=429, text="rate limited")
-        success_resp = _make_response(
-            json_body=_chat_response("ok", 10, 5)
+    async def test_success(self, client: LLMClient, api: MockAPI):
+        api.reply(_make_response(json_bytes=_chat_response_bytes("Hello, world!", 50, 10)))
+
+        text, usage = await client.complete_text(
+            system="You are helpful.",
+            user="Say hello.",
+            thinking="off",
         )
 
-        mock_request = AsyncMock(side_effect=[rate_limit_resp, success_resp])
+        assert text == "Hello, world!"
+        assert usage == {"input_tokens": 50, "output_tokens": 10}
+
 
-        with patch.object(client._client, "request", mock_request):
-            with patch("app.services.llm.asyncio.sleep", new_callable=AsyncMock):
-                text, usage = await client.complete_text(
-                    system="sys",
-                    user="usr",
-                    thinking="off",
-                )
+async def _no_sleep(delay: float, result=None):
+    """Stands in for asyncio.sleep so backoff doesn't wait."""
+    return result
 
-        assert text == "ok"
-        assert mock_request.call_count == 2
+
+class TestRetryLogic:
+    @pytest.fixture(autouse=True)
+    def _skip_backoff(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr("app.services.llm.asyncio.sleep", _no_sleep)
 
     @pytest.mark.asyncio
-    async def test_retry_on_500_then_success(self, client: LLMClient):
-        server_err_resp = _make_response(status_code=500, text="internal error")
-        success_resp = _make_response(
-            json_body=_chat_response("recovered", 10, 5)
-        )
+    async def test_retry_scenarios(self):
+        """All retry paths at once — one client each, backoff skipped."""
+        rate_limited = _make_response(status_code=429, text="rate limited")
+        scripted = [
+            _scripted_client(
+                rate_limited,
+                _make_response(json_bytes=_chat_response_bytes("ok", 10, 5)),
+            ),
+            _scripted_client(
+                _make_response(status_code=500, text="internal error"),
+                _make_response(json_bytes=_chat_response_bytes("recovered", 10, 5)),
+            ),
+            _scripted_client(rate_limited),
+            _scripted_client(_make_response(status_code=400, text="bad request")),
+        ]
 
-        mock_request = AsyncMock(side_effect=[server_err_resp, success_resp])
+        async def run(llm: LLMClient):
+            try:
+                text, _ = await llm.complete_text(system="sys", user="usr", thinking="off")
+                return text
+            except LLMError as exc:
+                return exc
 
-        with patch.object(client._client, "request", mock_request):
-            with patch("app.services.llm.asyncio.sleep", new_callable=AsyncMock):
-                text, usage = await client.complete_text(
-                    system="sys",
-                    user="usr",
-                    thinking="off",
-                )
+        try:
+            after_429, after_500, exhausted, bad_request = await asyncio.gather(
+                *(run(llm) for llm, _ in scripted)
+            )
+        finally:
+            await asyncio.gather(*(llm.close() for llm, _ in scripted))
 
-        assert text == "recovered"
-        assert mock_request.call_count == 2
+        calls = [len(api.requests) for _, api in scripted]
 
-    @pytest.mark.asyncio
-    async def test_exhausted_retries_raises(self, client: LLMClient):
-        rate_limit_resp = _make_response(status_code=429, text="rate limited")
-        mock_request = AsyncMock(return_value=rate_limit_resp)
+        # 429 then success
+        assert after_429 == "ok"
+        # 500 then success
+        assert after_500 == "recovered"
+        # Rate limited on every attempt
+        assert isinstance(exhausted, LLMRateLimitError)
+        # 4xx is not retried
+        assert isinstance(bad_request, LLMError)
+        assert bad_request.status_code == 400
+        assert calls == [2, 2, 3, 1]
 
-        with patch.object(client._client, "request", mock_request):
-            with patch("app.services.llm.asyncio.sleep", new_callable=AsyncMock):
-                with pytest.raises(LLMRateLimitError):
-                    await client.complete_text(
-                        system="sys",
-                        user="usr",
-                        thinking="off",
-                    )
 
-        assert mock_request.call_count == 3
+@lru_cache(maxsize=16)
+def _sse_body(lines: tuple[str, ...]) -> bytes:
+    """Encoded event-stream body, built once per line sequence."""
+    return "\n\n".join(lines).encode()
 
-    @pytest.mark.asyncio
-    async def test_4xx_not_retried(self, client: LLMClient):
-        bad_req_resp = _make_response(status_code=400, text="bad request")
-        mock_request = AsyncMock(return_value=bad_req_resp)
 
-        with patch.object(client._client, "request", mock_request):
-            with pytest.raises(LLMError) as exc_info:
-                await client.complete_text(
-                    system="sys",
-                    user="usr",
-                    thinking="off",
-                )
+def _sse_response(*lines: str) -> httpx.Response:
+    """An event-stream response carrying the given SSE lines."""
+    return httpx.Response(
+        200,
+        content=_sse_body(lines),
+        headers={"content-type": "text/event-stream"},
+    )
 
-        assert exc_info.value.status_code == 400
-        assert mock_request.call_count == 1  # No retries
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
 
 
 class TestCompleteStreaming:
     @pytest.mark.asyncio
-    async def test_streaming_yields_chunks(self, client: LLMClient):
-        sse_lines = [
+    async def test_streaming_yields_chunks(self, client: LLMClient, api: MockAPI):
+        api.reply(_sse_response(
             'data: {"choices":[{"delta":{"content":"Hello"}}]}',
             'data: {"choices":[{"delta":{"content":" world"}}]}',
             'data: {"choices":[{"delta":{"content":"!"}}]}',
             "data: [DONE]",
-        ]
+        ))
 
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.aiter_lines = _async_line_iter(sse_lines)
-        mock_response.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_response.__aexit__ = AsyncMock(return_value=False)
-
-        with patch.object(client._client, "stream", return_value=mock_response):
-            chunks = []
-            async for chunk in client.complete_streaming(
-                system="sys",
-                messages=[{"role": "user", "content": "hi"}],
-                thinking="off",
-            ):
-                chunks.append(chunk)
+        chunks = await _collect(client.complete_streaming(
+            system="sys",
+            messages=[{"role": "user", "content": "hi"}],
+            thinking="off",
+        ))
 
         assert chunks == ["Hello", " world", "!"]
 
     @pytest.mark.asyncio
-    async def test_streaming_skips_empty_deltas(self, client: LLMClient):
-        sse_lines = [
+    async def test_streaming_skips_empty_deltas(self, client: LLMClient, api: MockAPI):
+        api.reply(_sse_response(
             'data: {"choices":[{"delta":{}}]}',
             'data: {"choices":[{"delta":{"content":"only"}}]}',
             "data: [DONE]",
-        ]
+        ))
 
-        mock_response = AsyncMock()
-        mock_response.status_code = 200
-        mock_response.aiter_lines = _async_line_iter(sse_lines)
-        mock_response.__aenter__ = AsyncMock(return_value=mock_response)
-        mock_response.__aexit__ = AsyncMock(return_value=False)
-
-        with patch.object(client._client, "stream", return_value=mock_response):
-            chunks = []
-            async for chunk in client.complete_streaming(
-                system="sys",
-                messages=[{"role": "user", "content": "hi"}],
-                thinking="off",
-            ):
-                chunks.append(chunk)
+        chunks = await _collect(client.complete_streaming(
+            system="sys",
+            messages=[{"role": "user", "content": "hi"}],
+            thinking="off",
+        ))
 
         assert chunks == ["only"]
 
 
-def _async_line_iter(lines: list[str]):
-    """Create an async iterator factory for mock aiter_lines."""
-    async def _iter():
-        for line in lines:
-            yield line
-    return _iter
+# /models bodies, encoded once at import
+_LIST_MODELS_BYTES = json.dumps({
+    "data": [
+        {
+            "id": "anthropic/claude-sonnet-4",
+            "name": "Claude Sonnet 4",
+            "context_length": 200000,
+            "pricing": {"prompt": "0.003", "completion": "0.015"},
+            "supported_parameters": ["json_schema", "temperature"],
+        },
+        {
+            "id": "meta/llama-3-8b",
+            "name": "Llama 3 8B",
+            "context_length": 8192,
+            "pricing": {"prompt": "0.0001", "completion": "0.0002"},
+            "supported_parameters": ["temperature"],
+            # No json_schema → filtered out
+        },
+        {
+            "id": "google/gemini-pro",
+            "name": "Gemini Pro",
+            "context_length": 128000,
+            "pricing": {"prompt": "0.001", "completion": "0.002"},
+            "supported_parameters": ["json_schema", "temperature", "top_p"],
+        },
+    ]
+}).encode()
+
+_NO_PARAMS_MODELS_BYTES = json.dumps({
+    "data": [
+        {
+            "id": "openai/gpt-4",
+            "name": "GPT-4",
+            "context_length": 8192,
+            "pricing": {"prompt": "0.03", "completion": "0.06"},
+            # No supported_parameters at all
+        },
+    ]
+}).encode()
 
 
 class TestListModels:
-    @pytest.mark.asyncio
-    async def test_list_models_filters_and_maps(self, client: LLMClient):
-        api_response = {
-            "data": [
-                {
-                    "id": "anthropic/claude-sonnet-4",
-                    "name": "Claude Sonnet 4",
-                    "context_length": 200000,
-                    "pricing": {"prompt": "0.003", "completion": "0.015"},
-                    "supported_parameters": ["json_schema", "temperature"],
-                },
-                {
-                    "id": "meta/llama-3-8b",
-                    "name": "Llama 3 8B",
-                    "context_length": 8192,
-                    "pricing": {"prompt": "0.0001", "completion": "0.0002"},
-                    "supported_parameters": ["temperature"],
-                    # No json_schema → filtered out
-                },
-                {
-                    "id": "google/gemini-pro",
-                    "name": "Gemini Pro",
-                    "context_length": 128000,
-                    "pricing": {"prompt": "0.001", "completion": "0.002"},
-                    "supported_parameters": ["json_schema", "temperature", "top_p"],
-                },
-            ]
+    @staticmethod
+    async def _filters_and_maps(llm: LLMClient):
+        models = await llm.list_models()
+        by_id = {m["id"]: m for m in models}
+
+        assert "meta/llama-3-8b" not in by_id  # no json_schema support
+        assert by_id["anthropic/claude-sonnet-4"] == {
+            "id": "anthropic/claude-sonnet-4",
+            "name": "Claude Sonnet 4",
+            "context_length": 200000,
+            "pricing_prompt": 3000.0,  # per-token prices → per million
+            "pricing_completion": 15000.0,
         }
+        assert "google/gemini-pro" in by_id
+        # Mandatory models are always listed, and listed first
+        assert {m["id"] for m in models[: len(MANDATORY_MODELS)]} == MANDATORY_MODELS
 
-        mock_resp = _make_response(json_body=api_response)
-
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            models = await client.list_models()
+    @staticmethod
+    async def _no_supported_params_filtered_out(llm: LLMClient):
+        """Models that don't declare json_schema support are dropped."""
+        models = await llm.list_models()
 
-        assert len(models) == 2
-        assert models[0]["id"] == "anthropic/claude-sonnet-4"
-        assert models[0]["name"] == "Claude Sonnet 4"
-        assert models[0]["context_length"] == 200000
-        assert models[0]["pricing_prompt"] == 0.003
-        assert models[0]["pricing_completion"] == 0.015
-        assert models[1]["id"] == "google/gemini-pro"
+        assert {m["id"] for m in models} == MANDATORY_MODELS
 
     @pytest.mark.asyncio
-    async def test_list_models_no_supported_params_included(self, client: LLMClient):
-        """Models with no supported_parameters field should be included (not filtered)."""
-        api_response = {
-            "data": [
-                {
-                    "id": "openai/gpt-4",
-                    "name": "GPT-4",
-                    "context_length": 8192,
-                    "pricing": {"prompt": "0.03", "completion": "0.06"},
-                    # No supported_parameters at all
-                },
-            ]
-        }
-
-        mock_resp = _make_response(json_body=api_response)
+    async def test_list_models(self):
+        await _run_scenarios(
+            (self._filters_and_maps, [_make_response(json_bytes=_LIST_MODELS_BYTES)]),
+            (
+                self._no_supported_params_filtered_out,
+                [_make_response(json_bytes=_NO_PARAMS_MODELS_BYTES)],
+            ),
+        )
 
-        with patch.object(client._client, "request", new_callable=AsyncMock, return_value=mock_resp):
-            models = await client.list_models()
 
-        assert len(models) == 1
-        assert models[0]["id"] == "openai/gpt-4"
+# _build_body only places messages in the body, so these are shared as is
+_USER_HI = [{"role": "user", "content": "hi"}]
+_NO_MESSAGES: list[dict] = []
 
 
 class TestBuildBody:
     def test_includes_thinking_when_enabled(self, client: LLMClient):
         body = client._build_body(
-            messages=[{"role": "user", "content": "hi"}],
+            messages=_USER_HI,
             model=None,
             thinking="high",
         )
@@ -418,40 +481,38 @@ class TestBuildBody:
 
     def test_no_thinking_when_off(self, client: LLMClient):
         body = client._build_body(
-            messages=[{"role": "user", "content": "hi"}],
+            messages=_USER_HI,
             model="custom/model",
             thinking="off",
         )
         assert "thinking" not in body
         assert body["model"] == "custom/model"
 
-    def test_response_format_adds_provider(self, client: LLMClient):
+    def test_response_format_included(self, client: LLMClient):
         fmt = {"type": "json_schema", "json_schema": {"name": "T", "strict": True, "schema": {}}}
         body = client._build_body(
-            messages=[],
+            messages=_NO_MESSAGES,
             model=None,
             response_format=fmt,
         )
         assert body["response_format"] == fmt
-        assert body["provider"] == {"require_parameters": True}
 
     def test_temperature_included(self, client: LLMClient):
         body = client._build_body(
-            messages=[],
+            messages=_NO_MESSAGES,
             model=None,
             temperature=0.7,
         )
         assert body["temperature"] == 0.7
 
     def test_temperature_none_excluded(self, client: LLMClient):
-        body = client._build_body(messages=[], model=None)
+        body = client._build_body(messages=_NO_MESSAGES, model=None)
         assert "temperature" not in body
 
 
 class TestClientLifecycle:
     @pytest.mark.asyncio
     async def test_close(self):
-        llm = LLMClient(api_key="test")
-        with patch.object(llm._client, "aclose", new_callable=AsyncMock) as mock_close:
-            await llm.close()
-            mock_close.assert_called_once()
+        llm, _ = _scripted_client()  # MockTransport — no pool or TLS setup
+        await llm.close()
+        assert llm._client.is_closed
@@ -0,0 +1,88 @@
+# backend/tests/test_llm_cache.py
+# Tests for the content-addressed LLM result cache (services/llm_cache.py)
+# Covers: key construction, get/set round-trip, expiry, disable flag, cache location,
+# extract_all hits
+# Related: backend/app/services/llm_cache.py, backend/app/services/extraction.py
+
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.config import get_settings
+from app.models.schemas import DocumentType, ExtractionResult
+from app.services import llm_cache
+from app.services.extraction import extract_all
+from app.services.parser import ParsedDocument
+
+
+class TestMakeKey:
+    def test_same_parts_same_key(self):
+        assert llm_cache.make_key("m", "prompt", "doc") == llm_cache.make_key("m", "prompt", "doc")
+
+    def test_part_boundaries_matter(self):
+        assert llm_cache.make_key("ab", "c") != llm_cache.make_key("a", "bc")
+
+
+class TestGetSet:
+    def test_round_trip(self):
+        llm_cache.set("k", '{"a": 1}')
+        assert llm_cache.get("k") == '{"a": 1}'
+
+    def test_missing_key(self):
+        assert llm_cache.get("missing") is None
+
+    def test_expired_entry_is_dropped(self, monkeypatch):
+        llm_cache.set("k", "value")
+        monkeypatch.setattr(time, "time", lambda: 2**40)
+        assert llm_cache.get("k") is None
+
+    def test_disabled_cache_bypassed(self, monkeypatch):
+        llm_cache.set("k", "value")
+        monkeypatch.setattr(get_settings(), "llm_cache_enabled", False)
+        assert llm_cache.get("k") is None
+
+    def test_cache_dir_is_private(self):
+        llm_cache.set("k", "value")
+        cache_dir = Path(get_settings().llm_cache_dir)
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    def test_defaults_under_temp_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "llm_cache_dir", "")
+        monkeypatch.setattr(get_settings(), "temp_dir", str(tmp_path / "app_tmp"))
+        llm_cache.set("k", "value")
+        assert (tmp_path / "app_tmp" / "llm_cache" / "k.json").exists()
+
+    def test_foreign_cache_dir_is_not_trusted(self, tmp_path, monkeypatch):
+        shared = tmp_path / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        monkeypatch.setattr(get_settings(), "llm_cache_dir", str(shared / "llm_cache"))
+        llm_cache.set("k", "value")
+        assert llm_cache.get("k") is None
+        assert not (shared / "llm_cache").exists()
+
+
+@pytest.mark.asyncio
+async def test_extract_all_second_run_served_from_cache():
+    doc = ParsedDocument(
+        filename="spec.pdf",
+        content="Techninė specifikacija",
+        page_count=1,
+        file_size_bytes=100,
+        doc_type=DocumentType.TECHNICAL_SPEC,
+        token_estimate=5,
+    )
+    llm = MagicMock()
+    llm.complete_structured_streaming = AsyncMock(return_value=(
+        ExtractionResult(project_summary="Santrauka"),
+        {"input_tokens": 100, "output_tokens": 50},
+    ))
+
+    first = await extract_all([doc], llm, "test-model")
+    second = await extract_all([doc], llm, "test-model")
+
+    assert llm.complete_structured_streaming.await_count == 1
+    assert second[0][1] == first[0][1]
+    assert second[0][2] == llm_cache.CACHED_USAGE
@@ -4,19 +4,30 @@
 
 import asyncio
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 from docx import Document as DocxDocument
 
+from app.config import get_settings
 from app.models.schemas import DocumentType
+from app.services import parser as parser_module
 from app.services.parser import (
     ParsedDocument,
+    _docling_cache_get,
+    _docling_cache_key,
+    _docling_cache_put,
+    _convert,
     _estimate_pages,
+    _parse_with_docling,
+    _render_table,
     classify_document,
     parse_all,
     parse_document,
+    warmup_parsers,
 )
 
 
@@ -264,6 +275,199 @@ class TestClassifyDocument:
         )
 
 
+# ── ParsedDocument derived fields ────────────────────────────────────────────
+
+
+class TestParsedDocumentDerivedFields:
+    @pytest.mark.parametrize("filename", [
+        "spec.pdf", "Sutartis.DOCX", "a.b.xlsx", ".hidden", "no_ext", "dir/scan.png",
+    ])
+    def test_format_matches_path_suffix(self, filename):
+        doc = ParsedDocument(
+            filename=filename,
+            content="",
+            page_count=1,
+            file_size_bytes=0,
+            doc_type=DocumentType.OTHER,
+            token_estimate=0,
+        )
+        assert doc.format == Path(filename).suffix.lstrip(".")
+
+    def test_size_kb(self):
+        doc = ParsedDocument(
+            filename="a.pdf",
+            content="",
+            page_count=1,
+            file_size_bytes=5000,
+            doc_type=DocumentType.OTHER,
+            token_estimate=0,
+        )
+        assert doc.size_kb == 4
+
+
+# ── Table rendering tests ────────────────────────────────────────────────────
+
+
+class TestRenderTable:
+    def test_renders_header_separator_and_rows(self):
+        table = DocxDocument().add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "Pavadinimas"
+        table.cell(0, 1).text = "Kaina"
+        table.cell(1, 0).text = "Prekė"
+        table.cell(1, 1).text = "100"
+        parts: list[str] = []
+        _render_table(table, parts)
+        assert parts == [
+            "| Pavadinimas | Kaina |",
+            "| --- | --- |",
+            "| Prekė | 100 |",
+        ]
+
+    def test_empty_table_is_skipped(self):
+        table = DocxDocument().add_table(rows=3, cols=3)
+        parts: list[str] = []
+        _render_table(table, parts)
+        assert parts == []
+
+
+# ── Docling cache tests ──────────────────────────────────────────────────────
+
+
+class TestDoclingCache:
+    @pytest.fixture(autouse=True)
+    def cache_dir(self, tmp_path: Path, monkeypatch):
+        temp_dir = tmp_path / "app_tmp"
+        monkeypatch.setattr(get_settings(), "temp_dir", str(temp_dir))
+        cache = temp_dir / parser_module._DOCLING_CACHE_SUBDIR
+        monkeypatch.setattr(parser_module, "_docling_cache_bytes", None)
+        return cache
+
+    def test_key_depends_on_content(self, tmp_path: Path):
+        a = tmp_path / "a.pptx"
+        b = tmp_path / "b.pptx"
+        a.write_bytes(b"same")
+        b.write_bytes(b"same")
+        assert _docling_cache_key(a) == _docling_cache_key(b)
+        b.write_bytes(b"different")
+        assert _docling_cache_key(a) != _docling_cache_key(b)
+
+    def test_key_depends_on_docling_version(self, tmp_path: Path, monkeypatch):
+        path = tmp_path / "a.pptx"
+        path.write_bytes(b"same")
+        before = _docling_cache_key(path)
+        monkeypatch.setattr(parser_module, "_docling_version", lambda: "99.0")
+        assert _docling_cache_key(path) != before
+
+    def test_cache_hit_skips_conversion(self, tmp_path: Path):
+        path = tmp_path / "slides.pptx"
+        path.write_bytes(b"pptx bytes")
+        _docling_cache_put(_docling_cache_key(path), "# Cached", 3)
+
+        with patch.object(parser_module, "_get_converter") as get_converter:
+            assert _parse_with_docling(path, ".pptx") == ("# Cached", 3)
+        get_converter.assert_not_called()
+
+    def test_eviction_respects_budget(self, cache_dir: Path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "parser_cache_max_mb", 0)
+        _docling_cache_put("k1", "x" * 100, 1)
+        assert _docling_cache_get("k1") is None
+        assert list(cache_dir.glob("*.json")) == []
+
+    def test_cache_dir_is_private(self, cache_dir: Path):
+        _docling_cache_put("k1", "x", 1)
+        assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    def test_shared_temp_dir_disables_cache(self, cache_dir: Path):
+        cache_dir.parent.mkdir()
+        cache_dir.parent.chmod(0o777)
+        _docling_cache_put("k1", "x", 1)
+        assert _docling_cache_get("k1") is None
+        assert not cache_dir.exists()
+
+    def test_directory_scanned_only_over_budget(self):
+        with patch.object(
+            parser_module, "_evict_docling_cache", wraps=parser_module._evict_docling_cache
+        ) as evict:
+            _docling_cache_put("k1", "x", 1)  # first put measures the directory
+            _docling_cache_put("k2", "y", 1)
+            _docling_cache_put("k3", "z", 1)
+        assert evict.call_count == 1
+        assert _docling_cache_get("k3") == ("z", 1)
+
+
+# ── Docling converter tests ──────────────────────────────────────────────────
+
+
+class TestConverters:
+    @pytest.fixture(autouse=True)
+    def converters(self, monkeypatch):
+        monkeypatch.setattr(parser_module, "_converters", {})
+
+    def test_concurrent_conversions_are_not_serialized(self, monkeypatch):
+        # Both conversions must be inside convert() at once to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        converter = MagicMock()
+        converter.convert.side_effect = lambda path: barrier.wait()
+        monkeypatch.setattr(parser_module, "DOCLING_AVAILABLE", True)
+        monkeypatch.setattr(parser_module, "_converters", {False: converter, True: converter})
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            plain = pool.submit(_convert, Path("a.pdf"))
+            ocr = pool.submit(_convert, Path("scan.pdf"), ocr=True)
+            plain.result()
+            ocr.result()
+
+        assert converter.convert.call_count == 2
+
+    def test_plain_and_ocr_converters_are_separate_and_reused(self):
+        pytest.importorskip("docling")
+        plain = parser_module._get_converter()
+        ocr = parser_module._get_converter(ocr=True)
+
+        assert plain is not ocr
+        assert parser_module._get_converter() is plain
+        assert parser_module._get_converter(ocr=True) is ocr
+
+    def test_real_docling_conversion(self, sample_docx: Path):
+        pytest.importorskip("docling")
+        result = _convert(sample_docx)
+        assert "Techninė specifikacija" in result.document.export_to_markdown()
+
+
+# ── Warmup tests ─────────────────────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_warmup_noop_without_docling(monkeypatch):
+    monkeypatch.setattr(parser_module, "DOCLING_AVAILABLE", False)
+    with patch.object(parser_module, "_warm_converter") as warm:
+        await warmup_parsers()
+    warm.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_warmup_failure_is_logged_not_raised(monkeypatch):
+    monkeypatch.setattr(parser_module, "DOCLING_AVAILABLE", True)
+    monkeypatch.setattr(get_settings(), "ocr_enabled", False)
+    with patch.object(
+        parser_module, "_warm_converter", side_effect=RuntimeError("no models")
+    ) as warm:
+        await warmup_parsers()
+    warm.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("ocr_enabled", "modes"), [(True, [False, True]), (False, [False])]
+)
+async def test_warmup_covers_ocr_converter_when_enabled(monkeypatch, ocr_enabled, modes):
+    monkeypatch.setattr(parser_module, "DOCLING_AVAILABLE", True)
+    monkeypatch.setattr(get_settings(), "ocr_enabled", ocr_enabled)
+    with patch.object(parser_module, "_warm_converter") as warm:
+        await warmup_parsers()
+    assert [c.args for c in warm.call_args_list] == [(ocr,) for ocr in modes]
+
+
 # ── Page estimation tests ────────────────────────────────────────────────────
 
 
@@ -4,6 +4,7 @@
 # Related: app/services/pipeline.py
 
 import asyncio
+import threading
 import time
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, call, patch
@@ -19,9 +20,15 @@ from app.models.schemas import (
     ExtractionResult,
     SourceDocument,
 )
+from app.services import stream_store
 from app.services.llm import LLMClient
 from app.services.parser import ParsedDocument
-from app.services.pipeline import AnalysisPipeline, PipelineMetrics
+from app.services.pipeline import (
+    DB_WRITE_CONCURRENCY,
+    EVENT_FLUSH_DELAY,
+    AnalysisPipeline,
+    PipelineMetrics,
+)
 
 
 # ── Fixtures ───────────────────────────────────────────────────────────────────
@@ -81,6 +88,18 @@ def _make_qa_evaluation(**kwargs) -> QAEvaluation:
     return QAEvaluation(**defaults)
 
 
+def _completing_extract_all(results):
+    """extract_all side effect that fires on_completed per result, like the real one."""
+
+    async def fake_extract_all(docs, llm, model, *, on_completed=None, **kwargs):
+        for i, (doc, _result, usage) in enumerate(results):
+            if on_completed:
+                on_completed(i, doc.filename, usage)
+        return results
+
+    return fake_extract_all
+
+
 @pytest.fixture
 def mock_db():
     """In-memory ConvexDB instance (no Convex URL = in-memory)."""
@@ -176,9 +195,17 @@ class TestPipelineMetrics:
             "tokens_evaluation_output",
             "estimated_cost_usd",
             "model_used",
+            "cache_hits",
         }
         assert set(d.keys()) == expected_keys
 
+    def test_to_dict_returns_fresh_snapshot(self):
+        m = PipelineMetrics(cache_hits=1)
+        d = m.to_dict()
+        m.cache_hits = 2
+        assert d["cache_hits"] == 1
+        assert m.to_dict()["cache_hits"] == 2
+
 
 class TestPipelineInit:
     """Tests for AnalysisPipeline initialization."""
@@ -196,6 +223,222 @@ class TestPipelineInit:
         assert pipeline._event_index == 0
 
 
+class TestSaveDocuments:
+    """Tests for bounded-concurrency document persistence."""
+
+    @pytest.mark.asyncio
+    async def test_saves_all_docs_with_bounded_concurrency(self, mock_db, mock_llm):
+        in_flight = 0
+        peak = 0
+        saved: list[str] = []
+
+        async def fake_add_document(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            saved.append(kwargs["filename"])
+            in_flight -= 1
+
+        mock_db.add_document = fake_add_document
+        pipeline = AnalysisPipeline(
+            analysis_id="test-123", db=mock_db, llm=mock_llm, model="test-model"
+        )
+        docs = [_make_parsed_doc(filename=f"doc{i}.pdf") for i in range(25)]
+
+        await pipeline._save_documents(docs)
+
+        assert sorted(saved) == sorted(d.filename for d in docs)
+        assert 1 < peak <= DB_WRITE_CONCURRENCY
+
+
+class TestEventBatching:
+    """Tests for buffered event emission."""
+
+    @pytest.mark.asyncio
+    async def test_burst_of_events_written_in_one_batch(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+        mock_db.append_events = AsyncMock(wraps=mock_db.append_events)
+
+        for i in range(20):
+            pipeline._on_extraction_started_sync(i, f"doc{i}.pdf")
+        await pipeline._flush_events()
+
+        mock_db.append_events.assert_awaited_once()
+        events = await mock_db.get_events(analysis_id)
+        assert [e["index"] for e in events] == list(range(20))
+        await pipeline._stop_emitter()
+
+    @pytest.mark.asyncio
+    async def test_buffered_events_flush_after_delay(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+
+        await pipeline._emit_event("aggregation_started", {})
+        assert await mock_db.get_events(analysis_id) == []
+
+        await asyncio.sleep(EVENT_FLUSH_DELAY * 3)
+        events = await mock_db.get_events(analysis_id)
+        assert [e["event_type"] for e in events] == ["aggregation_started"]
+        await pipeline._stop_emitter()
+
+    @pytest.mark.asyncio
+    async def test_stop_emitter_flushes_and_cancels(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+        emitter = None
+        for i in range(3):
+            pipeline._on_extraction_started_sync(i, f"doc{i}.pdf")
+            emitter = emitter or pipeline._emitter_task
+
+        await pipeline._stop_emitter()
+
+        assert emitter.cancelled()
+        assert pipeline._emitter_task is None
+        assert len(await mock_db.get_events(analysis_id)) == 3
+
+
+class TestCancellationWatch:
+    """Cancellation is tracked by a status subscription, not per-phase reads."""
+
+    @pytest.mark.asyncio
+    async def test_watch_flags_cancellation(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+        watch = asyncio.create_task(pipeline._watch_cancellation())
+        await asyncio.sleep(0)
+        await pipeline._check_cancellation()  # still running
+
+        await mock_db.update_analysis(analysis_id, status=AnalysisStatus.CANCELED.value)
+        await asyncio.wait_for(watch, timeout=1)
+
+        with pytest.raises(asyncio.CancelledError):
+            await pipeline._check_cancellation()
+        assert mock_db._status_watchers == {}
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_db_read_when_watch_fails(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+
+        async def broken_watch(_analysis_id):
+            raise RuntimeError("subscription unavailable")
+            yield  # pragma: no cover
+
+        with patch.object(mock_db, "watch_status", broken_watch):
+            await pipeline._watch_cancellation()
+
+        await mock_db.update_analysis(analysis_id, status=AnalysisStatus.CANCELED.value)
+        with pytest.raises(asyncio.CancelledError):
+            await pipeline._check_cancellation()
+
+
+    @pytest.mark.asyncio
+    async def test_reads_db_until_watch_delivers(self, mock_db, mock_llm):
+        """A cancel that lands before the watch is live is still seen."""
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+        await mock_db.update_analysis(analysis_id, status=AnalysisStatus.CANCELED.value)
+
+        with pytest.raises(asyncio.CancelledError):
+            await pipeline._check_cancellation()
+
+    @pytest.mark.asyncio
+    async def test_convex_watch_runs_off_the_default_executor(self):
+        """The subscription is read in its own thread and ends on close."""
+        unsubscribed = threading.Event()
+
+        class FakeSubscription:
+            def __iter__(self):
+                yield "parsing"
+                yield "extracting"
+                unsubscribed.wait(timeout=5)  # blocks like a live subscription
+
+            def unsubscribe(self):
+                unsubscribed.set()
+
+        db = ConvexDB()
+        db._client = MagicMock()
+        db._client.subscribe.return_value = FakeSubscription()
+
+        statuses = db.watch_status("a1")
+        assert await statuses.__anext__() == "parsing"
+        assert await statuses.__anext__() == "extracting"
+        await statuses.aclose()
+
+        db._client.subscribe.assert_called_once_with("analyses:getStatus", {"id": "a1"})
+        assert unsubscribed.is_set()
+        for thread in threading.enumerate():
+            if thread.name == "convex-watch-a1":
+                thread.join(timeout=1)
+                assert not thread.is_alive()
+
+
+class TestThinkingBackpressure:
+    """Tests for the drop-newest policy on the live thinking stream."""
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_newest_and_reports_count(self, mock_db, mock_llm):
+        pipeline = AnalysisPipeline(
+            analysis_id="test-123", db=mock_db, llm=mock_llm, model="test-model"
+        )
+        pipeline._stream_queue = asyncio.Queue(maxsize=2)
+
+        for i in range(5):
+            await pipeline._push_thinking("extraction", f"chunk {i}")
+        assert pipeline._dropped_thinking == 3
+
+        pipeline._stream_queue.get_nowait()
+        pipeline._stream_queue.get_nowait()
+        await pipeline._push_thinking_done()
+
+        items = [pipeline._stream_queue.get_nowait() for _ in range(2)]
+        assert items == [{"type": "thinking_dropped", "n": 3}, {"type": "thinking_done"}]
+        assert pipeline._dropped_thinking == 0
+
+    @pytest.mark.asyncio
+    async def test_kept_chunks_are_the_oldest(self, mock_db, mock_llm):
+        pipeline = AnalysisPipeline(
+            analysis_id="test-123", db=mock_db, llm=mock_llm, model="test-model"
+        )
+        pipeline._stream_queue = asyncio.Queue(maxsize=2)
+
+        for i in range(4):
+            await pipeline._push_thinking("extraction", f"chunk {i}")
+
+        texts = [pipeline._stream_queue.get_nowait()["text"] for _ in range(2)]
+        assert texts == ["chunk 0", "chunk 1"]
+
+    @pytest.mark.asyncio
+    async def test_writes_refresh_stream_in_store(self, mock_db, mock_llm):
+        """An unread stream stays registered while the pipeline keeps writing."""
+        pipeline = AnalysisPipeline(
+            analysis_id="test-123", db=mock_db, llm=mock_llm, model="test-model"
+        )
+        queue, _ = stream_store._streams["test-123"]
+        stale = time.monotonic() - stream_store.STREAM_TTL_SECONDS - 1
+        stream_store._streams["test-123"] = (queue, stale)
+
+        await pipeline._push_thinking("extraction", "chunk")
+
+        assert stream_store.gc_streams() == 0
+        assert stream_store.get_stream("test-123") is pipeline._stream_queue
+        stream_store.remove_stream("test-123")
+
+
 class TestPipelineFullRun:
     """Tests for the full pipeline execution (happy path)."""
 
@@ -225,7 +468,7 @@ class TestPipelineFullRun:
         ]
         mock_extract_files.return_value = file_list
         mock_parse_all.return_value = sample_parsed_docs
-        mock_extract_all.return_value = sample_extraction_results
+        mock_extract_all.side_effect = _completing_extract_all(sample_extraction_results)
 
         report = _make_aggregated_report()
         agg_usage = {"input_tokens": 3000, "output_tokens": 600}
@@ -535,9 +778,9 @@ class TestPipelineAggregationFailure:
         mock_extract_files.return_value = [(Path("/tmp/a.pdf"), "a.pdf")]
         doc = _make_parsed_doc()
         mock_parse_all.return_value = [doc]
-        mock_extract_all.return_value = [
+        mock_extract_all.side_effect = _completing_extract_all([
             (doc, _make_extraction_result(), {"input_tokens": 500, "output_tokens": 100})
-        ]
+        ])
         mock_aggregate.side_effect = RuntimeError("Aggregation LLM failed")
 
         analysis_id = await mock_db.create_analysis(model="test-model")
@@ -585,11 +828,11 @@ class TestPipelineMetricsAccumulation:
             (Path(f"/tmp/{d.filename}"), d.filename) for d in docs
         ]
         mock_parse_all.return_value = docs
-        mock_extract_all.return_value = [
+        mock_extract_all.side_effect = _completing_extract_all([
             (docs[0], _make_extraction_result(), {"input_tokens": 1000, "output_tokens": 200}),
             (docs[1], _make_extraction_result(), {"input_tokens": 2000, "output_tokens": 400}),
             (docs[2], _make_extraction_result(), {"input_tokens": 500, "output_tokens": 100}),
-        ]
+        ])
         mock_aggregate.return_value = (
             _make_aggregated_report(),
             {"input_tokens": 5000, "output_tokens": 800},
@@ -637,9 +880,9 @@ class TestPipelineMetricsAccumulation:
         doc = _make_parsed_doc()
         mock_extract_files.return_value = [(Path("/tmp/a.pdf"), "a.pdf")]
         mock_parse_all.return_value = [doc]
-        mock_extract_all.return_value = [
+        mock_extract_all.side_effect = _completing_extract_all([
             (doc, _make_extraction_result(), {"input_tokens": 1_000_000, "output_tokens": 0})
-        ]
+        ])
         mock_aggregate.return_value = (
             _make_aggregated_report(),
             {"input_tokens": 0, "output_tokens": 1_000_000},
@@ -1034,9 +1277,9 @@ class TestPipelineEvaluationFailure:
         doc = _make_parsed_doc()
         mock_extract_files.return_value = [(Path("/tmp/a.pdf"), "a.pdf")]
         mock_parse_all.return_value = [doc]
-        mock_extract_all.return_value = [
+        mock_extract_all.side_effect = _completing_extract_all([
             (doc, _make_extraction_result(), {"input_tokens": 100, "output_tokens": 50})
-        ]
+        ])
         mock_aggregate.return_value = (
             _make_aggregated_report(),
             {"input_tokens": 200, "output_tokens": 100},
@@ -1103,6 +1346,26 @@ class TestPipelineCostCalculation:
         expected = (800_000 / 1_000_000 * 3.0) + (175_000 / 1_000_000 * 15.0)
         assert pipeline.metrics.estimated_cost_usd == pytest.approx(expected)
 
+    @pytest.mark.asyncio
+    async def test_extraction_callback_updates_running_cost(self, mock_db, mock_llm):
+        analysis_id = await mock_db.create_analysis(model="test-model")
+        pipeline = AnalysisPipeline(
+            analysis_id=analysis_id, db=mock_db, llm=mock_llm, model="test-model"
+        )
+
+        pipeline._on_extraction_completed_sync(0, "a.pdf", {"input_tokens": 1_000_000})
+        assert pipeline.metrics.estimated_cost_usd == pytest.approx(3.0)
+        pipeline._on_extraction_completed_sync(
+            1, "b.pdf", {"input_tokens": 0, "output_tokens": 1_000_000, "cached": True}
+        )
+        assert pipeline.metrics.estimated_cost_usd == pytest.approx(18.0)
+        assert pipeline.metrics.cache_hits == 1
+
+        await pipeline._stop_emitter()
+        events = await mock_db.get_events(analysis_id)
+        updates = [e["data"] for e in events if e["event_type"] == "metrics_update"]
+        assert [u["estimated_cost_usd"] for u in updates] == pytest.approx([3.0, 18.0])
+
 
 class TestPipelineServiceCalls:
     """Test that pipeline calls services with correct arguments."""
@@ -0,0 +1,58 @@
+# backend/tests/test_stream_store.py
+# Tests for the in-memory thinking stream store (services/stream_store.py)
+# Covers: lifecycle, TTL eviction, size cap, LRU refresh on access and on writes
+# Related: backend/app/services/stream_store.py
+
+import time
+from collections import OrderedDict
+
+import pytest
+
+from app.services import stream_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_streams(monkeypatch):
+    monkeypatch.setattr(stream_store, "_streams", OrderedDict())
+
+
+def _age(analysis_id: str, seconds: float) -> None:
+    q, _ = stream_store._streams[analysis_id]
+    stream_store._streams[analysis_id] = (q, time.monotonic() - seconds)
+
+
+class TestLifecycle:
+    def test_create_get_remove(self):
+        q = stream_store.create_stream("a1")
+        assert stream_store.get_stream("a1") is q
+        stream_store.remove_stream("a1")
+        assert stream_store.get_stream("a1") is None
+
+
+class TestEviction:
+    def test_gc_drops_only_stale_streams(self):
+        stream_store.create_stream("old")
+        stream_store.create_stream("fresh")
+        _age("old", stream_store.STREAM_TTL_SECONDS + 1)
+        stream_store._streams.move_to_end("fresh")
+
+        assert stream_store.gc_streams() == 1
+        assert stream_store.get_stream("old") is None
+        assert stream_store.get_stream("fresh") is not None
+
+    def test_size_cap_evicts_least_recently_used(self, monkeypatch):
+        monkeypatch.setattr(stream_store, "MAX_STREAMS", 2)
+        stream_store.create_stream("a")
+        stream_store.create_stream("b")
+        stream_store.get_stream("a")  # refresh — "b" becomes LRU
+        stream_store.create_stream("c")
+
+        assert list(stream_store._streams) == ["a", "c"]
+
+    def test_producer_writes_keep_unread_stream_alive(self):
+        stream_store.create_stream("busy")
+        _age("busy", stream_store.STREAM_TTL_SECONDS + 1)
+        stream_store.touch_stream("busy")  # pipeline wrote a chunk
+
+        assert stream_store.gc_streams() == 0
+        assert stream_store.get_stream("busy") is not None
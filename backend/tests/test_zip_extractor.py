@@ -3,7 +3,9 @@
 # Tests: pass-through, extraction, nested ZIPs, filtering, corruption handling
 # Related: backend/app/services/zip_extractor.py
 
+import asyncio
 import io
+import json
 import os
 import tempfile
 import zipfile
@@ -11,10 +13,14 @@ from pathlib import Path
 
 import pytest
 
+from app.config import get_settings
+from app.services import zip_extractor
 from app.services.zip_extractor import (
     SUPPORTED_EXTENSIONS,
     _extract_zip,
+    _is_contained,
     _sanitize_filename,
+    _split_entry_name,
     extract_files,
 )
 
@@ -92,6 +98,14 @@ def tmp_dir(tmp_path: Path) -> Path:
     return tmp_path
 
 
+@pytest.fixture(autouse=True)
+def isolated_archive_cache(tmp_path: Path, monkeypatch) -> Path:
+    """Keep the extraction cache per-test so archives don't hit across tests."""
+    temp_dir = tmp_path / "app_tmp"
+    monkeypatch.setattr(get_settings(), "temp_dir", str(temp_dir))
+    return temp_dir / zip_extractor._ARCHIVE_CACHE_SUBDIR
+
+
 # ── Tests: _sanitize_filename ────────────────────────────────────────────────
 
 
@@ -140,6 +154,47 @@ class TestSanitizeFilename:
         assert result is not None
         assert "файл.pdf" in result
 
+    def test_mixed_unsafe_components(self) -> None:
+        result = _sanitize_filename("./a//..\\b/C:/c.pdf/")
+        assert result == os.path.join("a", "b", "c.pdf")
+
+    def test_keeps_names_that_only_look_unsafe(self) -> None:
+        assert _sanitize_filename(".../..x/ab:/f.pdf") == os.path.join(
+            "...", "..x", "ab:", "f.pdf"
+        )
+
+
+class TestIsContained:
+    """Tests for the string-only containment check."""
+
+    def test_relative_name_is_contained(self) -> None:
+        assert _is_contained(os.path.join("dir", "doc.pdf"))
+
+    def test_parent_reference_rejected(self) -> None:
+        assert not _is_contained(os.path.join("dir", "..", "..", "doc.pdf"))
+
+    def test_absolute_path_rejected(self) -> None:
+        assert not _is_contained(os.path.abspath("doc.pdf"))
+
+    def test_sanitized_names_are_contained(self) -> None:
+        for name in ("../../etc/passwd", "/abs/file.pdf", "C:/x/y.docx"):
+            assert _is_contained(_sanitize_filename(name))
+
+
+class TestSplitEntryName:
+    """_split_entry_name must agree with Path(name).name / .suffix.lower()."""
+
+    @pytest.mark.parametrize("name", [
+        "doc.pdf",
+        os.path.join("dir", "Report.PDF"),
+        os.path.join("a.b", "archive.tar.zip"),
+        ".hidden",
+        "no_extension",
+        os.path.join("dir.with.dots", "file"),
+    ])
+    def test_matches_pathlib(self, name: str) -> None:
+        assert _split_entry_name(name) == (Path(name).name, Path(name).suffix.lower())
+
 
 # ── Tests: extract_files — regular file pass-through ─────────────────────────
 
@@ -268,6 +323,47 @@ class TestExtractFilesZip:
         names = {r[1] for r in results}
         assert names == {"report.pdf", "photo.jpg", "spec.docx"}
 
+    @pytest.mark.asyncio
+    async def test_large_entries_extracted_in_process_pool(
+        self, tmp_dir: Path, monkeypatch
+    ) -> None:
+        """Entries over the size threshold go through the process pool intact."""
+        monkeypatch.setattr(zip_extractor, "_PROCESS_POOL_MIN_BYTES", 0)
+        zip_path = _create_zip(tmp_dir, "large.zip", {
+            "big.pdf": b"%PDF" + os.urandom(4096),
+            "sub/other.docx": b"docx content",
+        })
+
+        results = await extract_files([zip_path])
+
+        assert {r[1] for r in results} == {"big.pdf", "other.docx"}
+        with zipfile.ZipFile(zip_path) as zf:
+            for file_path, name in results:
+                entry = "big.pdf" if name == "big.pdf" else "sub/other.docx"
+                assert file_path.read_bytes() == zf.read(entry)
+
+    @pytest.mark.asyncio
+    async def test_pool_submit_failure_extracts_in_thread(
+        self, tmp_dir: Path, monkeypatch
+    ) -> None:
+        """A pool that can't take work (e.g. shut down) loses no entries."""
+        monkeypatch.setattr(zip_extractor, "_PROCESS_POOL_MIN_BYTES", 0)
+
+        def refuse(*args):
+            raise RuntimeError("process pool is shut down")
+
+        monkeypatch.setattr(zip_extractor, "submit_to_process_pool", refuse)
+        zip_path = _create_zip(tmp_dir, "large.zip", {
+            "a.pdf": b"%PDF a",
+            "b.pdf": b"%PDF b",
+            "c.docx": b"docx",
+        })
+
+        results = await extract_files([zip_path])
+
+        assert sorted(name for _, name in results) == ["a.pdf", "b.pdf", "c.docx"]
+        assert all(path.exists() for path, _ in results)
+
 
 # ── Tests: Nested ZIP extraction ─────────────────────────────────────────────
 
@@ -351,6 +447,30 @@ class TestExtractFilesNestedZip:
         assert names == {"keep.pdf", "keep_inner.docx"}
 
 
+    @pytest.mark.asyncio
+    async def test_many_sibling_nested_zips(self, tmp_dir: Path) -> None:
+        """More nested archives than the concurrency limit must not deadlock."""
+        def _zip_bytes(files: dict[str, bytes]) -> bytes:
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w") as zf:
+                for name, content in files.items():
+                    zf.writestr(name, content)
+            return buf.getvalue()
+
+        outer_files = {
+            f"lot_{i}.zip": _zip_bytes({
+                f"lot_{i}.pdf": b"pdf",
+                f"annex_{i}.zip": _zip_bytes({f"annex_{i}.docx": b"docx"}),
+            })
+            for i in range(40)
+        }
+        zip_path = _create_zip(tmp_dir, "lots.zip", outer_files)
+
+        results = await asyncio.wait_for(extract_files([zip_path]), timeout=10)
+
+        assert len(results) == 80
+
+
 # ── Tests: Corrupt ZIP handling ──────────────────────────────────────────────
 
 
@@ -514,6 +634,23 @@ class TestExtractZipDirect:
         for path, name in results:
             assert path.exists()
 
+    @pytest.mark.asyncio
+    async def test_unsupported_entries_not_written(self, tmp_dir: Path) -> None:
+        """Unsupported entries should be skipped before touching the disk."""
+        zip_path = _create_zip(tmp_dir, "test.zip", {
+            "doc.pdf": b"pdf content",
+            "readme.txt": b"text",
+            "meta/manifest.xml": b"<xml/>",
+        })
+        dest = tmp_dir / "output"
+        dest.mkdir()
+
+        results = await _extract_zip(zip_path, dest)
+
+        assert [name for _, name in results] == ["doc.pdf"]
+        assert not (dest / "readme.txt").exists()
+        assert not (dest / "meta").exists()
+
     @pytest.mark.asyncio
     async def test_depth_limit_protection(self, tmp_dir: Path) -> None:
         """Extremely deep nesting should be stopped by the depth limit."""
@@ -547,6 +684,99 @@ class TestExtractZipDirect:
         assert results == []
 
 
+# ── Tests: extraction cache ──────────────────────────────────────────────────
+
+
+class TestExtractionCache:
+    """Re-uploading an identical archive should reuse the previous extraction."""
+
+    @pytest.mark.asyncio
+    async def test_identical_archive_reuses_extraction(self, tmp_dir: Path) -> None:
+        files = {"doc.pdf": b"pdf", "sub/annex.docx": b"docx"}
+        first_dir = tmp_dir / "first"
+        second_dir = tmp_dir / "second"
+        first_dir.mkdir()
+        second_dir.mkdir()
+        first = _create_zip(first_dir, "tender.zip", files)
+        second = _create_zip(second_dir, "tender_copy.zip", files)
+
+        results_1 = await extract_files([first])
+        results_2 = await extract_files([second])
+
+        assert results_2 == results_1
+
+    @pytest.mark.asyncio
+    async def test_duplicate_archive_in_one_call_is_skipped(self, tmp_dir: Path) -> None:
+        files = {"doc.pdf": b"pdf", "annex.docx": b"docx"}
+        first_dir = tmp_dir / "first"
+        second_dir = tmp_dir / "second"
+        first_dir.mkdir()
+        second_dir.mkdir()
+        first = _create_zip(first_dir, "tender.zip", files)
+        second = _create_zip(second_dir, "tender_copy.zip", files)
+
+        results = await extract_files([first, second])
+
+        assert sorted(name for _, name in results) == ["annex.docx", "doc.pdf"]
+
+    @pytest.mark.asyncio
+    async def test_missing_files_invalidate_cache(self, tmp_dir: Path) -> None:
+        zip_path = _create_zip(tmp_dir, "tender.zip", {"doc.pdf": b"pdf"})
+
+        results_1 = await extract_files([zip_path])
+        results_1[0][0].unlink()
+        results_2 = await extract_files([zip_path])
+
+        assert len(results_2) == 1
+        assert results_2[0][0] != results_1[0][0]
+        assert results_2[0][0].exists()
+        assert not results_1[0][0].parent.exists()  # stale extraction removed
+
+    @pytest.mark.asyncio
+    async def test_extractions_live_in_private_cache_dir(
+        self, tmp_dir: Path, isolated_archive_cache: Path
+    ) -> None:
+        zip_path = _create_zip(tmp_dir, "tender.zip", {"doc.pdf": b"pdf"})
+
+        results = await extract_files([zip_path])
+
+        assert results[0][0].is_relative_to(isolated_archive_cache)
+        assert isolated_archive_cache.stat().st_mode & 0o777 == 0o700
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("planted", ["/etc/hostname", "../../outside.pdf"])
+    async def test_manifest_paths_outside_root_rejected(
+        self, tmp_dir: Path, isolated_archive_cache: Path, planted: str
+    ) -> None:
+        zip_path = _create_zip(tmp_dir, "tender.zip", {"doc.pdf": b"pdf"})
+        (isolated_archive_cache.parent / "outside.pdf").parent.mkdir(parents=True)
+        (isolated_archive_cache.parent / "outside.pdf").write_bytes(b"secret")
+        await extract_files([zip_path])
+        manifest = next(isolated_archive_cache.glob("*.json"))
+        entry = json.loads(manifest.read_text())
+        entry["files"] = [[planted, "doc.pdf"]]
+        manifest.write_text(json.dumps(entry))
+
+        results = await extract_files([zip_path])
+
+        assert len(results) == 1
+        assert results[0][0].is_relative_to(isolated_archive_cache)
+        assert results[0][0].read_bytes() == b"pdf"
+
+    @pytest.mark.asyncio
+    async def test_shared_temp_dir_disables_cache(
+        self, tmp_dir: Path, isolated_archive_cache: Path
+    ) -> None:
+        isolated_archive_cache.parent.mkdir()
+        isolated_archive_cache.parent.chmod(0o777)
+        zip_path = _create_zip(tmp_dir, "tender.zip", {"doc.pdf": b"pdf"})
+
+        results = await extract_files([zip_path])
+
+        assert [name for _, name in results] == ["doc.pdf"]
+        assert not isolated_archive_cache.exists()
+
+
 # ── Tests: Edge cases ────────────────────────────────────────────────────────
 
 
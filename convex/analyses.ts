@@ -61,6 +61,18 @@ export const get = query({
   },
 });
 
+// Status only — the backend's cancellation watch subscribes to this, so
+// event appends (which don't change the result) push nothing to it
+export const getStatus = query({
+  args: { id: v.string() },
+  handler: async (ctx, args) => {
+    const docId = ctx.db.normalizeId("analyses", args.id);
+    if (!docId) return null;
+    const doc = await ctx.db.get(docId);
+    return doc ? doc.status : null;
+  },
+});
+
 export const list = query({
   args: {
     limit: v.number(),
@@ -124,6 +136,24 @@ export const appendEvent = mutation({
   },
 });
 
+export const appendEvents = mutation({
+  args: {
+    id: v.string(),
+    events: v.array(v.any()),
+  },
+  handler: async (ctx, args) => {
+    const docId = ctx.db.normalizeId("analyses", args.id);
+    if (!docId) throw new Error(`Invalid analysis ID: ${args.id}`);
+
+    const doc = await ctx.db.get(docId);
+    if (!doc) throw new Error(`Analysis ${args.id} not found`);
+
+    const events = doc.events_json ?? [];
+    events.push(...args.events);
+    await ctx.db.patch(docId, { events_json: events });
+  },
+});
+
 export const getEvents = query({
   args: {
     id: v.string(),
@@ -517,6 +517,16 @@ export function startAnalysisStream(analysisId: string) {
       if (e.event === 'thinking') {
         if (e.data?.type === 'thinking_done') {
           appStore.setState({ streamThinkingActive: false });
+        } else if (e.data?.type === 'thinking_dropped') {
+          const idx = getStepIndex(appStore.getState().streamStatus);
+          const prev = appStore.getState().streamThinking;
+          const updated = (prev[idx] || '') + `\n… (praleista fragmentų: ${e.data.n})\n`;
+          appStore.setState({
+            streamThinking: {
+              ...prev,
+              [idx]: updated.length > 2000 ? updated.slice(-2000) : updated,
+            },
+          });
         } else if (e.data?.text) {
           appStore.setState({ streamThinkingActive: true });
           const currentStatus = appStore.getState().streamStatus;